@@ -0,0 +1,287 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+# 요청의 category 값과 대시보드 표시 이름
+CATEGORY_LABELS = {
+    'customer': '고객',
+    'work': '조직·업무',
+    'personal': '개인·번아웃'
+}
+
+
+class _UserAggregate:
+    __slots__ = ("message_count", "session_count", "stress_sum", "last_stress", "last_trend",
+                 "last_session", "last_activity", "category")
+
+    def __init__(self):
+        self.message_count = 0
+        self.session_count = 0
+        self.stress_sum = 0.0
+        self.last_stress = None
+        self.last_trend = None
+        self.last_session = None
+        self.last_activity = None
+        self.category = None
+
+
+class DashboardAggregator:
+    """관리자 대시보드용 집계를 메시지가 들어올 때마다 갱신
+
+    get_admin_dashboard_data가 전체 기록을 훑지 않고 snapshot()만 읽도록
+    카테고리별 카운터, 활성 사용자, 최근 활동 목록, 고위험 사용자를 증분으로 유지한다.
+    시작할 때 저장소 기록으로 모든 집계를 다시 만들고, 여러 프로세스가 공유하는 저장소(SQLite)면
+    다른 워커가 기록한 내용도 보이도록 refresh_interval초마다 백그라운드 스레드에서 다시 만들어 바꿔 끼운다
+    (snapshot()은 저장소를 훑는 동안 기다리지 않고 그때까지의 집계를 돌려준다).
+    사용자별 항목은 최근 활동 순으로 max_users개까지만 유지한다.
+    """
+
+    def __init__(self, recent_activity_size=20, active_window=24 * 3600, high_risk_threshold=8.0,
+                 max_users=100000, refresh_interval=None):
+        self.recent_activity_size = recent_activity_size
+        self.active_window = active_window
+        self.high_risk_threshold = high_risk_threshold
+        self.max_users = max_users
+        self.refresh_interval = refresh_interval
+
+        self._users = OrderedDict()             # user_id -> _UserAggregate, 최근 활동 순
+        self._user_total = 0
+        self._category_counts = Counter()
+        self._recent_activity = OrderedDict()   # user_id -> None, 최근 활동 순
+        self._active = OrderedDict()            # user_id -> 마지막 활동 시각(epoch), 오래된 순
+        self._high_risk = set()
+        self._total_conversations = 0
+        self._total_sessions = 0
+        self._stress_sum = 0.0
+        self._lock = threading.Lock()
+        self._store = None
+        self._loaded_at = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+
+    def load(self, store):
+        """저장소 기록(메시지 수, 카테고리, 감정 기록)으로 모든 집계를 다시 만듦"""
+        self._store = store
+        activity = store.user_activity()
+        categories = store.category_counts()
+        sessions = store.session_stats()
+
+        users = {}
+        for user_id, (count, last_activity, category) in activity.items():
+            user = users[user_id] = _UserAggregate()
+            user.message_count = count
+            user.last_activity = last_activity
+            user.category = category
+        for user_id, (count, stress_sum, last_stress, last_session) in sessions.items():
+            user = users.get(user_id)
+            if user is None:
+                user = users[user_id] = _UserAggregate()
+            user.session_count = count
+            user.stress_sum = stress_sum
+            user.last_stress = last_stress
+            user.last_session = last_session
+
+        cutoff = time.time() - self.active_window
+        by_activity = sorted(users.items(), key=lambda item: item[1].last_activity or item[1].last_session or 0)
+        with self._lock:
+            for user_id, user in users.items():
+                # 추세는 저장소에 없으므로 이 프로세스가 계산해 둔 값을 유지
+                previous = self._users.get(user_id)
+                if previous is not None:
+                    user.last_trend = previous.last_trend
+            self._users = OrderedDict(by_activity[-self.max_users:])
+            self._user_total = len(users)
+            self._category_counts = Counter(categories)
+            self._recent_activity = OrderedDict(
+                (user_id, None) for user_id, user in by_activity[-self.recent_activity_size:] if user.last_activity)
+            self._active = OrderedDict(
+                (user_id, user.last_activity) for user_id, user in by_activity
+                if user.last_activity and user.last_activity >= cutoff and user_id in self._users)
+            self._high_risk = {user_id for user_id, user in self._users.items()
+                               if user.last_stress is not None and user.last_stress >= self.high_risk_threshold}
+            self._total_conversations = sum(user.message_count // 2 for user in users.values())
+            self._total_sessions = sum(user.session_count for user in users.values())
+            self._stress_sum = sum(user.stress_sum for user in users.values())
+            self._loaded_at = time.monotonic()
+
+    def refresh_if_stale(self):
+        """공유 저장소면 refresh_interval마다 백그라운드 스레드에서 다시 집계 (동시에 한 스레드만, 기다리지 않음)"""
+        if not self.refresh_interval or self._store is None:
+            return
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh, name='dashboard-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh(self):
+        # load()는 새 집계를 잠금 밖에서 만들고 잠금 안에서 바꿔 끼우므로 그동안의 조회/기록을 막지 않는다
+        try:
+            self.load(self._store)
+        except Exception as e:
+            print(f"대시보드 집계 재구성 중 오류 발생: {e}")
+            self._loaded_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _user(self, user_id):
+        # 호출 전 self._lock을 잡고 있어야 한다
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserAggregate()
+            self._user_total += 1
+            while len(self._users) > self.max_users:
+                self._forget(next(iter(self._users)))
+        else:
+            self._users.move_to_end(user_id)
+        return user
+
+    def _forget(self, user_id):
+        # 가장 오래 활동이 없던 사용자 항목 제거 (누적 합계와 사용자 수는 유지)
+        del self._users[user_id]
+        self._recent_activity.pop(user_id, None)
+        self._active.pop(user_id, None)
+        self._high_risk.discard(user_id)
+
+    def record_message(self, user_id, role, category=None, timestamp=None):
+        timestamp = timestamp or time.time()
+        with self._lock:
+            user = self._user(user_id)
+            user.message_count += 1
+            if user.message_count % 2 == 0:  # 사용자-봇 쌍으로 계산
+                self._total_conversations += 1
+            user.last_activity = timestamp
+            if category:
+                user.category = category
+                if role == "user":
+                    self._category_counts[category] += 1
+
+            self._recent_activity[user_id] = None
+            self._recent_activity.move_to_end(user_id)
+            if len(self._recent_activity) > self.recent_activity_size:
+                self._recent_activity.popitem(last=False)
+
+            self._active[user_id] = timestamp
+            self._active.move_to_end(user_id)
+
+    def record_session(self, user_id, stress_score, trend=None, timestamp=None):
+        timestamp = timestamp or time.time()
+        with self._lock:
+            user = self._user(user_id)
+            user.session_count += 1
+            user.stress_sum += stress_score
+            user.last_stress = stress_score
+            user.last_trend = trend
+            user.last_session = timestamp
+            self._total_sessions += 1
+            self._stress_sum += stress_score
+
+            if stress_score >= self.high_risk_threshold:
+                self._high_risk.add(user_id)
+            else:
+                self._high_risk.discard(user_id)
+
+    def _expire_active(self, now):
+        cutoff = now - self.active_window
+        while self._active:
+            user_id, last_seen = next(iter(self._active.items()))
+            if last_seen >= cutoff:
+                break
+            del self._active[user_id]
+
+    def snapshot(self):
+        self.refresh_if_stale()
+        now = time.time()
+        with self._lock:
+            self._expire_active(now)
+
+            total_category = sum(self._category_counts.values())
+            category_distribution = [
+                {
+                    "category": label,
+                    "count": self._category_counts[key],
+                    "percentage": round(self._category_counts[key] * 100 / total_category) if total_category else 0
+                }
+                for key, label in CATEGORY_LABELS.items()
+            ]
+
+            recent_activity = [self._activity_row(user_id) for user_id in reversed(self._recent_activity)]
+            high_risk_users = sorted((self._risk_row(user_id) for user_id in self._high_risk),
+                                     key=lambda user: user["stress_score"], reverse=True)
+
+            return {
+                **self._totals(),
+                "category_distribution": category_distribution,
+                "recent_activity": recent_activity,
+                "high_risk_users": high_risk_users,
+                "system_stats": self._system_stats(),
+                "generated_at": datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+            }
+
+    # 아래 _로 시작하는 조회 함수는 self._lock을 잡은 상태에서 호출한다
+    def _activity_row(self, user_id):
+        user = self._users[user_id]
+        return {
+            "user_id": user_id,
+            "last_activity": datetime.fromtimestamp(user.last_activity).strftime('%Y-%m-%d %H:%M')
+                             if user.last_activity else "",
+            "category": CATEGORY_LABELS.get(user.category, user.category or ""),
+            "session_count": user.session_count,
+            "avg_stress": user.stress_sum / user.session_count if user.session_count else 0.0
+        }
+
+    def _risk_row(self, user_id):
+        user = self._users[user_id]
+        return {
+            "user_id": user_id,
+            "stress_score": user.last_stress,
+            "last_session": datetime.fromtimestamp(user.last_session) if user.last_session else None
+        }
+
+    def _totals(self):
+        return {
+            "total_users": self._user_total,
+            "total_conversations": self._total_conversations,
+            "active_users": len(self._active)
+        }
+
+    def _system_stats(self):
+        return {
+            "total_sessions": self._total_sessions,
+            "avg_stress_score": self._stress_sum / self._total_sessions if self._total_sessions else 0.0
+        }
+
+    def activity_delta(self, user_id):
+        """메시지 기록 직후 관리자 대시보드에 보낼 변경분"""
+        with self._lock:
+            self._expire_active(time.time())
+            return {**self._totals(), "activity": self._activity_row(user_id)}
+
+    def session_delta(self, user_id):
+        """스트레스 점수 기록 직후 관리자 대시보드에 보낼 변경분"""
+        with self._lock:
+            return {
+                "system_stats": self._system_stats(),
+                "high_risk_count": len(self._high_risk),
+                "user": {**self._risk_row(user_id), "high_risk": user_id in self._high_risk},
+                "activity": self._activity_row(user_id)
+            }
+
+    def active_user_count(self):
+        with self._lock:
+            self._expire_active(time.time())
+            return len(self._active)
+
+    def user_stats(self, user_id):
+        """개인 대시보드용 사용자 스트레스/세션 요약 (이 프로세스에 기록이 없으면 None)"""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None or not user.session_count:
+                return None
+            return {
+                "current_stress_score": user.last_stress,
+                "stress_trend": user.last_trend or "안정",
+                "total_sessions": user.session_count
+            }
@@ -0,0 +1,237 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+from markupsafe import Markup
+from werkzeug.http import http_date, quote_etag
+from werkzeug.utils import get_content_type
+from werkzeug.wrappers import Response
+
+HASH_LENGTH = 12
+# 내용 해시를 넣은 정적 파일 이름: lama(face).3f2a9c01b7de.png
+HASHED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % HASH_LENGTH)
+# 크기별 WebP 변형 이름 (build_assets.py가 생성): lama(face).64w.webp
+VARIANT_NAME = re.compile(r"^(?P<stem>.+)\.(?P<width>\d+)w\.webp$")
+# 압축 효과가 있는 형식만 미리 압축 (PNG/WebP는 이미 압축되어 있어 줄지 않음)
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# 해시 URL은 내용이 바뀌면 URL도 바뀌므로 1년간 재검증 없이 캐시
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# 페이지와 해시 없는 URL은 매번 ETag로 재검증 (바뀌지 않았으면 304)
+REVALIDATE_CACHE = "no-cache"
+
+
+def compress_variants(body, mimetype):
+    """미리 압축한 본문 {인코딩: bytes} (원본보다 작아질 때만)"""
+    if not mimetype.startswith(COMPRESSIBLE_TYPES):
+        return {}
+    encodings = {}
+    try:
+        import brotli
+        encodings["br"] = brotli.compress(body, quality=11)
+    except ImportError:  # brotli가 없으면 gzip만 사용
+        pass
+    encodings["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    return {name: data for name, data in encodings.items() if len(data) < len(body)}
+
+
+class CachedBody:
+    """미리 만든 응답 본문 (원본과 압축본), 내용 해시 ETag와 Last-Modified
+
+    인코딩별 응답 헤더도 미리 만들어 두어 요청마다 헤더를 만들거나 날짜를 포맷하지 않는다.
+    """
+
+    __slots__ = ("body", "mimetype", "encodings", "digest", "last_modified", "sources", "_headers")
+
+    def __init__(self, body, mimetype, last_modified, sources=()):
+        self.body = body
+        self.mimetype = mimetype
+        self.encodings = compress_variants(body, mimetype)
+        self.digest = hashlib.sha256(body).hexdigest()
+        # HTTP 날짜는 초 단위
+        self.last_modified = datetime.fromtimestamp(int(last_modified), timezone.utc)
+        # 원본 파일 경로와 수정 시각 (개발 모드에서 변경 확인용)
+        self.sources = tuple((path, os.path.getmtime(path)) for path in sources)
+
+        content_type = get_content_type(mimetype, "utf-8")
+        common = [("Last-Modified", http_date(self.last_modified))]
+        if self.encodings:
+            common.append(("Vary", "Accept-Encoding"))
+        self._headers = {}
+        for encoding in (None, *self.encodings):
+            # 인코딩마다 다른 바이트이므로 ETag도 구분
+            etag = f"{self.digest[:HASH_LENGTH * 2]}-{encoding or 'identity'}"
+            headers = [("ETag", quote_etag(etag)), *common]
+            if encoding:
+                headers.append(("Content-Encoding", encoding))
+            self._headers[encoding] = (etag, headers, [("Content-Type", content_type), *headers])
+
+    def is_stale(self):
+        try:
+            return any(os.path.getmtime(path) != mtime for path, mtime in self.sources)
+        except OSError:
+            return True
+
+    def choose_encoding(self, accept_encodings):
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and accept_encodings.quality(encoding) > 0:
+                return encoding
+        return None
+
+    def not_modified(self, request, etag):
+        # If-None-Match가 있으면 그것만 보고, 없을 때만 If-Modified-Since 확인 (RFC 9110)
+        if "If-None-Match" in request.headers:
+            return request.if_none_match.contains_weak(etag)
+        since = request.if_modified_since
+        return since is not None and self.last_modified <= since
+
+    def response(self, request, cache_control):
+        """Accept-Encoding에 맞는 본문으로 응답, If-None-Match/If-Modified-Since가 맞으면 304"""
+        encoding = self.choose_encoding(request.accept_encodings) if self.encodings else None
+        etag, headers, full_headers = self._headers[encoding]
+        if self.not_modified(request, etag):
+            return Response(status=304, headers=[*headers, ("Cache-Control", cache_control)])
+        body = self.encodings[encoding] if encoding else self.body
+        return Response(body, headers=[*full_headers, ("Cache-Control", cache_control)])
+
+
+class StaticAssets:
+    """정적 파일 목록: 내용 해시 URL, 미리 압축한 본문, 크기별 WebP 변형
+
+    처음 사용할 때 폴더의 파일을 모두 읽어 메모리에 올린다 (캐릭터 이미지 등 수 MB 이하).
+    템플릿에서는 static_url()과 picture()로 해시 URL을 만든다.
+    """
+
+    def __init__(self, folder, url_prefix="/static"):
+        self.folder = str(folder)
+        self.url_prefix = url_prefix
+        self.version = 0  # 다시 읽을 때마다 증가 (페이지 캐시 무효화용)
+        self._files = None
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @property
+    def files(self):
+        if self._files is None:
+            with self._lock:
+                if self._files is None:
+                    self._scan()
+        return self._files
+
+    @property
+    def last_modified(self):
+        return max((entry.last_modified.timestamp() for entry in self.files.values()), default=0)
+
+    def _scan(self):
+        files = {}
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                with open(path, "rb") as f:
+                    files[relative] = CachedBody(f.read(), mimetype, os.path.getmtime(path), sources=[path])
+
+        # 변형 파일을 원본(같은 이름, 다른 확장자)에 묶음
+        originals = {os.path.splitext(name)[0]: name for name in files if not VARIANT_NAME.match(name)}
+        variants = {}
+        for name in files:
+            match = VARIANT_NAME.match(name)
+            if match and match["stem"] in originals:
+                variants.setdefault(originals[match["stem"]], []).append((int(match["width"]), name))
+        self._variants = {name: sorted(widths) for name, widths in variants.items()}
+        self._files = files
+        self.version += 1
+
+    def reload_if_changed(self):
+        """개발 모드용: 파일이 바뀌거나 추가/삭제되었으면 다시 읽음"""
+        files = self.files
+        count = sum(len(names) for _, _, names in os.walk(self.folder))
+        if count != len(files) or any(entry.is_stale() for entry in files.values()):
+            with self._lock:
+                self._scan()
+
+    def url(self, filename):
+        """내용 해시를 넣은 URL (없는 파일은 해시 없이)"""
+        entry = self.files.get(filename)
+        if entry is None:
+            return f"{self.url_prefix}/{filename}"
+        stem, ext = os.path.splitext(filename)
+        return f"{self.url_prefix}/{stem}.{entry.digest[:HASH_LENGTH]}{ext}"
+
+    def webp_srcset(self, filename):
+        """srcset 속성값 ("URL 64w, URL 128w, ...", 변형이 없으면 빈 문자열)"""
+        self.files  # 아직 읽지 않았으면 폴더를 읽음
+        return ", ".join(f"{self.url(name)} {width}w" for width, name in self._variants.get(filename, ()))
+
+    def picture(self, filename, alt, sizes, style=""):
+        """WebP 변형이 있으면 <picture>로 감싼 이미지 태그 (지원하지 않는 브라우저는 원본)"""
+        img = Markup('<img src="{}" alt="{}" style="{}" decoding="async">').format(self.url(filename), alt, style)
+        srcset = self.webp_srcset(filename)
+        if not srcset:
+            return img
+        return Markup('<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>').format(
+            srcset, sizes, img)
+
+    def lookup(self, filename):
+        """요청 경로 → (CachedBody, 해시가 현재 내용과 일치하는지)"""
+        entry = self.files.get(filename)
+        if entry is not None:
+            return entry, False
+        match = HASHED_NAME.match(filename)
+        if match:
+            entry = self.files.get(match["stem"] + match["ext"])
+            if entry is not None:
+                # 배포 중 다른 버전의 해시로 요청이 오면 현재 내용을 주되 오래 캐시하지 않음
+                return entry, entry.digest.startswith(match["hash"])
+        return None, False
+
+    def response(self, filename, request):
+        entry, immutable = self.lookup(filename)
+        if entry is None:
+            return None
+        return entry.response(request, IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE)
+
+
+class PageCache:
+    """요청마다 달라지는 내용이 없는 페이지를 한 번 렌더링해 압축본과 함께 보관
+
+    ETag는 렌더링 결과의 해시이므로 템플릿이나 참조하는 정적 파일이 바뀌면 달라진다.
+    개발 모드(app.debug)에서는 템플릿/정적 파일 변경을 확인해 다시 렌더링한다.
+    """
+
+    def __init__(self, app, assets):
+        self.app = app
+        self.assets = assets
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def page(self, template_name):
+        cached = self._pages.get(template_name)
+        if self.app.debug and cached is not None:
+            self.assets.reload_if_changed()
+            if cached[0] != self.assets.version or cached[1].is_stale():
+                cached = None
+        if cached is None:
+            with self._lock:
+                cached = self._pages[template_name] = (self.assets.version, self._render(template_name))
+        return cached[1]
+
+    def _render(self, template_name):
+        from flask import render_template
+        with self.app.app_context():
+            html = render_template(template_name)
+        path = os.path.join(self.app.template_folder, template_name)
+        last_modified = max(os.path.getmtime(path), self.assets.last_modified)
+        return CachedBody(html.encode("utf-8"), "text/html", last_modified, sources=[path])
+
+    def warm(self, template_names):
+        for name in template_names:
+            self.page(name)
+
+    def response(self, template_name, request):
+        return self.page(template_name).response(request, REVALIDATE_CACHE)
@@ -0,0 +1,188 @@
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+class TTLCache:
+    """만료 시간(TTL)과 최대 크기(LRU 제거)를 갖는 스레드 안전 캐시"""
+
+    def __init__(self, maxsize=512, ttl=600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def normalize_message(text):
+    """캐시 키용 메시지 정규화 (문장부호·이모지 제거, 공백 정리, 소문자화)"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+# 뜻을 뒤집는 부정 표현: 글자 n-gram 유사도로는 "좋아요"/"안 좋아요"가 가까우므로 개수가 같을 때만 유사 일치로 본다
+NEGATION_MARKERS = ("안", "않", "못", "없", "아니", "말고")
+# 영어 부정어 (정규화하면 "don't"는 "don t"가 되므로 "t"도 포함)
+ENGLISH_NEGATIONS = frozenset(("not", "no", "never", "nothing", "without", "dont", "cant", "t"))
+
+
+def polarity_signature(text):
+    """정규화한 메시지의 부정 표현 개수 (부정 어휘 종류별)"""
+    korean = tuple(text.count(marker) for marker in NEGATION_MARKERS)
+    english = sum(1 for word in text.split() if word in ENGLISH_NEGATIONS)
+    return korean + (english,)
+
+
+def embed_message(text, dim=1024):
+    """문자 2·3-gram 해싱으로 만든 L2 정규화 희소 벡터 (외부 모델 없이 로컬 계산)
+
+    띄어쓰기 차이("상사때문에"/"상사 때문에")는 같은 말로 보도록 공백을 빼고 계산한다.
+    """
+    padded = f" {text.replace(' ', '')} "
+    vector = {}
+    for n in (2, 3):
+        for i in range(len(padded) - n + 1):
+            index = zlib.crc32(padded[i:i + n].encode("utf-8")) % dim
+            vector[index] = vector.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+    return {index: w / norm for index, w in vector.items()}
+
+
+class _ResponseEntry:
+    __slots__ = ("vector", "signature", "replies", "expires_at")
+
+    def __init__(self, vector, signature, expires_at):
+        self.vector = vector
+        self.signature = signature
+        self.replies = []
+        self.expires_at = expires_at
+
+
+class SemanticResponseCache:
+    """첫 메시지 응답 캐시: (캐릭터, 정규화된 메시지) 정확 일치 + 유사도 검색
+
+    캐릭터별로 최대 maxsize개의 항목을 LRU로 유지하고, 각 항목은 TTL이 지나면 버린다.
+    항목마다 서로 다른 응답을 variants개까지 모은 뒤부터 그중 하나를 무작위로 돌려준다.
+    n-gram 벡터는 뜻을 모르므로 유사 일치는 부정 표현(polarity_signature)이 같은 항목끼리만 허용한다.
+    """
+
+    def __init__(self, maxsize=512, ttl=3600.0, threshold=0.9, variants=3):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.variants = variants
+        self._entries = {}   # character -> OrderedDict(정규화된 메시지 -> _ResponseEntry)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _find(self, character, key, vector, signature, now):
+        # 호출 전 self._lock을 잡고 있어야 한다
+        entries = self._entries.get(character)
+        if not entries:
+            return None
+
+        entry = entries.get(key)
+        if entry is not None and entry.expires_at >= now:
+            entries.move_to_end(key)
+            return entry
+
+        best_key, best_score = None, self.threshold
+        for other_key, other in list(entries.items()):
+            if other.expires_at < now:
+                del entries[other_key]
+                continue
+            if other.signature != signature:
+                continue
+            score = sum(w * other.vector.get(i, 0.0) for i, w in vector.items())
+            if score >= best_score:
+                best_key, best_score = other_key, score
+        if best_key is None:
+            return None
+        entries.move_to_end(best_key)
+        return entries[best_key]
+
+    def get(self, character, message):
+        key = normalize_message(message)
+        if not key:
+            return None
+        vector = embed_message(key)
+        with self._lock:
+            entry = self._find(character, key, vector, polarity_signature(key), time.monotonic())
+            if entry is None or len(entry.replies) < self.variants:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return random.choice(entry.replies)
+
+    def set(self, character, message, reply):
+        key = normalize_message(message)
+        if not key or not reply:
+            return
+        vector = embed_message(key)
+        signature = polarity_signature(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._find(character, key, vector, signature, now)
+            if entry is None:
+                entries = self._entries.setdefault(character, OrderedDict())
+                entry = entries[key] = _ResponseEntry(vector, signature, now + self.ttl)
+                while len(entries) > self.maxsize:
+                    entries.popitem(last=False)
+            if len(entry.replies) < self.variants and reply not in entry.replies:
+                entry.replies.append(reply)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def create_response_cache():
+    """RESPONSE_CACHE=on일 때만 첫 메시지 응답 캐시 생성 (기본은 사용 안 함)"""
+    if os.getenv('RESPONSE_CACHE', 'off').lower() not in ('1', 'on', 'true'):
+        return None
+    return SemanticResponseCache(
+        maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 512)),
+        ttl=float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+        threshold=float(os.getenv('RESPONSE_CACHE_THRESHOLD', 0.9)),
+        variants=int(os.getenv('RESPONSE_CACHE_VARIANTS', 3)),
+    )
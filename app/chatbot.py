@@ -1,14 +1,98 @@
-import openai
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 import json
+import os
 import re
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import closing
 from datetime import datetime
 
+from aggregates import DashboardAggregator
+from cache import TTLCache
+from context import ContextBuilder
+from events import EventBroker
+from keywords import KeywordExtractor
+from metrics import FALLBACK_TOTAL, SEARCH_SECONDS, STAGE_SECONDS
+from emotion_analyzer import EMOTION_SCHEMA
+from storage import InMemoryConversationStore
+from upstream import ResilientUpstream, UsageStats
+
+# 상담 응답과 감정 분석을 한 번의 호출로 받기 위한 함수 호출(tool) 정의
+COUNSEL_REPLY_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "counsel_reply",
+        "description": "상담 응답과 사용자의 마지막 메시지에 대한 감정 분석 결과를 함께 반환합니다.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "reply": {"type": "string", "description": "사용자에게 보낼 상담 응답 (2-3문장)"},
+                "emotion": EMOTION_SCHEMA
+            },
+            "required": ["reply", "emotion"]
+        }
+    }
+}
+
+# 상담 응답+감정 분석 모드의 고정 지시문 (페르소나 프롬프트 바로 뒤에 두어 접두부를 고정)
+FUSED_INSTRUCTION = {
+    "role": "system",
+    "content": "응답은 반드시 counsel_reply 함수로 반환하고, emotion에는 사용자의 마지막 메시지에 대한 감정 분석 결과를 담으세요."
+}
+
+# 카테고리별 리소스 검색 쿼리 (키워드 추출기의 주제어 사전에도 사용)
+CATEGORY_QUERIES = {
+    'customer': ['고객 스트레스 관리', '민원 대응 방법', '고객 서비스 스킬'],
+    'work': ['직장 스트레스 해소', '동료 관계 개선', '업무 압박 관리'],
+    'personal': ['번아웃 예방', '스트레스 해소법', '마음 건강 관리']
+}
+# 키워드를 뽑지 못했을 때 사용할 기본 키워드
+DEFAULT_KEYWORDS = "스트레스 관리, 심리 상담"
+
 class CounselingChatbot:
-    def __init__(self, api_key):
-        self.client = openai.OpenAI(api_key=api_key)
-        self.conversation_history = {}
+    def __init__(self, api_key, async_upstream=None, store=None, emotion_analyzer=None, response_cache=None,
+                 usage_stats=None, context_builder=None, upstream=None):
+        # 타임아웃/재시도/서킷 브레이커를 거치는 동기 업스트림 (upstream.ResilientUpstream)
+        # (OpenAI 클라이언트는 첫 호출 때 생성)
+        self.upstream = upstream or ResilientUpstream(api_key=api_key)
+        # 비동기 서빙 모드에서 EmotionAnalyzer와 공유하는 업스트림 풀 (upstream.AsyncUpstream)
+        self.async_upstream = async_upstream
+        # 대화 기록 저장소 (storage.ConversationStore)
+        self.store = store or InMemoryConversationStore()
+        # 응답과 감정 분석을 함께 처리할 때 사용하는 EmotionAnalyzer
+        self.emotion_analyzer = emotion_analyzer
+        # 토큰 예산 기반 대화 컨텍스트 구성기 (context.ContextBuilder)
+        self.context = context_builder or ContextBuilder()
+        # 첫 메시지 응답 캐시 (cache.SemanticResponseCache, None이면 사용 안 함)
+        self.response_cache = response_cache
+        # 업스트림 응답의 토큰 사용량 (프롬프트 캐시 적중분 포함)
+        self.usage = usage_stats or UsageStats()
+        # 관리자 대시보드 집계 (메시지 기록 시 증분 갱신, 공유 저장소면 다른 워커의 기록도 주기적으로 반영)
+        self.aggregator = DashboardAggregator(
+            refresh_interval=float(os.getenv('DASHBOARD_REFRESH_SECONDS', 5)) if self.store.shared else None)
+        self.aggregator.load(self.store)
+        # 대시보드 실시간 갱신 채널 ("admin", "user:<user_id>", 스레드를 붙잡는 WSGI 스트림은 워커당 한도)
+        self.events = EventBroker(max_thread_subscribers=int(os.getenv('SSE_MAX_THREAD_STREAMS', 8)))
+
+        # 리소스 검색용 keep-alive 세션(첫 검색 때 생성), 병렬 실행기, 쿼리별 TTL 캐시
+        self._http = None
+        self._http_lock = threading.Lock()
+        # 실행기와 커넥션 풀은 동시에 들어오는 추천 요청 수(SEARCH_MAX_CONCURRENCY) × 요청당 쿼리 수만큼 두어
+        # 동시 추천 요청의 쿼리가 서로 뒤에서 기다리다 마감을 넘기지 않게 함
+        self.search_queries = 5       # 추천 요청 1건의 최대 검색 쿼리 수
+        self.search_concurrency = int(os.getenv('SEARCH_MAX_CONCURRENCY', 4))
+        self.search_pool_size = self.search_queries * self.search_concurrency
+        self.search_executor = ThreadPoolExecutor(max_workers=self.search_pool_size, thread_name_prefix='naver-search')
+        self.search_cache = TTLCache(maxsize=1024, ttl=1800)
+        self.search_timeout = 5       # 검색 요청 1건 타임아웃(초)
+        self.search_deadline = 6.0    # recommend_resources 전체 검색 마감(초, 요청마다 제출 시점부터)
+        # 블로그 검색 주소 (벤치마크에서는 로컬 가짜 검색 페이지로 교체)
+        self.search_url = os.getenv('NAVER_SEARCH_URL', 'https://search.naver.com/search.naver')
+        # 리소스 추천 키워드 추출: local(기본, LLM 호출 없이 TextRank) | llm
+        self.keyword_mode = os.getenv('KEYWORD_EXTRACTOR', 'local')
+        self.keyword_extractor = KeywordExtractor.from_queries(CATEGORY_QUERIES)
         
         # 캐릭터별 페르소나 정의
         self.character_personas = {
@@ -28,18 +112,19 @@ class CounselingChatbot:
                 'specialty': '피로, 무기력, 개인적 번아웃 등 내적 스트레스 상황'
             }
         }
+        
+        # 페르소나별 시스템 프롬프트를 미리 만들어 두어 매 호출 같은 문자열(프롬프트 캐시 접두부)을 사용
+        self.system_prompts = {
+            name: self._compile_system_prompt(info) for name, info in self.character_personas.items()
+        }
 
-    def process_message(self, user_id, message, character=None, category=None):
-        try:
-            # 대화 기록 초기화
-            if user_id not in self.conversation_history:
-                self.conversation_history[user_id] = []
-            
-            # 캐릭터 정보 가져오기
-            character_info = self.character_personas.get(character, self.character_personas['멜랑콜리'])
-            
-            # 시스템 프롬프트 구성
-            system_prompt = f"""당신은 KB HUG의 {character_info['role']}입니다.
+    def _build_system_prompt(self, character):
+        # 미리 만들어 둔 캐릭터 프롬프트 (없는 캐릭터는 멜랑콜리)
+        return self.system_prompts.get(character, self.system_prompts['멜랑콜리'])
+
+    @staticmethod
+    def _compile_system_prompt(character_info):
+        return f"""당신은 KB HUG의 {character_info['role']}입니다.
 
 특징:
 - {character_info['personality']}
@@ -58,33 +143,128 @@ class CounselingChatbot:
 
 응답은 2-3문장으로 간결하게 작성하되, 공감적이고 도움이 되도록 구성하세요."""
 
-            # 대화 기록에 사용자 메시지 추가
-            self.conversation_history[user_id].append({
-                "role": "user",
-                "content": message,
-                "timestamp": datetime.now().isoformat()
+    def _record_message(self, user_id, role, content, category=None, timestamp=None):
+        # 저장소 기록과 대시보드 집계를 함께 갱신
+        with STAGE_SECONDS.time(stage="record"):
+            self.store.append_message(user_id, role, content, category, timestamp=timestamp)
+            self.aggregator.record_message(user_id, role, category, timestamp=timestamp)
+
+        # 열려 있는 대시보드에 변경분 전송
+        user_channel = f"user:{user_id}"
+        if self.events.has_subscribers(user_channel):
+            self.events.publish(user_channel, "message", {
+                "total_conversations": self.store.count_messages(user_id) // 2,
+                "message": {
+                    "role": role,
+                    "content": content,
+                    "timestamp": datetime.fromtimestamp(timestamp or time.time()).isoformat()
+                }
+            })
+        if self.events.has_subscribers("admin"):
+            self.events.publish("admin", "activity", self.aggregator.activity_delta(user_id))
+
+    def _record_session(self, user_id, stress):
+        # 스트레스 점수 집계와 대시보드 변경분 전송
+        self.aggregator.record_session(user_id, stress["current_stress_score"], stress["trend"])
+
+        user_channel = f"user:{user_id}"
+        if self.events.has_subscribers(user_channel):
+            self.events.publish(user_channel, "stress", {
+                "current_stress_score": stress["current_stress_score"],
+                "stress_trend": stress["trend"],
+                "risk_level": stress["risk_level"],
+                "total_sessions": stress["session_count"]
             })
+        if self.events.has_subscribers("admin"):
+            self.events.publish("admin", "session", self.aggregator.session_delta(user_id))
+
+    def _recent_history(self, user_id, exclude_new=False):
+        # 컨텍스트 후보 메시지 (토큰 예산에 맞춰 build에서 다시 잘라냄, 새 메시지 자리 한 칸 제외 가능)
+        with STAGE_SECONDS.time(stage="history"):
+            return self.store.get_messages(user_id, limit=self.context.max_messages - (1 if exclude_new else 0))
+
+    def _chat_messages(self, system_prompt, history, summary="", instruction=None, max_tokens=300):
+        # 고정 접두부(페르소나 프롬프트, 지시문)를 먼저, 바뀌는 요약/대화 기록을 토큰 예산 안에서 뒤에 배치
+        with STAGE_SECONDS.time(stage="context"):
+            return self.context.build(system_prompt, history, summary, instruction=instruction, max_tokens=max_tokens)
+
+    def _first_turn_cache_key(self, user_id, character):
+        # 응답 캐시는 대화 기록이 없는 첫 메시지에만 적용 (페르소나가 같으면 같은 키)
+        if self.response_cache is None or self.store.count_messages(user_id):
+            return None
+        return character if character in self.character_personas else '멜랑콜리'
+
+    def _cached_first_reply(self, user_id, message, cache_key, category=None):
+        # 캐시된 첫 응답이 있으면 API 호출 없이 대화 기록에 저장하고 반환
+        if cache_key is None:
+            return None
+        with STAGE_SECONDS.time(stage="response_cache"):
+            reply = self.response_cache.get(cache_key, message)
+        if reply is not None:
+            self._record_message(user_id, "user", message, category)
+            self._record_message(user_id, "assistant", reply, category)
+        return reply
+
+    # 아래 _begin_*/_finish_* 도우미는 저장소 읽기/쓰기와 토큰 계산을 하므로 비동기 경로에서는 스레드에서 실행한다
+    def _begin_chat_turn(self, user_id, message, character, category):
+        # 첫 메시지 캐시 확인 → (캐시 키, 캐시된 응답, None) 또는 사용자 메시지 기록 뒤 (캐시 키, None, 요청 메시지)
+        cache_key = self._first_turn_cache_key(user_id, character)
+        cached_reply = self._cached_first_reply(user_id, message, cache_key, category)
+        if cached_reply is not None:
+            return cache_key, cached_reply, None
+
+        # 시스템 프롬프트 구성
+        system_prompt = self._build_system_prompt(character)
+
+        # 대화 기록에 사용자 메시지 추가
+        self._record_message(user_id, "user", message, category)
+        messages = self._chat_messages(system_prompt, self._recent_history(user_id), self.store.get_summary(user_id))
+        return cache_key, None, messages
+
+    def _finish_chat_turn(self, user_id, message, category, cache_key, ai_response):
+        # 대화 기록에 AI 응답 추가
+        self._record_message(user_id, "assistant", ai_response, category)
+        if cache_key is not None:
+            self.response_cache.set(cache_key, message, ai_response)
+
+    def _begin_fused_turn(self, user_id, message, character, category):
+        system_prompt = self._build_system_prompt(character)
+        self._record_message(user_id, "user", message, category)
+        return self._fused_request(system_prompt, user_id)
+
+    def _begin_stream_turn(self, user_id, message, character, category):
+        # 스트리밍은 사용자 메시지를 응답과 함께 나중에 기록하므로 새 메시지 자리를 비워 두고 구성
+        cache_key = self._first_turn_cache_key(user_id, character)
+        cached_reply = self._cached_first_reply(user_id, message, cache_key, category)
+        if cached_reply is not None:
+            return cache_key, cached_reply, None
+        system_prompt = self._build_system_prompt(character)
+        history = self._recent_history(user_id, exclude_new=True) + [{"role": "user", "content": message}]
+        return cache_key, None, self._chat_messages(system_prompt, history, self.store.get_summary(user_id))
+
+    def _finish_stream_turn(self, user_id, message, category, user_timestamp, chunks):
+        # 스트림 종료(정상 종료, 오류, 클라이언트 연결 끊김) 시 대화 기록 저장
+        if chunks:
+            self._record_message(user_id, "user", message, category, timestamp=user_timestamp)
+            self._record_message(user_id, "assistant", "".join(chunks), category)
+
+    def process_message(self, user_id, message, character=None, category=None):
+        try:
+            cache_key, cached_reply, messages = self._begin_chat_turn(user_id, message, character, category)
+            if cached_reply is not None:
+                return {"response": cached_reply, "status": "success", "cached": True}
 
             # ChatGPT API 호출
-            response = self.client.chat.completions.create(
+            response = self.upstream.chat(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    *[{"role": msg["role"], "content": msg["content"]} 
-                      for msg in self.conversation_history[user_id][-10:]]  # 최근 10개 메시지만 사용
-                ],
+                messages=messages,
                 max_tokens=300,
                 temperature=0.7
             )
 
+            self.usage.record("chat", response.usage)
             ai_response = response.choices[0].message.content
-
-            # 대화 기록에 AI 응답 추가
-            self.conversation_history[user_id].append({
-                "role": "assistant",
-                "content": ai_response,
-                "timestamp": datetime.now().isoformat()
-            })
+            self._finish_chat_turn(user_id, message, category, cache_key, ai_response)
 
             return {
                 "response": ai_response,
@@ -94,54 +274,225 @@ class CounselingChatbot:
         except Exception as e:
             print(f"ChatGPT API 오류: {str(e)}")  # 디버깅을 위한 로그
             # API 오류 시 다양한 기본 응답 제공
-            return self._generate_smart_response(message, character, user_id)
+            return self._generate_smart_response(message, character, user_id, category)
 
-    def recommend_resources(self, conversation_history, category):
-        # 대화 내용을 바탕으로 관련 리소스를 검색 and 추천
+    def _fused_request(self, system_prompt, user_id):
+        # 상담 응답과 감정 분석 결과를 counsel_reply 함수 인자로 강제
+        messages = self._chat_messages(system_prompt, self._recent_history(user_id),
+                                       self.store.get_summary(user_id), instruction=FUSED_INSTRUCTION, max_tokens=450)
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": messages,
+            "tools": [COUNSEL_REPLY_TOOL],
+            "tool_choice": {"type": "function", "function": {"name": "counsel_reply"}},
+            "max_tokens": 450,
+            "temperature": 0.7
+        }
+
+    def _complete_fused_turn(self, user_id, message, category, response):
+        # counsel_reply 인자를 풀어 대화 기록과 스트레스 점수에 반영
+        self.usage.record("chat_with_emotion", response.usage)
+        arguments = json.loads(response.choices[0].message.tool_calls[0].function.arguments)
+        ai_response = arguments["reply"]
+        emotion = self.emotion_analyzer.normalize_emotion(arguments.get("emotion", {}))
+        emotion["text"] = message
+
+        self._record_message(user_id, "assistant", ai_response, category)
+        with STAGE_SECONDS.time(stage="stress_score"):
+            stress = self.emotion_analyzer.calculate_stress_score(user_id, emotion)
+        self._record_session(user_id, stress)
+
+        return {
+            "response": ai_response,
+            "status": "success",
+            "emotion": emotion,
+            "stress": {
+                "current_stress_score": stress["current_stress_score"],
+                "trend": stress["trend"],
+                "risk_level": stress["risk_level"],
+                "session_count": stress["session_count"]
+            }
+        }
+
+    def process_message_with_emotion(self, user_id, message, character=None, category=None):
+        """상담 응답과 감정 분석을 한 번의 모델 호출로 처리 (emotion_analyzer 필요)"""
         try:
-            # 대화 내용 요약
-            conversation_text = " ".join([
-                f"{msg.get('user', '')} {msg.get('bot', '')}" 
-                for msg in conversation_history
-            ])
+            response = self.upstream.chat(**self._begin_fused_turn(user_id, message, character, category))
+            return self._complete_fused_turn(user_id, message, category, response)
 
-            # 키워드 추출을 위한 프롬프트
-            keyword_prompt = f"""다음 대화 내용에서 핵심 키워드 3-5개를 추출해주세요. 
-            각 키워드는 쉼표로 구분하고, 검색에 적합한 형태로 작성해주세요.
+        except Exception as e:
+            print(f"ChatGPT API 오류: {str(e)}")
+            return self._generate_smart_response(message, character, user_id, category)
 
-            대화 내용: {conversation_text[:500]}...
+    def stream_message(self, user_id, message, character=None, category=None):
+        """응답 토큰을 생성되는 대로 내보내는 스트리밍 버전의 process_message
 
-            키워드:"""
+        대화 기록은 스트림이 끝난 뒤 한 번에 저장된다.
+        """
+        user_timestamp = time.time()
+        cache_key, cached_reply, messages = self._begin_stream_turn(user_id, message, character, category)
+        if cached_reply is not None:
+            yield cached_reply
+            return
 
-            # 키워드 추출
-            keyword_response = self.client.chat.completions.create(
+        try:
+            stream = self.upstream.chat(
                 model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": keyword_prompt}],
-                max_tokens=100,
-                temperature=0.3
+                messages=messages,
+                max_tokens=300,
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True}  # 마지막 청크로 토큰 사용량 수신
             )
+        except Exception as e:
+            print(f"ChatGPT API 오류: {str(e)}")
+            # 스트림 시작 전 오류는 기존 폴백 응답으로 대체
+            yield self._generate_smart_response(message, character, user_id, category)["response"]
+            return
 
-            keywords = keyword_response.choices[0].message.content.strip()
-            
-            # 카테고리별 검색 쿼리 구성
-            category_queries = {
-                'customer': ['고객 스트레스 관리', '민원 대응 방법', '고객 서비스 스킬'],
-                'work': ['직장 스트레스 해소', '동료 관계 개선', '업무 압박 관리'],
-                'personal': ['번아웃 예방', '스트레스 해소법', '마음 건강 관리']
+        chunks = []
+        try:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    self.usage.record("chat_stream", chunk.usage)
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    chunks.append(token)
+                    yield token
+            # 끝까지 받은 응답만 캐시 (중단된 스트림은 제외)
+            if cache_key is not None and chunks:
+                self.response_cache.set(cache_key, message, "".join(chunks))
+        except Exception as e:
+            print(f"ChatGPT 스트리밍 오류: {str(e)}")
+            if not chunks:
+                yield self._generate_smart_response(message, character, user_id, category)["response"]
+                return
+        finally:
+            # 끝까지 읽지 않고 끊긴 스트림(클라이언트 연결 끊김)도 바로 닫아 HTTP 연결을 풀에 돌려줌
+            stream.close()
+            self._finish_stream_turn(user_id, message, category, user_timestamp, chunks)
+
+    async def aprocess_message(self, user_id, message, character=None, category=None):
+        """process_message의 비동기 버전 (async_upstream 필요, 저장소 작업은 스레드에서 실행)"""
+        try:
+            cache_key, cached_reply, messages = await asyncio.to_thread(
+                self._begin_chat_turn, user_id, message, character, category)
+            if cached_reply is not None:
+                return {"response": cached_reply, "status": "success", "cached": True}
+
+            response = await self.async_upstream.chat(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                max_tokens=300,
+                temperature=0.7
+            )
+
+            self.usage.record("chat", response.usage)
+            ai_response = response.choices[0].message.content
+            await asyncio.to_thread(self._finish_chat_turn, user_id, message, category, cache_key, ai_response)
+
+            return {
+                "response": ai_response,
+                "status": "success"
             }
 
-            base_queries = category_queries.get(category, ['스트레스 관리', '심리 상담'])
+        except Exception as e:
+            print(f"ChatGPT API 오류: {str(e)}")
+            return await asyncio.to_thread(self._generate_smart_response, message, character, user_id, category)
+
+    async def aprocess_message_with_emotion(self, user_id, message, character=None, category=None):
+        """process_message_with_emotion의 비동기 버전 (async_upstream 필요, 저장소 작업은 스레드에서 실행)"""
+        try:
+            request = await asyncio.to_thread(self._begin_fused_turn, user_id, message, character, category)
+            response = await self.async_upstream.chat(**request)
+            return await asyncio.to_thread(self._complete_fused_turn, user_id, message, category, response)
+
+        except Exception as e:
+            print(f"ChatGPT API 오류: {str(e)}")
+            return await asyncio.to_thread(self._generate_smart_response, message, character, user_id, category)
+
+    async def astream_message(self, user_id, message, character=None, category=None):
+        """stream_message의 비동기 버전 (async_upstream 필요, 저장소 작업은 스레드에서 실행)"""
+        user_timestamp = time.time()
+        cache_key, cached_reply, messages = await asyncio.to_thread(
+            self._begin_stream_turn, user_id, message, character, category)
+        if cached_reply is not None:
+            yield cached_reply
+            return
+
+        try:
+            stream = await self.async_upstream.chat(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                max_tokens=300,
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True}  # 마지막 청크로 토큰 사용량 수신
+            )
+        except Exception as e:
+            print(f"ChatGPT API 오류: {str(e)}")
+            fallback = await asyncio.to_thread(self._generate_smart_response, message, character, user_id, category)
+            yield fallback["response"]
+            return
+
+        chunks = []
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    self.usage.record("chat_stream", chunk.usage)
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    chunks.append(token)
+                    yield token
+            # 끝까지 받은 응답만 캐시 (중단된 스트림은 제외)
+            if cache_key is not None and chunks:
+                self.response_cache.set(cache_key, message, "".join(chunks))
+        except Exception as e:
+            print(f"ChatGPT 스트리밍 오류: {str(e)}")
+            if not chunks:
+                fallback = await asyncio.to_thread(self._generate_smart_response, message, character, user_id,
+                                                   category)
+                yield fallback["response"]
+                return
+        finally:
+            # 끝까지 읽지 않고 끊긴 스트림도 닫아 업스트림 동시성 permit을 돌려줌
+            await stream.aclose()
+            await asyncio.to_thread(self._finish_stream_turn, user_id, message, category, user_timestamp, chunks)
+
+    def recommend_resources(self, conversation_history, category):
+        # 대화 내용을 바탕으로 관련 리소스를 검색 and 추천
+        try:
+            # 키워드 추출
+            with STAGE_SECONDS.time(stage="keywords"):
+                keywords = self._extract_keywords(conversation_history)
+
+            base_queries = CATEGORY_QUERIES.get(category, ['스트레스 관리', '심리 상담'])
             
             # 검색 쿼리 조합
-            search_queries = [f"{keyword} {base_query}" for keyword in keywords.split(',')[:3] 
+            search_queries = [f"{keyword.strip()} {base_query}" for keyword in keywords.split(',')[:3] 
                             for base_query in base_queries[:2]]
 
             resources = []
             
-            for query in search_queries[:5]:  # 최대 5개 쿼리로 제한
+            # 최대 5개 쿼리를 병렬로 검색하고 이 요청의 마감 시간까지 도착한 결과만 사용
+            with STAGE_SECONDS.time(stage="search"):
+                deadline = time.monotonic() + self.search_deadline
+                futures = [self.search_executor.submit(self._search_naver_blog, query, deadline)
+                           for query in search_queries[:self.search_queries]]
+                wait(futures, timeout=self.search_deadline)
+
+            for future in futures:  # 쿼리 순서 유지
+                if not future.done():
+                    future.cancel()
+                    print("검색 오류: 마감 시간 초과")
+                    continue
                 try:
                     # 후에 더 정교한 api로 발전시키기!
-                    search_results = self._search_naver_blog(query)
+                    search_results = future.result()
                     resources.extend(search_results[:2])  # 쿼리당 2개 결과
                 except Exception as e:
                     print(f"검색 오류: {e}")
@@ -171,93 +522,109 @@ class CounselingChatbot:
             # 기본 리소스 반환
             return {
                 "resources": self._get_default_resources(category),
-                "keywords": "스트레스 관리, 심리 상담",
+                "keywords": DEFAULT_KEYWORDS,
                 "category": category
             }
 
-    def _search_naver_blog(self, query):
-        # 네이버 블로그 검색
+    def _extract_keywords(self, conversation_history):
+        """대화에서 검색 키워드 3-5개 (쉼표로 구분한 문자열)
+
+        기본은 로컬 TextRank 추출(keywords.KeywordExtractor)이라 검색 전에 업스트림을 거치지 않는다.
+        KEYWORD_EXTRACTOR=llm이면 LLM으로 추출하고, 실패하면 로컬 추출로 대신한다.
+        """
+        if self.keyword_mode == 'llm':
+            try:
+                return self._extract_keywords_llm(conversation_history)
+            except Exception as e:
+                print(f"키워드 추출 오류, 로컬 추출 사용: {e}")
+
+        # 사용자 발화를 상담 응답보다 두 배로 반영
+        documents = [(msg.get('user', ''), 2.0) for msg in conversation_history]
+        documents += [(msg.get('bot', ''), 1.0) for msg in conversation_history]
+        keywords = self.keyword_extractor.extract(documents)
+        return ", ".join(keywords) if keywords else DEFAULT_KEYWORDS
+
+    def _extract_keywords_llm(self, conversation_history):
+        # 대화 내용 요약
+        conversation_text = " ".join([
+            f"{msg.get('user', '')} {msg.get('bot', '')}" 
+            for msg in conversation_history
+        ])
+
+        # 키워드 추출을 위한 프롬프트
+        keyword_prompt = f"""다음 대화 내용에서 핵심 키워드 3-5개를 추출해주세요. 
+        각 키워드는 쉼표로 구분하고, 검색에 적합한 형태로 작성해주세요.
+
+        대화 내용: {conversation_text[:500]}...
+
+        키워드:"""
+
+        keyword_response = self.upstream.chat(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": keyword_prompt}],
+            max_tokens=100,
+            temperature=0.3
+        )
+
+        self.usage.record("keywords", keyword_response.usage)
+        return keyword_response.choices[0].message.content.strip()
+
+    @property
+    def http(self):
+        # requests는 첫 검색 때 불러옴
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    # 검색 스레드마다 연결 하나를 쓰므로 풀 크기를 실행기 스레드 수에 맞춤
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.search_pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._http = session
+        return self._http
+
+    def _search_naver_blog(self, query, deadline=None):
+        # 네이버 블로그 검색 (deadline: 요청한 쪽의 마감 시각, time.monotonic 기준)
+        started = time.perf_counter()
         try:
-            import requests
-            from bs4 import BeautifulSoup
-            import urllib.parse
-            import re
-            
+            from search_parser import extract_blog_results
+
+            # 같은 쿼리는 캐시된 결과 재사용
+            cached = self.search_cache.get(query)
+            if cached is not None:
+                return list(cached)
+
+            # 대기열에서 기다리다 마감이 지났으면 검색하지 않고, 남은 시간이 짧으면 타임아웃도 줄임
+            timeout = self.search_timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                timeout = min(timeout, remaining)
+
             # 검색 URL 구성
-            search_url = f"https://search.naver.com/search.naver?where=blog&query={urllib.parse.quote(query)}"
+            search_url = f"{self.search_url}?where=blog&query={urllib.parse.quote(query)}"
             
             # User-Agent 설정
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            # 웹 페이지 요청
-            response = requests.get(search_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            # HTML 파싱
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 블로그 포스트 찾기 (실제 네이버 검색 결과 구조에 맞게 수정)
-            blog_posts = soup.find_all('li', class_='bx')
-            resources = []
-            
-            for post in blog_posts[:4]:  # 최대 4개 결과
-                try:
-                    # 제목과 링크 추출
-                    title_elem = post.find('a', class_='title_link')
-                    if not title_elem:
-                        continue
-                    
-                    title = title_elem.get_text(strip=True)
-                    url = title_elem.get('href', '')
-                    
-                    # 실제 블로그 포스트 URL로 변환 (네이버 검색 결과에서 실제 블로그 URL 추출)
-                    if 'blog.naver.com' in url:
-                        # 이미 실제 블로그 URL인 경우
-                        actual_url = url
-                    else:
-                        # 검색 결과 URL에서 실제 블로그 URL 추출
-                        actual_url = url
-                    
-                    # 설명/미리보기 추출
-                    desc_elem = post.find('div', class_='dsc')
-                    if desc_elem:
-                        description = desc_elem.get_text(strip=True)
-                        # 설명이 너무 길면 자르기
-                        if len(description) > 150:
-                            description = description[:150] + "..."
-                    else:
-                        description = f"{query}에 대한 유용한 정보를 제공하는 블로그 포스트입니다."
-                    
-                    # 블로그명과 날짜 추출
-                    blog_elem = post.find('a', class_='sub_time')
-                    blog_name = blog_elem.get_text(strip=True) if blog_elem else "네이버 블로그"
-                    
-                    # 날짜 추출
-                    date_elem = post.find('span', class_='sub_time')
-                    date = date_elem.get_text(strip=True) if date_elem else ""
-                    
-                    # 썸네일 이미지 추출 (있는 경우)
-                    img_elem = post.find('img')
-                    thumbnail = img_elem.get('src', '') if img_elem else ""
-                    
-                    resources.append({
-                        "title": title,
-                        "url": actual_url,
-                        "description": description,
-                        "type": "blog",
-                        "source": blog_name,
-                        "date": date,
-                        "thumbnail": thumbnail
-                    })
-                    
-                except Exception as e:
-                    print(f"블로그 포스트 파싱 오류: {e}")
-                    continue
-            
+            # 웹 페이지 요청 (본문은 받는 대로 파싱하고 결과 4개가 모이면 나머지는 받지 않음)
+            response = self.http.get(search_url, headers=headers, timeout=timeout, stream=True)
+            with closing(response):
+                response.raise_for_status()
+                # 헤더에 charset이 없으면 requests 기본값(ISO-8859-1) 대신 UTF-8 사용
+                encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else 'utf-8'
+                resources = extract_blog_results(response.iter_content(chunk_size=16384), query,
+                                                 encoding=encoding)
+
             # 결과가 없으면 기본 데이터 반환
             if not resources:
+                SEARCH_SECONDS.observe(time.perf_counter() - started, outcome="empty")
                 return [
                     {
                         "title": f"{query} 관련 블로그 포스트",
@@ -270,10 +637,13 @@ class CounselingChatbot:
                     }
                 ]
             
-            return resources
+            SEARCH_SECONDS.observe(time.perf_counter() - started, outcome="success")
+            self.search_cache.set(query, resources)
+            return list(resources)
             
         except Exception as e:
             print(f"네이버 블로그 검색 오류: {e}")
+            SEARCH_SECONDS.observe(time.perf_counter() - started, outcome="error")
             # 오류 시 기본 데이터 반환
             return [
                 {
@@ -341,20 +711,12 @@ class CounselingChatbot:
         
         return default_resources.get(category, default_resources['personal'])
 
-    def _generate_smart_response(self, message, character, user_id):
+    def _generate_smart_response(self, message, character, user_id, category=None):
          """메시지 내용을 분석하여 다양한 응답 생성"""
          import random
          
-         # 대화 기록 가져오기
-         if user_id not in self.conversation_history:
-             self.conversation_history[user_id] = []
-         
          # 대화 기록에 사용자 메시지 추가
-         self.conversation_history[user_id].append({
-             "role": "user",
-             "content": message,
-             "timestamp": datetime.now().isoformat()
-         })
+         self._record_message(user_id, "user", message, category)
          
          # 메시지 내용 분석
          message_lower = message.lower()
@@ -436,32 +798,29 @@ class CounselingChatbot:
          
          # 응답 카테고리 결정
          if any(keyword in message_lower for keyword in stress_keywords):
-             category = 'stress'
+             response_type = 'stress'
          elif any(keyword in message_lower for keyword in positive_keywords):
-             category = 'support'
+             response_type = 'support'
          elif any(keyword in message_lower for keyword in question_keywords):
-             category = 'question'
+             response_type = 'question'
          else:
-             category = 'greeting'
+             response_type = 'greeting'
          
          # 대화 길이에 따른 응답 조정
-         conversation_length = len(self.conversation_history[user_id])
+         conversation_length = self.store.count_messages(user_id)
          if conversation_length > 4:
-             category = 'question'  # 더 깊이 있는 질문
+             response_type = 'question'  # 더 깊이 있는 질문
          
          # 캐릭터별 응답 선택
          character_response = character_responses.get(character, character_responses['멜랑콜리'])
-         responses = character_response.get(category, character_response['greeting'])
+         responses = character_response.get(response_type, character_response['greeting'])
          
          # 랜덤 응답 선택
          response = random.choice(responses)
+         FALLBACK_TOTAL.inc(response_type=response_type)
          
          # 대화 기록에 AI 응답 추가
-         self.conversation_history[user_id].append({
-             "role": "assistant",
-             "content": response,
-             "timestamp": datetime.now().isoformat()
-         })
+         self._record_message(user_id, "assistant", response, category)
          
          return {
              "response": response,
@@ -470,47 +829,38 @@ class CounselingChatbot:
 
     def get_user_dashboard_data(self, user_id):
         # 사용자 대시보드 데이터
-        if user_id not in self.conversation_history:
-            return {
-                "total_conversations": 0,
-                "recent_messages": [],
-                "mood_trend": []
-            }
-        
-        conversations = self.conversation_history[user_id]
+        message_count = self.store.count_messages(user_id)
+        recent_messages = self.store.get_messages(user_id, limit=20) if message_count else []  # 최근 20개 메시지
+        # 공유 저장소면 다른 워커의 세션도 포함되도록 항상 저장소에서 읽음
+        stats = None if self.store.shared else self.aggregator.user_stats(user_id)
         return {
-            "total_conversations": len(conversations) // 2,  # 사용자-봇 쌍으로 계산
-            "recent_messages": conversations[-20:],  # 최근 20개 메시지
-            "mood_trend": self._analyze_mood_trend(conversations)
+            "total_conversations": message_count // 2,  # 사용자-봇 쌍으로 계산
+            "recent_messages": recent_messages,
+            "mood_trend": self._analyze_mood_trend(user_id),
+            "weekly_mood_trend": self._analyze_mood_trend(user_id, weekly=True),
+            **(stats or self._stored_user_stats(user_id))
         }
 
-    def get_admin_dashboard_data(self):
-        # 관리자 대시보드 데이터
-        total_users = len(self.conversation_history)
-        total_conversations = sum(len(conv) // 2 for conv in self.conversation_history.values())
-        
+    def _stored_user_stats(self, user_id):
+        # 이 프로세스의 집계에 없는 사용자(재시작 직후, 다른 워커가 기록한 사용자)는 저장소의 감정 기록으로 계산
+        recent = self.store.get_emotions(user_id, limit=6)
+        if not recent:
+            return {"current_stress_score": 0.0, "stress_trend": "안정", "total_sessions": 0}
+        scores = [e["stress_score"] for e in recent]
         return {
-            "total_users": total_users,
-            "total_conversations": total_conversations,
-            "category_distribution": self._get_category_distribution(),
-            "recent_activity": self._get_recent_activity()
+            "current_stress_score": scores[-1],
+            "stress_trend": self.emotion_analyzer._calculate_trend(scores) if self.emotion_analyzer else "안정",
+            "total_sessions": self.store.count_emotions(user_id)
         }
 
-    def _analyze_mood_trend(self, conversations):
-        return [{"date": "2025-01-11", "mood": "neutral"}]
-
-    def _get_category_distribution(self):
-        # 카테고리 분포 데이터
-        return [
-            {"category": "고객", "count": 30, "percentage": 40},
-            {"category": "조직·업무", "count": 25, "percentage": 33},
-            {"category": "개인·번아웃", "count": 20, "percentage": 27}
-        ]
-
-    def _get_recent_activity(self):
-        # 최근 활동 데이터
-        return [
-            {"user_id": "user1", "last_activity": "2025-01-11 14:30", "category": "고객"},
-            {"user_id": "user2", "last_activity": "2025-01-11 13:45", "category": "조직·업무"},
-            {"user_id": "user3", "last_activity": "2025-01-11 12:20", "category": "개인·번아웃"}
-        ] 
\ No newline at end of file
+    def get_admin_dashboard_data(self):
+        # 관리자 대시보드 데이터 (증분 집계 스냅샷)
+        return self.aggregator.snapshot()
+
+    def _analyze_mood_trend(self, user_id, days=90, weekly=False):
+        # 감정 분석 시 갱신되는 일간/주간 집계에서 추이를 읽음 (원본 메시지는 훑지 않음)
+        if self.emotion_analyzer is None:
+            return []
+        if weekly:
+            return self.emotion_analyzer.weekly_mood_trend(user_id)
+        return self.emotion_analyzer.mood_trend(user_id, days=days)
@@ -0,0 +1,107 @@
+import os
+
+from cache import TTLCache
+
+# 메시지 하나당 역할/구분자 토큰, 응답 시작 토큰 (OpenAI chat 형식 기준)
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMING_TOKENS = 3
+# 예산을 넘는 최신 메시지의 앞부분을 잘라 냈다는 표시
+TRUNCATION_MARKER = "[앞부분 생략] "
+
+
+def approximate_tokens(text):
+    """tiktoken 없이 쓰는 보수적 근사치: ASCII 4자당 1토큰, 한글 등 그 외 문자는 1자당 1토큰"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def load_token_counter(encoding_name="cl100k_base"):
+    """tiktoken 인코더로 토큰 수를 세는 함수 반환 (설치/로드 실패 시 근사 함수)"""
+    try:
+        import tiktoken
+    except ImportError:  # tiktoken이 없으면 근사 토큰 수 사용
+        return approximate_tokens
+    try:
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        print(f"토크나이저 로드 실패, 근사 토큰 수 사용: {e}")
+        return approximate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class ContextBuilder:
+    """토큰 예산 안에서 최신 메시지부터 채워 넣는 대화 컨텍스트 구성기
+
+    token_budget은 프롬프트와 응답(max_tokens)을 합친 한도다.
+    시스템 프롬프트, 지시문, 요약을 먼저 넣고 남은 예산을 최신 메시지부터 채운다.
+    가장 최근 메시지 하나만으로 예산을 넘으면 뒷부분만 남기고 앞에 생략 표시를 붙인다.
+    메시지별 토큰 수는 내용 문자열 기준으로 캐시한다.
+    """
+
+    def __init__(self, token_budget=4096, max_messages=40, count_tokens=None, cache_size=8192):
+        self.token_budget = token_budget
+        self.max_messages = max_messages  # 저장소에서 한 번에 가져올 최대 메시지 수
+        # 토크나이저는 처음 셀 때 불러옴 (인코딩 파일 로드가 느림)
+        self._count_tokens = count_tokens
+        self._token_cache = TTLCache(maxsize=cache_size, ttl=24 * 3600)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            token_budget=int(os.getenv('CONTEXT_TOKEN_BUDGET', 4096)),
+            max_messages=int(os.getenv('CONTEXT_MAX_MESSAGES', 40)),
+        )
+
+    def _counter(self):
+        if self._count_tokens is None:
+            self._count_tokens = load_token_counter()
+        return self._count_tokens
+
+    def count(self, text):
+        tokens = self._token_cache.get(text)
+        if tokens is None:
+            tokens = self._counter()(text)
+            self._token_cache.set(text, tokens)
+        return tokens
+
+    def truncate(self, text, max_tokens):
+        """생략 표시를 포함해 max_tokens 안에 들어가는 가장 긴 뒷부분 (이분 탐색, 잘라 본 문자열은 캐시하지 않음)"""
+        count = self._counter()
+        low, high = 0, len(text)
+        while low < high:
+            keep = (low + high + 1) // 2
+            if count(TRUNCATION_MARKER + text[len(text) - keep:]) <= max_tokens:
+                low = keep
+            else:
+                high = keep - 1
+        return TRUNCATION_MARKER + text[len(text) - low:]
+
+    def message_tokens(self, message):
+        return self.count(message["content"]) + TOKENS_PER_MESSAGE
+
+    def build(self, system_prompt, history, summary="", instruction=None, max_tokens=300):
+        """[시스템 프롬프트, 지시문, 요약, 예산 안의 최근 메시지] 순서의 메시지 배열 반환"""
+        messages = [{"role": "system", "content": system_prompt}]
+        if instruction:
+            messages.append(instruction)
+        if summary:
+            # 최근 기록에서 밀려난 이전 대화 요약
+            messages.append({"role": "system", "content": f"이전 대화 요약:\n{summary}"})
+
+        remaining = self.token_budget - max_tokens - REPLY_PRIMING_TOKENS
+        remaining -= sum(self.message_tokens(msg) for msg in messages)
+
+        selected = []
+        for msg in reversed(history):
+            tokens = self.message_tokens(msg)
+            if tokens > remaining:
+                if not selected:
+                    # 가장 최근 메시지(현재 사용자 입력)는 빼지 않고 남은 예산에 맞게 뒷부분만 보냄
+                    content = self.truncate(msg["content"], remaining - TOKENS_PER_MESSAGE)
+                    selected.append({"role": msg["role"], "content": content})
+                break
+            selected.append({"role": msg["role"], "content": msg["content"]})
+            remaining -= tokens
+
+        messages.extend(reversed(selected))
+        return messages
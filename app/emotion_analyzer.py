@@ -1,40 +1,44 @@
 import json
+import re
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
-from openai import OpenAI
 import os
 
-class EmotionAnalyzer:
-    def __init__(self, api_key: str):
-        """감정 분석기 초기화"""
-        self.client = OpenAI(api_key=api_key)
-        self.emotion_categories = {
-            "긍정": ["기쁨", "만족", "희망", "감사", "사랑"],
-            "부정": ["슬픔", "실망", "우울", "절망", "고독"],
-            "분노": ["화남", "짜증", "분노", "적대감", "원망"],
-            "불안": ["걱정", "불안", "긴장", "두려움", "스트레스"],
-            "중립": ["평온", "무관심", "차분함", "평범함"]
-        }
-        
-        # 사용자별 데이터 저장 (실제로는 데이터베이스 사용)
-        self.user_data = {}
-        
-    def analyze_emotion(self, text: str) -> Dict:
-        """텍스트에서 감정 분석 수행"""
-        prompt = f"""
-다음 텍스트의 감정을 분석해주세요:
+from records import EmotionRecord
+from rollups import MoodRollups
+from storage import InMemoryConversationStore
+from upstream import CircuitOpen, ResilientUpstream, UsageStats
 
-텍스트: "{text}"
+# 감정 분석 결과 JSON 스키마 (상담 응답과 함께 한 번의 호출로 받을 때 사용)
+EMOTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "primary_emotion": {"type": "string", "enum": ["긍정", "부정", "분노", "불안", "중립"]},
+        "emotion_intensity": {"type": "integer", "minimum": 1, "maximum": 10, "description": "감정 강도 (1-10)"},
+        "specific_emotions": {"type": "array", "items": {"type": "string"}, "description": "구체적인 감정들"},
+        "stress_level": {"type": "integer", "minimum": 1, "maximum": 10, "description": "스트레스 수준 (1-10)"},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1, "description": "분석 신뢰도 (0.0-1.0)"}
+    },
+    "required": ["primary_emotion", "emotion_intensity", "specific_emotions", "stress_level", "confidence"]
+}
 
-다음 JSON 형식으로 응답해주세요:
-{{
+NEGATIVE_EMOTIONS = ("부정", "분노", "불안")
+
+# 감정 분석 지시문 (매 호출 같은 문자열이라 업스트림 프롬프트 캐시 접두부로 재사용됨)
+EMOTION_SYSTEM_PROMPT = """당신은 전문적인 감정 분석 AI입니다. 정확하고 객관적으로 감정을 분석해주세요.
+
+사용자가 보내는 텍스트의 감정을 분석하고, 다음 JSON 형식으로 응답해주세요:
+{
     "primary_emotion": "주요 감정 (긍정/부정/분노/불안/중립)",
     "emotion_intensity": 감정 강도 (1-10),
     "specific_emotions": ["구체적인 감정들"],
     "stress_level": 스트레스 수준 (1-10),
     "confidence": 분석 신뢰도 (0.0-1.0)
-}}
+}
 
 감정 강도 기준:
 - 1-3: 약함
@@ -43,77 +47,558 @@ class EmotionAnalyzer:
 - 9-10: 매우 강함
 """
 
+BATCH_EMOTION_SYSTEM_PROMPT = """당신은 전문적인 감정 분석 AI입니다. 정확하고 객관적으로 감정을 분석해주세요.
+
+사용자가 보내는 JSON 배열의 각 텍스트에 대해 감정을 분석하고, 다음 JSON 형식으로 입력의 모든 index에 대해 하나씩 응답해주세요:
+{
+    "results": [
+        {
+            "index": 입력 index,
+            "primary_emotion": "주요 감정 (긍정/부정/분노/불안/중립)",
+            "emotion_intensity": 감정 강도 (1-10),
+            "specific_emotions": ["구체적인 감정들"],
+            "stress_level": 스트레스 수준 (1-10),
+            "confidence": 분석 신뢰도 (0.0-1.0)
+        }
+    ]
+}
+"""
+
+
+class _StressState:
+    """사용자별 스트레스 점수 계산용 증분 상태
+
+    최근 30일 감정 9개(현재 감정과 합쳐 10개)와 부정 감정 수, 최근 7일 세션 시각,
+    최근 점수 6개, 전체 세션 수를 유지해 호출마다 전체 기록을 다시 훑지 않는다.
+    감정은 records.EmotionRecord로, 시각은 epoch 초로 보관한다.
+    version은 마지막으로 맞춘 저장소 기록의 (세션 수, 마지막 시각)이고, lock은 같은 사용자의 동시 갱신을 막는다.
+    """
+
+    __slots__ = ("emotions", "negative_count", "week_sessions", "scores", "session_count", "version", "lock")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.emotions = deque()
+        self.negative_count = 0
+        self.week_sessions = deque()
+        self.scores = deque(maxlen=6)
+        self.session_count = 0
+        self.version = None
+
+    def _pop_emotion(self):
+        record = self.emotions.popleft()
+        if record.primary_emotion in NEGATIVE_EMOTIONS:
+            self.negative_count -= 1
+
+    def expire(self, now: datetime) -> None:
+        month_ago = (now - timedelta(days=30)).timestamp()
+        while self.emotions and self.emotions[0].timestamp <= month_ago:
+            self._pop_emotion()
+        week_ago = (now - timedelta(days=7)).timestamp()
+        while self.week_sessions and self.week_sessions[0] <= week_ago:
+            self.week_sessions.popleft()
+
+    def add(self, record: EmotionRecord) -> None:
+        self.emotions.append(record)
+        if record.primary_emotion in NEGATIVE_EMOTIONS:
+            self.negative_count += 1
+        while len(self.emotions) > 9:
+            self._pop_emotion()
+        self.week_sessions.append(record.timestamp)
+        self.scores.append(record.stress_score)
+        self.session_count += 1
+        self.version = (self.session_count, record.timestamp)
+
+
+class LexiconEmotionClassifier:
+    """한국어 감정 어휘 사전 기반의 로컬 감정 분류기
+
+    어절마다 사전 어간(부분 문자열) 일치를 찾아 감정 범주별 점수를 합산하고,
+    강조어/부정어를 반영해 analyze_emotion과 같은 형태의 결과를 돌려준다.
+    부정어 없이 일치한 어간이 있을 때만 높은 신뢰도를 주고, 위기 표현은 항상 모델로 넘긴다.
+    """
+
+    # 감정 범주별 어간: (가중치, 세부 감정 이름) (_generate_smart_response의 키워드 포함)
+    LEXICON = {
+        "긍정": {"좋아": (1.0, "기쁨"), "좋았": (1.0, "기쁨"), "좋네": (1.0, "기쁨"), "좋지": (1.0, "기쁨"),
+                "좋은": (0.8, "기쁨"), "좋다": (1.0, "기쁨"), "행복": (1.2, "행복"), "기쁘": (1.2, "기쁨"),
+                "기뻐": (1.2, "기쁨"), "감사": (1.0, "감사"), "고마": (1.0, "감사"), "고맙": (1.0, "감사"),
+                "만족": (1.0, "만족"), "편안": (1.0, "편안함"), "즐거": (1.0, "즐거움"), "즐겁": (1.0, "즐거움"),
+                "신나": (1.0, "즐거움"), "뿌듯": (1.2, "뿌듯함"), "설레": (0.8, "설렘"), "다행": (0.8, "안도"),
+                "희망": (0.8, "희망"), "사랑": (1.0, "사랑"), "괜찮아졌": (1.0, "안도"), "나아졌": (1.0, "안도"),
+                "의욕": (0.6, "의욕")},
+        "부정": {"슬프": (1.2, "슬픔"), "슬퍼": (1.2, "슬픔"), "우울": (1.5, "우울"), "외로": (1.2, "외로움"),
+                "외롭": (1.2, "외로움"), "실망": (1.0, "실망"), "허무": (1.0, "허무함"), "절망": (1.5, "절망"),
+                "눈물": (1.0, "슬픔"), "울고": (1.0, "슬픔"), "울었": (1.0, "슬픔"), "지쳐": (1.0, "지침"),
+                "지친": (1.0, "지침"), "지쳤": (1.0, "지침"), "무기력": (1.2, "무기력"), "힘들": (1.0, "힘듦"),
+                "힘든": (1.0, "힘듦"), "힘드": (1.0, "힘듦"), "피곤": (0.8, "피로"), "번아웃": (1.2, "번아웃"),
+                "포기": (1.0, "포기"), "공허": (1.0, "공허함")},
+        "분노": {"화나": (1.2, "화남"), "화가": (1.2, "화남"), "화났": (1.2, "화남"), "짜증": (1.2, "짜증"),
+                "열받": (1.5, "분노"), "빡치": (1.5, "분노"), "빡쳐": (1.5, "분노"), "억울": (1.2, "억울함"),
+                "분노": (1.5, "분노"), "원망": (1.2, "원망"), "폭언": (1.0, "모욕감"), "무시": (0.8, "무시당함"),
+                "갑질": (1.2, "모욕감"), "어이없": (1.0, "황당함"), "미치겠": (1.0, "분노"), "싫어": (0.8, "싫음")},
+        "불안": {"불안": (1.5, "불안"), "걱정": (1.2, "걱정"), "긴장": (1.0, "긴장"), "두려": (1.2, "두려움"),
+                "두렵": (1.2, "두려움"), "무서": (1.2, "두려움"), "무섭": (1.2, "두려움"), "초조": (1.2, "초조함"),
+                "스트레스": (1.0, "스트레스"), "압박": (1.0, "압박감"), "답답": (1.0, "답답함"), "떨려": (1.0, "긴장"),
+                "떨리": (1.0, "긴장"), "막막": (1.0, "막막함"), "마감": (0.6, "압박감"), "실수": (0.6, "걱정"),
+                "잘릴": (1.2, "두려움")},
+        "중립": {"그냥": (0.5, "평범함"), "평범": (0.8, "평범함"), "보통": (0.8, "평범함"), "괜찮": (0.6, "안정"),
+                "무난": (0.8, "평범함"), "차분": (0.8, "차분함"), "평온": (1.0, "평온")}
+    }
+
+    # 자해/자살/폭력 등 위기 표현 (공백을 뺀 본문에서 찾음): 로컬 결과와 무관하게 항상 모델로 확인
+    CRISIS_TERMS = ("죽고싶", "죽을래", "죽어버리", "죽고말", "자살", "자해", "살기싫", "살고싶지않", "사라지고싶",
+                    "없어지고싶", "목숨", "유서", "뛰어내리", "목을매", "손목을", "죽이", "죽여", "때렸", "때려",
+                    "때리", "맞았", "폭행", "폭력", "성희롱", "성추행", "스토킹", "협박")
+
+    INTENSIFIERS = ("너무", "정말", "진짜", "매우", "엄청", "완전", "많이", "계속", "항상", "매일", "너무나", "도저히")
+    # 어간 뒤(같은 어절 나머지)에 붙거나 다음 어절 맨 앞에 오는 부정 표현 (좋지 않아, 의욕이 없어, 걱정없어)
+    NEGATORS = ("않", "없", "못")
+    # 어간 앞 어절이 이것이면 부정 (안 좋아, 못 참겠어), 어절 앞에 붙은 "안"도 부정 (안좋아)
+    PRE_NEGATORS = ("안", "못")
+    # 부정된 범주가 바뀌는 방향: 긍정/중립 표현의 부정은 부정 감정, 부정적 감정의 부정은 근거에서 뺀다
+    NEGATED_CATEGORY = {"긍정": "부정", "중립": "부정"}
+
+    # 범주별 기본 스트레스 수준
+    BASE_STRESS = {"긍정": 2, "중립": 3, "부정": 6, "분노": 7, "불안": 7}
+    # 근거가 부족할 때의 신뢰도 (모델 호출 기준보다 낮게)
+    LOW_CONFIDENCE = 0.3
+
+    def __init__(self):
+        self._stem_category = {}
+        for category, stems in self.LEXICON.items():
+            for stem, (weight, name) in stems.items():
+                self._stem_category[stem] = (category, weight, name)
+        # 긴 어간이 먼저 일치하도록 길이 내림차순으로 하나의 정규식으로 컴파일
+        stems = sorted(self._stem_category, key=len, reverse=True)
+        self._stem_pattern = re.compile("|".join(re.escape(stem) for stem in stems))
+        self._intensifier_pattern = re.compile("|".join(self.INTENSIFIERS))
+        self._crisis_pattern = re.compile("|".join(self.CRISIS_TERMS))
+
+    def is_crisis(self, text: str) -> bool:
+        return self._crisis_pattern.search(re.sub(r"\s+", "", text)) is not None
+
+    def _negated(self, text: str, start: int, end: int) -> bool:
+        """어간 주변에 부정 표현이 있는지 (같은 어절의 나머지, 다음 어절 앞, 앞 어절)"""
+        word_end = end
+        while word_end < len(text) and not text[word_end].isspace():
+            word_end += 1
+        rest = text[end:word_end]
+        following = text[word_end:].split(None, 1)
+        if any(n in rest for n in self.NEGATORS):
+            return True
+        if following and following[0].startswith(self.NEGATORS):
+            return True
+        word_start = start
+        while word_start > 0 and not text[word_start - 1].isspace():
+            word_start -= 1
+        if text[word_start:start] in self.PRE_NEGATORS:
+            return True
+        preceding = text[:word_start].split()
+        return bool(preceding) and preceding[-1] in self.PRE_NEGATORS
+
+    def classify(self, text: str) -> Dict:
+        if self.is_crisis(text):
+            # 위기 표현: 모델 호출이 실패해도 높은 스트레스로 기록되도록 보수적으로 채움
+            return {
+                "primary_emotion": "부정",
+                "emotion_intensity": 9,
+                "specific_emotions": ["위기"],
+                "stress_level": 9,
+                "confidence": 0.0,
+                "crisis": True
+            }
+
+        scores = dict.fromkeys(self.LEXICON, 0.0)
+        specific = []
+        plain_matches = 0
+
+        for match in self._stem_pattern.finditer(text):
+            category, weight, name = self._stem_category[match.group()]
+            if self._negated(text, match.start(), match.end()):
+                category = self.NEGATED_CATEGORY.get(category)
+                if category is None:
+                    # "불안하지 않아요": 부정적 감정의 근거로 쓰지 않는다
+                    continue
+                name = f"{name} 없음"
+            else:
+                plain_matches += 1
+            scores[category] += weight
+            specific.append(name)
+
+        total = sum(scores.values())
+        if total == 0:
+            # 감정 단서가 없으면 판단하지 않고 모델로 넘긴다
+            return {
+                "primary_emotion": "중립",
+                "emotion_intensity": 2,
+                "specific_emotions": [],
+                "stress_level": self.BASE_STRESS["중립"],
+                "confidence": self.LOW_CONFIDENCE
+            }
+
+        intensifiers = len(self._intensifier_pattern.findall(text))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        primary, top = ranked[0]
+        margin = (top - ranked[1][1]) / total
+
+        confidence = 0.45 + 0.35 * margin + 0.05 * min(len(specific), 3)
+        if len(text) > 80:
+            # 긴 글은 문맥이 복잡할 수 있어 신뢰도를 낮춘다
+            confidence *= 0.8
+        if not plain_matches:
+            # 부정어로 뒤집은 근거뿐이면 모델로 확인
+            confidence = min(confidence, self.LOW_CONFIDENCE)
+
+        intensity = 3 + 1.5 * top + intensifiers
+        stress = self.BASE_STRESS[primary] + (intensifiers if primary != "긍정" else 0)
+
+        return {
+            "primary_emotion": primary,
+            "emotion_intensity": int(min(max(round(intensity), 1), 10)),
+            "specific_emotions": list(dict.fromkeys(specific))[:5],
+            "stress_level": int(min(max(stress, 1), 10)),
+            "confidence": round(min(confidence, 0.95), 2)
+        }
+
+
+class EmotionAnalyzer:
+    def __init__(self, api_key: str, async_upstream=None, store=None, local_confidence_threshold: float = 0.7,
+                 usage_stats: Optional[UsageStats] = None, upstream: Optional[ResilientUpstream] = None):
+        """감정 분석기 초기화"""
+        # 타임아웃/재시도/서킷 브레이커를 거치는 동기 업스트림 (CounselingChatbot과 공유 가능)
+        # (OpenAI 클라이언트는 첫 호출 때 생성)
+        self.upstream = upstream or ResilientUpstream(api_key=api_key)
+        # 비동기 서빙 모드에서 CounselingChatbot과 공유하는 업스트림 풀
+        self.async_upstream = async_upstream
+        # 업스트림 응답의 토큰 사용량 (CounselingChatbot과 공유 가능)
+        self.usage = usage_stats or UsageStats()
+        self.emotion_categories = {
+            "긍정": ["기쁨", "만족", "희망", "감사", "사랑"],
+            "부정": ["슬픔", "실망", "우울", "절망", "고독"],
+            "분노": ["화남", "짜증", "분노", "적대감", "원망"],
+            "불안": ["걱정", "불안", "긴장", "두려움", "스트레스"],
+            "중립": ["평온", "무관심", "차분함", "평범함"]
+        }
+        
+        # 로컬 분류 신뢰도가 이 값 이상이면 API를 호출하지 않는다 (1.0 초과면 항상 API 사용)
+        self.lexicon = LexiconEmotionClassifier()
+        self.local_confidence_threshold = local_confidence_threshold
+        
+        # 사용자별 감정/세션 기록 저장소 (storage.ConversationStore)
+        self.store = store or InMemoryConversationStore()
+        
+        # 사용자별 증분 스트레스 상태 (저장소에서 한 번 불러온 뒤 갱신, LRU로 크기 제한)
+        self._stress_states = OrderedDict()
+        self._stress_states_lock = threading.Lock()
+        self.max_stress_states = 10000
+        
+        # 사용자별 일간/주간 감정·스트레스 집계 (대시보드 감정 추이용)
+        self.mood_rollups = MoodRollups(days=90)
+        
+    def _emotion_messages(self, text: str) -> List[Dict]:
+        """감정 분석 요청 메시지 구성 (고정 지시문 뒤에 분석할 텍스트만 붙임)"""
+        return [
+            {"role": "system", "content": EMOTION_SYSTEM_PROMPT},
+            {"role": "user", "content": f'텍스트: "{text}"'}
+        ]
+
+    def _failed_analysis(self) -> Dict:
+        """분석 실패 시 기본 결과"""
+        return {
+            "primary_emotion": "중립",
+            "emotion_intensity": 5,
+            "specific_emotions": ["분석 실패"],
+            "stress_level": 5,
+            "confidence": 0.0
+        }
+
+    def normalize_emotion(self, emotion: Dict) -> Dict:
+        """모델이 돌려준 감정 분석 결과의 누락값/범위를 보정"""
+        result = self._failed_analysis()
+        result["specific_emotions"] = []
+        result.update({k: v for k, v in emotion.items() if v is not None})
+
+        if result["primary_emotion"] not in self.emotion_categories:
+            result["primary_emotion"] = "중립"
+        for key in ("emotion_intensity", "stress_level"):
+            try:
+                result[key] = min(max(int(result[key]), 1), 10)
+            except (TypeError, ValueError):
+                result[key] = 5
+        try:
+            result["confidence"] = min(max(float(result["confidence"]), 0.0), 1.0)
+        except (TypeError, ValueError):
+            result["confidence"] = 0.0
+        return result
+
+    def _upstream_fallback(self, local: Optional[Dict]) -> Dict:
+        """업스트림 오류 시 결과: 위기 표현은 로컬 결과(높은 스트레스)를 그대로, 나머지는 실패 결과"""
+        if local is not None and local.get("crisis"):
+            return local
+        return self._failed_analysis()
+
+    def _local_is_enough(self, local: Dict) -> bool:
+        """로컬 분류 결과만으로 충분한지 (위기 표현은 신뢰도 기준과 무관하게 항상 모델로 확인)"""
+        return not local.get("crisis") and local["confidence"] >= self.local_confidence_threshold
+
+    def analyze_emotion(self, text: str) -> Dict:
+        """텍스트에서 감정 분석 수행 (로컬 분류 신뢰도가 낮을 때만 API 호출)"""
+        local = self.lexicon.classify(text)
+        if self._local_is_enough(local):
+            return local
+
         try:
-            response = self.client.chat.completions.create(
+            response = self.upstream.chat(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "당신은 전문적인 감정 분석 AI입니다. 정확하고 객관적으로 감정을 분석해주세요."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._emotion_messages(text),
                 temperature=0.3
             )
+            self.usage.record("emotion", response.usage)
             
             result = json.loads(response.choices[0].message.content)
             return result
             
+        except CircuitOpen:
+            # 업스트림 장애 중에는 기다리지 않고 로컬 분류 결과로 대체
+            return local
         except Exception as e:
             print(f"감정 분석 중 오류 발생: {e}")
-            return {
-                "primary_emotion": "중립",
-                "emotion_intensity": 5,
-                "specific_emotions": ["분석 실패"],
-                "stress_level": 5,
-                "confidence": 0.0
-            }
+            return self._upstream_fallback(local)
+
+    async def aanalyze_emotion(self, text: str) -> Dict:
+        """analyze_emotion의 비동기 버전 (async_upstream 필요)"""
+        local = self.lexicon.classify(text)
+        if self._local_is_enough(local):
+            return local
+
+        try:
+            response = await self.async_upstream.chat(
+                model="gpt-3.5-turbo",
+                messages=self._emotion_messages(text),
+                temperature=0.3
+            )
+            self.usage.record("emotion", response.usage)
+
+            return json.loads(response.choices[0].message.content)
+
+        except CircuitOpen:
+            # 업스트림 장애 중에는 기다리지 않고 로컬 분류 결과로 대체
+            return local
+        except Exception as e:
+            print(f"감정 분석 중 오류 발생: {e}")
+            return self._upstream_fallback(local)
+
+    def _batch_request(self, items: List[Tuple[int, str]]) -> Dict:
+        """여러 텍스트를 인덱스와 함께 한 번에 분석하는 요청 본문 구성"""
+        payload = json.dumps([{"index": index, "text": text} for index, text in items], ensure_ascii=False)
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [
+                {"role": "system", "content": BATCH_EMOTION_SYSTEM_PROMPT},
+                {"role": "user", "content": payload}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.3
+        }
+
+    def _parse_batch_content(self, content: str, results: List[Dict], indexes) -> None:
+        """응답의 results 항목을 index 위치에 채운다 (이 요청으로 보낸 indexes만, 나머지 index는 무시)"""
+        for item in json.loads(content).get("results", []):
+            index = item.pop("index", None)
+            if type(index) is int and index in indexes:
+                results[index] = self.normalize_emotion(item)
+            else:
+                print(f"배치 감정 분석 결과의 잘못된 index 무시: {index!r}")
+
+    def analyze_batch(self, texts: List[str], chunk_size: int = 20, max_concurrency: int = 4,
+                      requests_per_minute: int = 60) -> List[Dict]:
+        """여러 텍스트를 묶어서 감정 분석 (입력 순서대로 반환)
+
+        로컬 분류로 충분한 텍스트는 API를 거치지 않고, 나머지는 chunk_size개씩 묶어
+        최대 max_concurrency개 요청을 동시에 보내되 분당 requests_per_minute개를 넘지 않는다.
+        분석하지 못한 항목은 analyze_emotion의 실패 결과로(위기 표현은 로컬 결과로) 채운다.
+        """
+        results = [None] * len(texts)
+        pending = []
+        crisis = {}
+        for index, text in enumerate(texts):
+            local = self.lexicon.classify(text)
+            if self._local_is_enough(local):
+                results[index] = local
+            else:
+                pending.append((index, text))
+                if local.get("crisis"):
+                    crisis[index] = local
+
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        lock = threading.Lock()
+        next_slot = [time.monotonic()]
+
+        def run_chunk(chunk):
+            # 요청 시작 간격을 interval 이상으로 벌려 분당 요청 수 제한
+            with lock:
+                start_at = next_slot[0]
+                next_slot[0] = max(start_at, time.monotonic()) + interval
+            delay = start_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                response = self.upstream.chat(**self._batch_request(chunk))
+                self.usage.record("emotion_batch", response.usage)
+                self._parse_batch_content(response.choices[0].message.content, results,
+                                          {index for index, _ in chunk})
+            except Exception as e:
+                print(f"배치 감정 분석 중 오류 발생: {e}")
+
+        if chunks:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                list(executor.map(run_chunk, chunks))
+
+        return [result if result is not None else self._upstream_fallback(crisis.get(index))
+                for index, result in enumerate(results)]
+
+    def write_batch_file(self, texts: List[str], path: str, chunk_size: int = 20) -> int:
+        """오프라인 처리용 OpenAI Batch API 입력(JSONL) 파일 생성, 요청 수 반환"""
+        items = list(enumerate(texts))
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for start in range(0, len(items), chunk_size):
+                request = {
+                    "custom_id": f"emotion-{start}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._batch_request(items[start:start + chunk_size])
+                }
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def read_batch_results(self, path: str, total: int, chunk_size: int = 20) -> List[Dict]:
+        """Batch API 결과(JSONL) 파일을 읽어 입력 순서대로 반환 (chunk_size는 write_batch_file과 같은 값)"""
+        results = [None] * total
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    content = record["response"]["body"]["choices"][0]["message"]["content"]
+                    # custom_id "emotion-<시작 index>"로 이 요청에 들어 있던 index 범위를 복원
+                    start = int(record["custom_id"].rsplit("-", 1)[1])
+                    self._parse_batch_content(content, results, range(start, min(start + chunk_size, total)))
+                except Exception as e:
+                    print(f"배치 결과 파싱 중 오류 발생: {e}")
+        return [result if result is not None else self._failed_analysis() for result in results]
     
+    def _stress_state(self, user_id: str) -> _StressState:
+        """사용자의 증분 상태 (처음이면 빈 상태, 저장소 기록은 _sync_stress_state에서 불러옴)"""
+        with self._stress_states_lock:
+            state = self._stress_states.get(user_id)
+            if state is not None:
+                self._stress_states.move_to_end(user_id)
+                return state
+            state = self._stress_states[user_id] = _StressState()
+            while len(self._stress_states) > self.max_stress_states:
+                self._stress_states.popitem(last=False)
+            return state
+
+    def _sync_stress_state(self, user_id: str, state: _StressState, current_time: datetime) -> None:
+        """처음이거나 다른 프로세스가 공유 저장소에 기록을 더했으면 저장소에서 다시 불러옴 (state.lock 안에서 호출)"""
+        if state.version is not None and not self.store.shared:
+            return  # 이 프로세스만 기록하는 저장소는 한 번 불러온 뒤 증분 갱신으로 충분
+        version = self.store.emotion_version(user_id)
+        if state.version == version:
+            return
+
+        state.reset()
+        month_ago = current_time - timedelta(days=30)
+        for e in self.store.get_emotions(user_id, since=month_ago, limit=9):
+            state.emotions.append(EmotionRecord.from_emotion(e["timestamp"].timestamp(), e["emotion"],
+                                                             e["stress_score"]))
+            if e["emotion"].get("primary_emotion") in NEGATIVE_EMOTIONS:
+                state.negative_count += 1
+        state.week_sessions.extend(
+            e["timestamp"].timestamp()
+            for e in self.store.get_emotions(user_id, since=current_time - timedelta(days=7))
+        )
+        state.scores.extend(e["stress_score"] for e in self.store.get_emotions(user_id, limit=6))
+        state.session_count = self.store.count_emotions(user_id)
+        state.version = version
+
     def calculate_stress_score(self, user_id: str, current_emotion: Dict) -> Dict:
-        """스트레스 점수 계산"""
-        if user_id not in self.user_data:
-            self.user_data[user_id] = {
-                "sessions": [],
-                "emotion_history": [],
-                "stress_scores": []
-            }
-        
-        user = self.user_data[user_id]
-        current_time = datetime.now()
-        
-        # 현재 감정 데이터 저장
-        emotion_data = {
-            "timestamp": current_time,
-            "emotion": current_emotion,
-            "text": current_emotion.get("text", "")
-        }
-        user["emotion_history"].append(emotion_data)
-        
-        # 최근 30일 데이터만 유지
-        cutoff_date = current_time - timedelta(days=30)
-        user["emotion_history"] = [
-            e for e in user["emotion_history"] 
-            if e["timestamp"] > cutoff_date
-        ]
-        
-        # 스트레스 점수 계산
-        stress_score = self._compute_stress_score(user, current_emotion)
-        
-        # 세션 정보 업데이트
-        session_data = {
-            "timestamp": current_time,
-            "stress_score": stress_score,
-            "emotion": current_emotion
-        }
-        user["sessions"].append(session_data)
-        user["stress_scores"].append(stress_score)
-        
+        """스트레스 점수 계산 (사용자 기록 길이와 무관하게 상수 시간)"""
+        state = self._stress_state(user_id)
+        # 같은 사용자의 동시 요청이 만료/추가를 겹쳐 실행하지 않도록 사용자별 잠금
+        with state.lock:
+            current_time = datetime.now()
+            self._sync_stress_state(user_id, state, current_time)
+            previous_version = state.version
+
+            # 최근 30일/7일 범위를 벗어난 항목 만료
+            state.expire(current_time)
+
+            # 스트레스 점수 계산
+            stress_score = self._compute_stress_score(state, current_emotion)
+
+            # 감정/세션 정보 저장
+            state.add(EmotionRecord.from_emotion(current_time.timestamp(), current_emotion, stress_score))
+            # 이번 기록을 저장하기 전에 과거 기록으로 채움 (_sync_stress_state가 확인한 version 재사용)
+            self._mood_rollups_for(user_id, version=previous_version)
+            self.store.append_emotion(user_id, current_emotion, stress_score, timestamp=current_time.timestamp())
+            self.mood_rollups.record(user_id, current_time, current_emotion.get("primary_emotion"), stress_score,
+                                     version=state.version)
+
+            recent_emotions = []
+            for record in list(state.emotions)[-5:]:  # 최근 5개 감정
+                emotion = record.emotion()
+                recent_emotions.append({"timestamp": record.datetime, "emotion": emotion,
+                                        "text": emotion.get("text", "")})
+            scores = list(state.scores)
+            session_count = state.session_count
+
         return {
             "current_stress_score": stress_score,
-            "trend": self._calculate_trend(user["stress_scores"]),
+            "trend": self._calculate_trend(scores),
             "risk_level": self._assess_risk_level(stress_score),
-            "session_count": len(user["sessions"]),
-            "recent_emotions": user["emotion_history"][-5:]  # 최근 5개 감정
+            "session_count": session_count,
+            "recent_emotions": recent_emotions
         }
     
-    def _compute_stress_score(self, user: Dict, current_emotion: Dict) -> float:
+    def _mood_rollups_for(self, user_id: str, version=None) -> MoodRollups:
+        """처음 조회하거나 다른 프로세스가 공유 저장소에 기록을 더했으면 저장소의 최근 감정 기록으로 다시 채움
+
+        version: 호출한 쪽이 이미 확인한 저장소 version (없으면 공유 저장소일 때 조회)
+        """
+        rollups = self.mood_rollups
+        if rollups.has(user_id):
+            if not self.store.shared:
+                return rollups  # 이 프로세스만 기록하는 저장소는 한 번 채운 뒤 증분 갱신으로 충분
+            if version is None:
+                version = self.store.emotion_version(user_id)
+            if rollups.version(user_id) == version:
+                return rollups
+        elif self.store.shared and version is None:
+            version = self.store.emotion_version(user_id)
+
+        since = datetime.now() - timedelta(days=rollups.days)
+        rollups.load(user_id, ((e["timestamp"], e["emotion"].get("primary_emotion"), e["stress_score"])
+                               for e in self.store.get_emotions(user_id, since=since)), version)
+        return rollups
+    
+    def mood_trend(self, user_id: str, days: int = 90) -> List[Dict]:
+        """최근 days일의 일간 감정 추이"""
+        return self._mood_rollups_for(user_id).daily(user_id, days=days)
+    
+    def weekly_mood_trend(self, user_id: str, weeks: int = 13) -> List[Dict]:
+        """최근 weeks주의 주간 감정 추이"""
+        return self._mood_rollups_for(user_id).weekly(user_id, weeks=weeks)
+    
+    def _compute_stress_score(self, state: _StressState, current_emotion: Dict) -> float:
         """스트레스 점수 계산 로직"""
         base_score = current_emotion.get("stress_level", 5)
         emotion_intensity = current_emotion.get("emotion_intensity", 5)
@@ -131,14 +616,13 @@ class EmotionAnalyzer:
         emotion_weight = emotion_weights.get(primary_emotion, 0.5)
         
         # 최근 상담 빈도 고려
-        recent_sessions = len([s for s in user["sessions"] 
-                             if s["timestamp"] > datetime.now() - timedelta(days=7)])
+        recent_sessions = len(state.week_sessions)
         frequency_factor = min(recent_sessions * 0.2, 2.0)  # 최대 2점 추가
         
         # 감정 누적 효과
-        recent_emotions = user["emotion_history"][-10:]  # 최근 10개
-        negative_count = sum(1 for e in recent_emotions 
-                           if e["emotion"].get("primary_emotion") in ["부정", "분노", "불안"])
+        negative_count = state.negative_count  # 현재 감정 포함 최근 10개
+        if current_emotion.get("primary_emotion") in NEGATIVE_EMOTIONS:
+            negative_count += 1
         cumulative_factor = negative_count * 0.1
         
         # 최종 스트레스 점수 계산
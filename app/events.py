@@ -0,0 +1,150 @@
+import asyncio
+import json
+import queue
+import threading
+
+# 구독 스트림을 끝내라는 표시 (서버 종료 시)
+_CLOSED = object()
+
+
+class TooManySubscribers(Exception):
+    """스레드를 붙잡는 구독 스트림이 워커당 한도에 도달함"""
+
+
+class _AsyncSubscriber:
+    """이벤트 루프에서 읽는 구독자 (발행은 다른 스레드에서 해도 된다)"""
+
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put_nowait(self, item):
+        if self.queue.full():
+            raise queue.Full
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            pass  # 이벤트 루프가 이미 닫힘
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            pass
+
+
+def format_event(event_type, payload):
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    return f"event: {event_type}\ndata: {data}\n\n"
+
+
+class EventStream:
+    """스레드에서 읽는 구독 스트림 (WSGI 응답 본문으로 쓰면 연결이 끝날 때 close()로 구독 해제)"""
+
+    def __init__(self, broker, channel, subscriber, heartbeat):
+        self.broker = broker
+        self.channel = channel
+        self.subscriber = subscriber
+        self.heartbeat = heartbeat
+
+    def __iter__(self):
+        try:
+            yield "retry: 3000\n\n"
+            while not self.broker._closed.is_set():
+                try:
+                    event = self.subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"  # 프록시 연결 유지용 주석 이벤트
+                    continue
+                if event is _CLOSED:
+                    break
+                yield format_event(*event)
+        finally:
+            self.close()
+
+    def close(self):
+        self.broker.unsubscribe(self.channel, self.subscriber)
+
+
+class EventBroker:
+    """대시보드 실시간 갱신용 채널별 발행/구독 브로커
+
+    구독자마다 크기가 제한된 큐를 두고, 느린 구독자의 큐가 가득 차면 이벤트를 버린다.
+    stream()은 연결마다 워커 스레드 하나를 계속 붙잡으므로 max_thread_subscribers개까지만 허용하고,
+    ASGI 모드는 스레드를 쓰지 않는 astream()으로 제공한다.
+    발행은 프로세스 안에서만 전달되므로 다른 워커가 처리한 메시지의 변경분은 받지 못한다.
+    """
+
+    def __init__(self, max_queue_size=100, max_thread_subscribers=8):
+        self.max_queue_size = max_queue_size
+        self.max_thread_subscribers = max_thread_subscribers
+        self._subscribers = {}
+        self._thread_subscribers = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def has_subscribers(self, channel):
+        return bool(self._subscribers.get(channel))
+
+    def subscribe(self, channel, subscriber=None):
+        """구독자 등록 (subscriber가 없으면 스레드용 큐를 만들고 한도를 넘으면 TooManySubscribers)"""
+        with self._lock:
+            if subscriber is None:
+                if self._thread_subscribers >= self.max_thread_subscribers:
+                    raise TooManySubscribers(f"실시간 스트림 연결이 너무 많습니다 (최대 {self.max_thread_subscribers}개)")
+                subscriber = queue.Queue(maxsize=self.max_queue_size)
+                self._thread_subscribers += 1
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is None or subscriber not in subscribers:
+                return
+            subscribers.discard(subscriber)
+            if isinstance(subscriber, queue.Queue):
+                self._thread_subscribers -= 1
+            if not subscribers:
+                del self._subscribers[channel]
+
+    def close(self):
+        """모든 구독 스트림을 끝냄 (서버 종료 드레인용, 클라이언트는 retry 뒤 다른 워커로 재연결)"""
+        self._closed.set()
+        with self._lock:
+            subscribers = [subscriber for channel in self._subscribers.values() for subscriber in channel]
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(_CLOSED)
+            except queue.Full:
+                pass  # 다음 heartbeat에서 종료 표시를 확인한다
+
+    def publish(self, channel, event_type, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event_type, payload))
+            except queue.Full:
+                pass  # 느린 구독자는 이번 변경분을 건너뛴다
+
+    def stream(self, channel, heartbeat=15.0):
+        """채널 이벤트를 text/event-stream 형식 문자열로 내보내는 스트림 (구독은 바로 등록)"""
+        return EventStream(self, channel, self.subscribe(channel), heartbeat)
+
+    async def astream(self, channel, heartbeat=15.0):
+        """stream()의 비동기 버전: 이벤트를 기다리는 동안 스레드를 쓰지 않는다"""
+        subscriber = self.subscribe(channel, _AsyncSubscriber(self.max_queue_size))
+        try:
+            yield "retry: 3000\n\n"
+            while not self._closed.is_set():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is _CLOSED:
+                    break
+                yield format_event(*event)
+        finally:
+            self.unsubscribe(channel, subscriber)
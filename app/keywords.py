@@ -0,0 +1,142 @@
+import re
+
+# 한글 단어(조사/어미 포함 어절)와 2자 이상 영문 단어
+TOKEN = re.compile(r"[가-힣]+|[A-Za-z]{2,}")
+
+# 상담 대화에서 자주 나오는 주제어 (어절 안에서 가장 긴 것부터 찾아 형태소처럼 떼어 냄)
+DOMAIN_TERMS = (
+    "스트레스", "번아웃", "감정노동", "감정", "불안", "우울", "걱정", "긴장", "분노", "짜증", "화병", "무기력",
+    "피로", "피곤", "불면", "수면", "휴식", "명상", "운동", "산책", "취미", "상담", "심리", "마음",
+    "고객", "민원", "폭언", "갑질", "악성", "응대", "컴플레인",
+    "직장", "회사", "상사", "팀장", "동료", "후배", "선배", "부서", "업무", "야근", "회의", "실적", "평가",
+    "압박", "마감", "이직", "퇴사", "출근", "인간관계", "관계", "갈등", "소통", "조직",
+    "가족", "육아", "건강", "자존감", "자신감", "외로움", "슬픔", "눈물", "두통", "식욕",
+)
+# 검색 키워드로 쓰기엔 너무 일반적인 말 (대화체 부사, 지시어, 상담 응답의 상투어 등)
+STOPWORDS = frozenset((
+    "정말", "너무", "진짜", "그냥", "요즘", "오늘", "어제", "내일", "조금", "많이", "항상", "계속", "다시", "지금",
+    "그래서", "그런데", "하지만", "그리고", "그러면", "그럼", "저는", "제가", "나는", "내가", "우리", "저희", "당신",
+    "그것", "이것", "저것", "무엇", "어떻게", "언제", "어디", "이런", "그런", "저런", "이렇게", "그렇게", "정도",
+    "때문", "생각", "느낌", "기분", "부분", "이야기", "말씀", "경우", "사람", "상황", "자신", "모든", "여러", "함께",
+    "가장", "매우", "아주", "혹시", "같이", "먼저", "천천히", "충분히", "분명히", "특히", "이제", "아직", "벌써",
+    "아무것", "하루", "종일", "매일", "자꾸", "자주", "별로", "전혀", "모두", "다들", "누구", "뭔가", "어떤",
+    "the", "and", "you", "are", "was", "were", "for", "that", "this", "with", "have", "has", "just", "really",
+    "very", "about", "what", "feel", "there", "hello", "at", "in", "on", "to", "of", "is", "it", "my", "me",
+))
+# 어절 끝 조사 (긴 것부터 떼어 내고, 남는 말이 2자 이상일 때만)
+PARTICLES = tuple(sorted((
+    "에서는", "에게서", "한테서", "으로는", "이라고", "이라는", "까지는", "부터는", "에서", "에게", "한테", "으로",
+    "까지", "부터", "처럼", "보다", "이랑", "하고", "마저", "조차", "밖에", "이나", "라도", "에는", "와는", "과는", "마다",
+    "은", "는", "이", "가", "을", "를", "의", "에", "도", "만", "과", "와", "로", "랑", "나", "께",
+), key=len, reverse=True))
+# 서술어(동사/형용사 활용형) 어미: 이렇게 끝나는 어절은 주제어가 없으면 키워드 후보에서 뺀다
+PREDICATE_ENDINGS = (
+    "어요", "아요", "해요", "예요", "에요", "세요", "네요", "군요", "지요", "죠", "습니다", "니다", "는데", "지만",
+    "니까", "어서", "아서", "해서", "했어", "했는데", "했다", "한다", "하다", "하는", "하게", "하면", "하고", "해도",
+    "이다", "었어", "았어", "겠어", "같아", "싶어", "없어", "있어", "있는", "없는", "되는", "된다", "돼요", "되어",
+    "인데", "라서", "려고", "으면", "다면", "면서", "거든", "더라", "잖아", "던", "든지", "ㄴ다",
+)
+# 조사 없이 이 글자로 끝나는 어절은 활용형(질러서, 자고, 하기 ...)으로 보고 뺀다
+VERB_FINALS = ("고", "서", "기", "게", "지", "며", "면", "다", "요", "죠", "니", "까", "네", "워")
+# 한 글자 체언 + 조사 (잠을, 일은): 검색어로는 너무 짧아 뺀다
+SHORT_NOUN_PARTICLES = ("을", "를", "은", "는", "에", "도", "만")
+
+# TextRank 설정: 동시 출현 창 크기, 감쇠 계수, 반복 횟수, 주제어 가중치
+WINDOW = 3
+DAMPING = 0.85
+ITERATIONS = 30
+DOMAIN_BOOST = 3.0
+
+
+def terms_in_token(token, vocabulary):
+    """어절 하나에서 키워드 후보 추출: 주제어가 들어 있으면 주제어들, 아니면 조사를 뗀 체언"""
+    found = []
+    i = 0
+    while i < len(token):
+        for length in range(min(len(token) - i, vocabulary.max_length), 1, -1):
+            term = token[i:i + length]
+            if term in vocabulary:
+                found.append(term)
+                i += length
+                break
+        else:
+            i += 1
+    if found:
+        return found
+    if token.endswith(PREDICATE_ENDINGS):
+        return []
+    stripped = False
+    for _ in range(2):  # 조사가 겹친 경우 (주말에도, 침대에만)
+        particle = next((p for p in PARTICLES if token.endswith(p) and len(token) - len(p) >= 2), None)
+        if particle is None:
+            break
+        token = token[:-len(particle)]
+        stripped = True
+    if not stripped and (token.endswith(VERB_FINALS) or (len(token) == 2 and token.endswith(SHORT_NOUN_PARTICLES))):
+        return []
+    token = token.lower()
+    if 2 <= len(token) <= 8 and token not in STOPWORDS:
+        return [token]
+    return []
+
+
+class Vocabulary(frozenset):
+    """주제어 집합 (어절 안에서 찾을 최대 길이를 함께 보관)"""
+
+    def __new__(cls, terms):
+        vocabulary = super().__new__(cls, (term for term in terms if len(term) >= 2 and term not in STOPWORDS))
+        vocabulary.max_length = max(map(len, vocabulary), default=0)
+        return vocabulary
+
+
+class KeywordExtractor:
+    """LLM 없이 대화에서 검색 키워드를 뽑는 TextRank 추출기
+
+    어절을 주제어 사전(가장 긴 일치) 또는 조사를 뗀 체언으로 나누고, 창 안에서 함께 나온 단어끼리
+    간선을 이어 PageRank를 돌린다. 순간 이동 확률은 단어 빈도 × 발화 가중치(사용자 발화 > 상담 응답)
+    × 주제어 가중치라서 사용자가 반복해 말한 주제어가 위로 올라온다.
+    """
+
+    def __init__(self, vocabulary=DOMAIN_TERMS, limit=5):
+        self.vocabulary = Vocabulary(vocabulary)
+        self.limit = limit
+
+    @classmethod
+    def from_queries(cls, category_queries, limit=5):
+        """기본 주제어에 카테고리별 검색 쿼리의 단어를 더한 추출기"""
+        seeds = [word for queries in category_queries.values() for query in queries for word in query.split()]
+        return cls(vocabulary=(*DOMAIN_TERMS, *seeds), limit=limit)
+
+    def terms(self, text):
+        return [term for token in TOKEN.findall(text) for term in terms_in_token(token, self.vocabulary)]
+
+    def extract(self, documents, limit=None):
+        """[(텍스트, 가중치), ...] → 점수 순 키워드 목록 (최대 limit개)"""
+        graph = {}
+        teleport = {}
+        for text, weight in documents:
+            sequence = self.terms(text)
+            for i, term in enumerate(sequence):
+                teleport[term] = teleport.get(term, 0.0) + weight * (DOMAIN_BOOST if term in self.vocabulary else 1.0)
+                neighbors = graph.setdefault(term, {})
+                for other in sequence[i + 1:i + WINDOW]:
+                    if other != term:
+                        neighbors[other] = neighbors.get(other, 0.0) + weight
+                        back = graph.setdefault(other, {})
+                        back[term] = back.get(term, 0.0) + weight
+        if not teleport:
+            return []
+
+        total = sum(teleport.values())
+        teleport = {term: value / total for term, value in teleport.items()}
+        out_weight = {term: sum(neighbors.values()) for term, neighbors in graph.items()}
+        rank = dict(teleport)
+        for _ in range(ITERATIONS):
+            rank = {
+                term: (1 - DAMPING) * teleport[term] + DAMPING * sum(
+                    rank[other] * weight / out_weight[other] for other, weight in neighbors.items())
+                for term, neighbors in graph.items()
+            }
+        # 이웃이 없는 단어도 빈도만큼은 점수를 받도록 순간 이동 확률을 더함
+        scored = sorted(graph, key=lambda term: (rank[term] + teleport[term], term in self.vocabulary), reverse=True)
+        return scored[:limit or self.limit]
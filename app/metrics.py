@@ -0,0 +1,170 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# 지연 시간(초) 히스토그램 기본 구간
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 요청당 토큰 수 히스토그램 구간
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """메트릭을 모아 Prometheus 텍스트 형식으로 내보내는 저장소
+
+    수집 시점에만 값을 읽는 콜백(활성 사용자 수, 캐시 적중 수 등)도 등록할 수 있다.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_callback(self, name, help_text, metric_type, collect):
+        """collect()는 숫자 또는 (라벨 dict, 값) 목록을 반환 (같은 이름으로 다시 등록하면 교체)"""
+        with self._lock:
+            self._callbacks[name] = (name, help_text, metric_type, collect)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+            callbacks = list(self._callbacks.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, help_text, metric_type, collect in callbacks:
+            try:
+                samples = collect()
+            except Exception as e:
+                print(f"메트릭 수집 중 오류 발생 ({name}): {e}")
+                continue
+            if not isinstance(samples, (list, tuple)):
+                samples = [({}, samples)]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, help_text, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(buckets) + (float("inf"),)
+        super().__init__(name, help_text, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+# 서비스 공통 메트릭
+REQUEST_SECONDS = Histogram("kbhug_http_request_duration_seconds", "HTTP 요청 처리 시간",
+                            ("method", "route", "status"))
+STAGE_SECONDS = Histogram("kbhug_chatbot_stage_duration_seconds", "CounselingChatbot 단계별 처리 시간",
+                          ("stage",))
+UPSTREAM_SECONDS = Histogram("kbhug_upstream_request_duration_seconds", "OpenAI 호출 시간 (재시도 포함)",
+                             ("mode", "outcome"))
+LLM_TOKENS = Histogram("kbhug_llm_tokens", "업스트림 호출 1건당 토큰 수", ("kind", "direction"),
+                       buckets=TOKEN_BUCKETS)
+LLM_CACHED_TOKENS = Counter("kbhug_llm_cached_prompt_tokens_total", "프롬프트 캐시에서 처리된 입력 토큰 수", ("kind",))
+FALLBACK_TOTAL = Counter("kbhug_chatbot_fallback_total", "템플릿 대체 응답 사용 횟수", ("response_type",))
+SEARCH_SECONDS = Histogram("kbhug_search_duration_seconds", "네이버 블로그 검색 시간", ("outcome",))
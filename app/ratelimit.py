@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+class RateLimitExceeded(Exception):
+    """요청 한도를 넘었을 때 발생 (retry_after초 뒤 다시 시도 가능)"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _refill(tokens, updated_at, rate, capacity, now):
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+class InMemoryRateLimitBackend:
+    """프로세스 메모리에 토큰 버킷을 두는 기본 백엔드 (오래 안 쓴 버킷은 LRU로 제거)"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def take(self, buckets, cost=1.0, now=None):
+        """buckets의 (key, rate, capacity) 버킷 모두에서 cost만큼 꺼냄
+
+        하나라도 부족하면 아무것도 꺼내지 않고 기다려야 할 시간(초)을, 성공하면 0.0을 반환한다.
+        """
+        now = now or time.time()
+        with self._lock:
+            levels = []
+            for key, rate, capacity in buckets:
+                bucket = self._buckets.get(key)
+                tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], rate, capacity, now)
+                levels.append(tokens)
+
+            wait = max(((cost - tokens) / rate for tokens, (_, rate, _) in zip(levels, buckets)
+                        if tokens < cost), default=0.0)
+            if wait > 0:
+                return wait
+
+            for tokens, (key, _, _) in zip(levels, buckets):
+                self._buckets[key] = [tokens - cost, now]
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+
+class SQLiteRateLimitBackend:
+    """SQLite 파일에 토큰 버킷을 두어 여러 워커 프로세스가 한도를 공유하는 백엔드"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+
+    def _connection(self):
+        # sqlite3 연결은 스레드 간 공유하지 않고 스레드마다 하나씩 사용
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, buckets, cost=1.0, now=None):
+        now = now or time.time()
+        conn = self._connection()
+        # 버킷 읽기와 갱신을 하나의 쓰기 트랜잭션으로 묶어 프로세스 간 경쟁 방지
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            for key, rate, capacity in buckets:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                levels.append(capacity if row is None else _refill(row[0], row[1], rate, capacity, now))
+
+            wait = max(((cost - tokens) / rate for tokens, (_, rate, _) in zip(levels, buckets)
+                        if tokens < cost), default=0.0)
+            if wait <= 0:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    [(key, tokens - cost, now) for tokens, (key, _, _) in zip(levels, buckets)]
+                )
+            conn.execute("COMMIT")
+            return max(wait, 0.0)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def create_rate_limit_backend(url=None):
+    """설정 문자열로 한도 백엔드 생성: "memory"(기본) 또는 "sqlite:///경로" """
+    url = url or os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    if url == 'memory':
+        return InMemoryRateLimitBackend()
+    if url.startswith('sqlite:///'):
+        return SQLiteRateLimitBackend(url[len('sqlite:///'):])
+    raise ValueError(f"지원하지 않는 요청 한도 백엔드입니다: {url}")
+
+
+class RateLimiter:
+    """사용자별 + 전체 토큰 버킷 요청 한도
+
+    요청 하나가 사용자 버킷과 전체 버킷에서 토큰을 하나씩 함께 꺼내며,
+    어느 한쪽이라도 비어 있으면 RateLimitExceeded(retry_after 포함)를 던진다.
+    """
+
+    def __init__(self, backend=None, user_rate=0.5, user_burst=10, global_rate=20.0, global_burst=50):
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.rejected_total = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            backend=create_rate_limit_backend(),
+            user_rate=float(os.getenv('RATE_LIMIT_USER_RATE', 0.5)),
+            user_burst=float(os.getenv('RATE_LIMIT_USER_BURST', 10)),
+            global_rate=float(os.getenv('RATE_LIMIT_GLOBAL_RATE', 20.0)),
+            global_burst=float(os.getenv('RATE_LIMIT_GLOBAL_BURST', 50)),
+        )
+
+    def check(self, user_id, scope="chat"):
+        wait = self.backend.take([
+            (f"{scope}:user:{user_id}", self.user_rate, self.user_burst),
+            (f"{scope}:global", self.global_rate, self.global_burst)
+        ])
+        if wait > 0:
+            self.rejected_total += 1
+            raise RateLimitExceeded("요청이 너무 많습니다. 잠시 후 다시 시도해주세요.", wait)
+
+
+class FairQueue:
+    """업스트림 호출 앞의 공정 대기열
+
+    동시 실행 슬롯이 모두 차 있으면 사용자별 대기열에 넣고, 슬롯이 비면 사용자를
+    번갈아 가며 입장시켜 한 사용자의 연속 요청이 다른 사용자를 밀어내지 않게 한다.
+    max_wait초 안에 입장하지 못하면 RateLimitExceeded를 던진다.
+    """
+
+    def __init__(self, max_concurrency=32, max_wait=10.0):
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self._active = 0
+        self._waiting = OrderedDict()   # user_id -> deque[threading.Event], 입장 차례 순
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(os.getenv('UPSTREAM_QUEUE_CONCURRENCY', 32)),
+            max_wait=float(os.getenv('UPSTREAM_QUEUE_WAIT', 10.0)),
+        )
+
+    def acquire(self, user_id):
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                return
+            event = threading.Event()
+            self._waiting.setdefault(user_id, deque()).append(event)
+
+        if event.wait(self.max_wait):
+            return
+        with self._lock:
+            if event.is_set():  # 시간 초과 직전에 슬롯을 넘겨받은 경우
+                return
+            waiters = self._waiting[user_id]
+            waiters.remove(event)
+            if not waiters:
+                del self._waiting[user_id]
+        raise RateLimitExceeded("상담 요청이 많아 대기 시간이 초과되었습니다.", 1.0)
+
+    def release(self):
+        with self._lock:
+            if not self._waiting:
+                self._active -= 1
+                return
+            # 맨 앞 사용자의 가장 오래된 요청에 슬롯을 넘기고, 그 사용자는 차례 맨 뒤로
+            user_id, waiters = next(iter(self._waiting.items()))
+            event = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            event.set()
+
+    @contextmanager
+    def slot(self, user_id):
+        self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "waiting": sum(len(waiters) for waiters in self._waiting.values()),
+                "waiting_users": len(self._waiting),
+                "max_concurrency": self.max_concurrency
+            }
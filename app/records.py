@@ -0,0 +1,276 @@
+import sys
+import threading
+from array import array
+from datetime import datetime
+
+from rollups import EMOTION_ORDER
+
+# 역할 코드 (처음 보는 역할은 뒤에 추가)
+ROLE_NAMES = ["user", "assistant", "system"]
+_ROLE_CODES = {role: code for code, role in enumerate(ROLE_NAMES)}
+_ROLE_LOCK = threading.Lock()
+
+# 감정 코드 (rollups.EMOTION_ORDER 순서), 작은 정수 필드의 "값 없음" 표시
+EMOTION_CODES = {emotion: code for code, emotion in enumerate(EMOTION_ORDER)}
+MISSING = 255
+# 감정 분석 결과에서 열(column)로 압축하는 필드, 나머지는 extra dict에 그대로 보관
+COMPACT_EMOTION_KEYS = ("primary_emotion", "emotion_intensity", "specific_emotions", "stress_level", "confidence")
+
+# 자주 반복되는 세부 감정 목록은 같은 튜플을 공유
+_SPECIFIC_CACHE = {}
+_SPECIFIC_CACHE_MAX = 4096
+
+
+def role_code(role):
+    code = _ROLE_CODES.get(role)
+    if code is None:
+        with _ROLE_LOCK:
+            code = _ROLE_CODES.get(role)
+            if code is None:
+                if len(ROLE_NAMES) >= MISSING:
+                    raise ValueError(f"역할 종류가 너무 많습니다: {role}")
+                code = _ROLE_CODES[sys.intern(role)] = len(ROLE_NAMES)
+                ROLE_NAMES.append(sys.intern(role))
+    return code
+
+
+def _small_int(value):
+    return value if type(value) is int and 0 <= value < MISSING else None
+
+
+def _specific_tuple(values):
+    key = tuple(sys.intern(v) for v in values)
+    shared = _SPECIFIC_CACHE.get(key)
+    if shared is None:
+        if len(_SPECIFIC_CACHE) < _SPECIFIC_CACHE_MAX:
+            _SPECIFIC_CACHE[key] = key
+        shared = key
+    return shared
+
+
+def iso_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+class MessageRecord:
+    """대화 메시지 1건 (역할은 intern된 문자열, 시각은 epoch 초)"""
+
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role, content, timestamp):
+        self.role = ROLE_NAMES[role_code(role)]
+        self.content = content
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        return {"role": self.role, "content": self.content, "timestamp": iso_timestamp(self.timestamp)}
+
+
+class EmotionRecord:
+    """감정 분석 결과 1건의 압축 표현
+
+    주요 감정은 작은 정수 코드로, 강도/스트레스 수준은 정수로, 세부 감정은 공유 튜플로 보관한다.
+    형식이 예상과 다른 값과 그 밖의 키는 extra에 원래 값 그대로 두어 emotion()이 같은 dict를 돌려준다.
+    """
+
+    __slots__ = ("timestamp", "code", "intensity", "stress_level", "confidence", "specific", "stress_score",
+                 "extra")
+
+    def __init__(self, timestamp, code, intensity, stress_level, confidence, specific, stress_score, extra=None):
+        self.timestamp = timestamp
+        self.code = code
+        self.intensity = intensity
+        self.stress_level = stress_level
+        self.confidence = confidence
+        self.specific = specific
+        self.stress_score = stress_score
+        self.extra = extra
+
+    @classmethod
+    def from_emotion(cls, timestamp, emotion, stress_score):
+        extra = {}
+        code = EMOTION_CODES.get(emotion.get("primary_emotion"), MISSING)
+        if code == MISSING and "primary_emotion" in emotion:
+            extra["primary_emotion"] = emotion["primary_emotion"]
+
+        small = []
+        for key in ("emotion_intensity", "stress_level"):
+            value = _small_int(emotion.get(key))
+            if value is None:
+                value = MISSING
+                if key in emotion:
+                    extra[key] = emotion[key]
+            small.append(value)
+
+        confidence = emotion.get("confidence")
+        if type(confidence) is not float:
+            if "confidence" in emotion:
+                extra["confidence"] = confidence
+            confidence = None
+
+        specific = emotion.get("specific_emotions")
+        if type(specific) is list and all(type(v) is str for v in specific):
+            specific = _specific_tuple(specific)
+        else:
+            if "specific_emotions" in emotion:
+                extra["specific_emotions"] = specific
+            specific = None
+
+        for key, value in emotion.items():
+            if key not in COMPACT_EMOTION_KEYS:
+                extra[key] = value
+        return cls(timestamp, code, small[0], small[1], confidence, specific, stress_score, extra or None)
+
+    @property
+    def primary_emotion(self):
+        if self.code != MISSING:
+            return EMOTION_ORDER[self.code]
+        return self.extra.get("primary_emotion") if self.extra else None
+
+    @property
+    def datetime(self):
+        return datetime.fromtimestamp(self.timestamp)
+
+    def emotion(self):
+        """저장 전과 같은 감정 분석 결과 dict"""
+        extra = self.extra or {}
+        result = {}
+        if self.code != MISSING:
+            result["primary_emotion"] = EMOTION_ORDER[self.code]
+        if self.intensity != MISSING:
+            result["emotion_intensity"] = self.intensity
+        if self.specific is not None:
+            result["specific_emotions"] = list(self.specific)
+        if self.stress_level != MISSING:
+            result["stress_level"] = self.stress_level
+        if self.confidence is not None:
+            result["confidence"] = self.confidence
+        if extra:
+            # 압축하지 못한 기본 키는 원래 순서 자리에, 나머지 키는 뒤에 둔다
+            ordered = {key: extra[key] if key in extra else result[key]
+                       for key in COMPACT_EMOTION_KEYS if key in extra or key in result}
+            ordered.update((key, value) for key, value in extra.items() if key not in ordered)
+            return ordered
+        return result
+
+    def to_dict(self):
+        return {"timestamp": self.datetime, "emotion": self.emotion(), "stress_score": self.stress_score}
+
+
+class MessageColumns:
+    """사용자 1명의 메시지를 열 단위로 보관 (시각 array, 역할 코드 bytearray, 내용 list)
+
+    maxlen이 있으면 가장 오래된 메시지부터 밀어낸다. 밀어낸 자리는 head로 건너뛰고,
+    밀어낸 수가 남은 수만큼 쌓이면 한 번에 잘라 내어 popleft가 평균 O(1)이 되게 한다.
+    """
+
+    __slots__ = ("timestamps", "roles", "contents", "head", "maxlen")
+
+    def __init__(self, maxlen=None):
+        self.timestamps = array('d')
+        self.roles = bytearray()
+        self.contents = []
+        self.head = 0
+        self.maxlen = maxlen
+
+    def __len__(self):
+        return len(self.contents) - self.head
+
+    def append(self, role, content, timestamp):
+        """메시지 추가, maxlen을 넘어 밀려난 메시지가 있으면 MessageRecord로 반환"""
+        dropped = None
+        if self.maxlen is not None and len(self) >= self.maxlen:
+            dropped = self.popleft()
+        self.timestamps.append(timestamp)
+        self.roles.append(role_code(role))
+        self.contents.append(content)
+        return dropped
+
+    def popleft(self):
+        i = self.head
+        record = MessageRecord(ROLE_NAMES[self.roles[i]], self.contents[i], self.timestamps[i])
+        self.contents[i] = None  # 밀어낸 내용 문자열은 바로 놓아 줌
+        self.head += 1
+        if self.head * 2 >= len(self.contents):
+            del self.timestamps[:self.head]
+            del self.roles[:self.head]
+            del self.contents[:self.head]
+            self.head = 0
+        return record
+
+    def to_dicts(self, limit=None):
+        start = max(self.head, len(self.contents) - limit) if limit else self.head
+        return [
+            {"role": ROLE_NAMES[self.roles[i]], "content": self.contents[i],
+             "timestamp": iso_timestamp(self.timestamps[i])}
+            for i in range(start, len(self.contents))
+        ]
+
+    def nbytes(self):
+        """내용 문자열을 뺀 열 자체의 대략적인 크기(바이트)"""
+        return (sys.getsizeof(self.timestamps) + sys.getsizeof(self.roles) + sys.getsizeof(self.contents))
+
+
+class EmotionColumns:
+    """사용자 1명의 감정 기록을 열 단위로 보관 (EmotionRecord 필드별 array)
+
+    밀어낸 기록은 MessageColumns처럼 head로 건너뛰었다가 모아서 잘라 낸다.
+    """
+
+    __slots__ = ("timestamps", "codes", "intensities", "stress_levels", "confidences", "stress_scores",
+                 "specifics", "extras", "head", "maxlen")
+
+    def __init__(self, maxlen=None):
+        self.timestamps = array('d')
+        self.codes = bytearray()
+        self.intensities = bytearray()
+        self.stress_levels = bytearray()
+        self.confidences = array('d')      # 값 없음은 NaN
+        self.stress_scores = array('d')
+        self.specifics = []
+        self.extras = []
+        self.head = 0
+        self.maxlen = maxlen
+
+    def __len__(self):
+        return len(self.timestamps) - self.head
+
+    def append(self, record):
+        if self.maxlen is not None and len(self) >= self.maxlen:
+            self.popleft()
+        self.timestamps.append(record.timestamp)
+        self.codes.append(record.code)
+        self.intensities.append(record.intensity)
+        self.stress_levels.append(record.stress_level)
+        self.confidences.append(float("nan") if record.confidence is None else record.confidence)
+        self.stress_scores.append(record.stress_score)
+        self.specifics.append(record.specific)
+        self.extras.append(record.extra)
+
+    def popleft(self):
+        if not len(self):
+            raise IndexError("pop from empty EmotionColumns")
+        self.extras[self.head] = None
+        self.head += 1
+        if self.head * 2 >= len(self.timestamps):
+            for column in (self.timestamps, self.codes, self.intensities, self.stress_levels, self.confidences,
+                           self.stress_scores, self.specifics, self.extras):
+                del column[:self.head]
+            self.head = 0
+
+    def record(self, i):
+        """오래된 순으로 i번째 기록"""
+        i += self.head
+        confidence = self.confidences[i]
+        return EmotionRecord(self.timestamps[i], self.codes[i], self.intensities[i], self.stress_levels[i],
+                             None if confidence != confidence else confidence, self.specifics[i],
+                             self.stress_scores[i], self.extras[i])
+
+    def records(self, since=None, limit=None):
+        """since(epoch 초) 이후 기록을 오래된 순으로 (limit이 있으면 최근 limit개)"""
+        indexes = range(len(self))
+        if since is not None:
+            indexes = [i for i in indexes if self.timestamps[self.head + i] > since]
+        if limit:
+            indexes = indexes[-limit:]
+        return [self.record(i) for i in indexes]
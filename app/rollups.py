@@ -0,0 +1,165 @@
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import date
+
+# 감정 범주 순서 (배열 인덱스)와 대시보드 표시용 mood 값
+EMOTION_ORDER = ("긍정", "부정", "분노", "불안", "중립")
+MOOD_LABELS = {
+    "긍정": "positive",
+    "부정": "negative",
+    "분노": "angry",
+    "불안": "anxious",
+    "중립": "neutral"
+}
+
+
+class _RollupRing:
+    """버킷(일/주) 단위 집계를 고정 크기 배열에 순환 저장"""
+
+    __slots__ = ("bucket_ids", "counts", "stress_sum", "stress_max", "emotions")
+
+    def __init__(self, size):
+        self.bucket_ids = array('l', [-1]) * size
+        self.counts = array('I', [0]) * size
+        self.stress_sum = array('f', [0.0]) * size
+        self.stress_max = array('f', [0.0]) * size
+        self.emotions = array('I', [0]) * (size * len(EMOTION_ORDER))
+
+    def add(self, bucket_id, stress_score, emotion_index):
+        slot = bucket_id % len(self.bucket_ids)
+        width = len(EMOTION_ORDER)
+        if self.bucket_ids[slot] != bucket_id:
+            # 오래된 버킷 자리를 재사용
+            self.bucket_ids[slot] = bucket_id
+            self.counts[slot] = 0
+            self.stress_sum[slot] = 0.0
+            self.stress_max[slot] = 0.0
+            for i in range(width):
+                self.emotions[slot * width + i] = 0
+
+        self.counts[slot] += 1
+        self.stress_sum[slot] += stress_score
+        self.stress_max[slot] = max(self.stress_max[slot], stress_score)
+        self.emotions[slot * width + emotion_index] += 1
+
+    def row(self, bucket_id):
+        slot = bucket_id % len(self.bucket_ids)
+        if self.bucket_ids[slot] != bucket_id or not self.counts[slot]:
+            return None
+
+        width = len(EMOTION_ORDER)
+        emotion_counts = self.emotions[slot * width:(slot + 1) * width]
+        dominant = EMOTION_ORDER[max(range(width), key=emotion_counts.__getitem__)]
+        count = self.counts[slot]
+        return {
+            "session_count": count,
+            "avg_stress": round(self.stress_sum[slot] / count, 2),
+            "max_stress": round(self.stress_max[slot], 2),
+            "dominant_emotion": dominant,
+            "mood": MOOD_LABELS[dominant]
+        }
+
+
+class MoodRollups:
+    """사용자별 일간/주간 감정·스트레스 집계
+
+    감정 점수가 기록될 때마다 해당 일/주 버킷을 갱신하므로,
+    대시보드는 원본 메시지를 훑지 않고 최근 days일 추이를 바로 읽는다.
+    사용자별로 마지막으로 맞춘 저장소 기록의 version을 함께 보관해, 공유 저장소에 다른 프로세스가
+    기록을 더했는지 확인할 수 있게 한다.
+    """
+
+    def __init__(self, days=90, weeks=13, max_users=10000):
+        self.days = days
+        self.weeks = weeks
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has(self, user_id):
+        return user_id in self._users
+
+    def _new_rings(self):
+        # [일간 링, 주간 링, 저장소 version]
+        return [_RollupRing(self.days), _RollupRing(self.weeks), None]
+
+    def _put(self, user_id, rings):
+        # 호출 전 self._lock을 잡고 있어야 한다
+        self._users[user_id] = rings
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def _rings(self, user_id):
+        # 호출 전 self._lock을 잡고 있어야 한다
+        rings = self._users.get(user_id)
+        if rings is None:
+            rings = self._new_rings()
+            self._put(user_id, rings)
+        else:
+            self._users.move_to_end(user_id)
+        return rings
+
+    @staticmethod
+    def _add(rings, timestamp, primary_emotion, stress_score):
+        day = timestamp.date().toordinal()
+        emotion_index = EMOTION_ORDER.index(primary_emotion) if primary_emotion in EMOTION_ORDER else 4
+        rings[0].add(day, stress_score, emotion_index)
+        rings[1].add((day - 1) // 7, stress_score, emotion_index)  # 월요일 시작 주
+
+    def version(self, user_id):
+        """사용자 집계가 반영한 저장소 version (항목이 없거나 모르면 None)"""
+        with self._lock:
+            rings = self._users.get(user_id)
+            return rings[2] if rings is not None else None
+
+    def load(self, user_id, records, version=None):
+        """저장소 기록 [(시각, 주요 감정, 스트레스 점수), ...]으로 사용자 집계를 새로 만들어 바꿔 끼움
+
+        기록이 없어도 항목을 만들어 두어 저장소를 다시 조회하지 않게 한다.
+        """
+        rings = self._new_rings()
+        for timestamp, primary_emotion, stress_score in records:
+            self._add(rings, timestamp, primary_emotion, stress_score)
+        rings[2] = version
+        with self._lock:
+            self._put(user_id, rings)
+
+    def record(self, user_id, timestamp, primary_emotion, stress_score, version=None):
+        """기록 1건 반영 (version이 있으면 이 기록을 저장한 뒤의 저장소 version으로 갱신)"""
+        with self._lock:
+            rings = self._rings(user_id)
+            self._add(rings, timestamp, primary_emotion, stress_score)
+            if version is not None:
+                rings[2] = version
+
+    def daily(self, user_id, days=None, today=None):
+        """최근 days일의 일간 집계 (기록이 있는 날만, 날짜 오름차순)"""
+        days = min(days or self.days, self.days)
+        last = (today or date.today()).toordinal()
+        with self._lock:
+            rings = self._users.get(user_id)
+            if rings is None:
+                return []
+            trend = []
+            for day in range(last - days + 1, last + 1):
+                row = rings[0].row(day)
+                if row is not None:
+                    trend.append({"date": date.fromordinal(day).isoformat(), **row})
+            return trend
+
+    def weekly(self, user_id, weeks=None, today=None):
+        """최근 weeks주의 주간 집계 (week_start는 해당 주 월요일)"""
+        weeks = min(weeks or self.weeks, self.weeks)
+        last = ((today or date.today()).toordinal() - 1) // 7
+        with self._lock:
+            rings = self._users.get(user_id)
+            if rings is None:
+                return []
+            trend = []
+            for week in range(last - weeks + 1, last + 1):
+                row = rings[1].row(week)
+                if row is not None:
+                    trend.append({"week_start": date.fromordinal(week * 7 + 1).isoformat(), **row})
+            return trend
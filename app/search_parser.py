@@ -0,0 +1,294 @@
+import codecs
+import os
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # lxml이 없으면 표준 라이브러리 파서 사용
+    etree = None
+
+# 블로그 검색 결과에서 가져올 최대 포스트 수
+BLOG_RESULT_LIMIT = 4
+# 설명 최대 길이 (넘으면 잘라서 "..." 추가)
+DESCRIPTION_MAX_CHARS = 150
+# 결과 목록이 시작되는 위치 표시 (이 앞의 헤더/광고 마크업은 파싱하지 않음)
+RESULT_LIST_MARKERS = (b'class="lst_view', b"class='lst_view", b'class="bx"', b"class='bx'")
+_MARKER_OVERLAP = max(len(marker) for marker in RESULT_LIST_MARKERS) - 1
+
+
+def blog_resource(query, title, url, description, blog_name, date, thumbnail):
+    """검색 결과 1건을 리소스 dict로 변환 (모든 파서가 같은 형태를 반환하도록 공통 사용)"""
+    if description:
+        if len(description) > DESCRIPTION_MAX_CHARS:
+            description = description[:DESCRIPTION_MAX_CHARS] + "..."
+    else:
+        description = f"{query}에 대한 유용한 정보를 제공하는 블로그 포스트입니다."
+    return {
+        "title": title,
+        "url": url,
+        "description": description,
+        "type": "blog",
+        "source": blog_name or "네이버 블로그",
+        "date": date or "",
+        "thumbnail": thumbnail or ""
+    }
+
+
+def _has_class(value, name):
+    return name in (value or "").split()
+
+
+def parse_blog_results_bs4(html, query, limit=BLOG_RESULT_LIMIT):
+    """BeautifulSoup(html.parser)로 페이지 전체를 파싱하는 기존 방식 (비교 기준)"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    resources = []
+    for post in soup.find_all('li', class_='bx')[:limit]:
+        try:
+            title_elem = post.find('a', class_='title_link')
+            if not title_elem:
+                continue
+            desc_elem = post.find('div', class_='dsc')
+            blog_elem = post.find('a', class_='sub_time')
+            date_elem = post.find('span', class_='sub_time')
+            img_elem = post.find('img')
+            resources.append(blog_resource(
+                query,
+                title_elem.get_text(strip=True),
+                title_elem.get('href', ''),
+                desc_elem.get_text(strip=True) if desc_elem else "",
+                blog_elem.get_text(strip=True) if blog_elem else "",
+                date_elem.get_text(strip=True) if date_elem else "",
+                img_elem.get('src', '') if img_elem else ""
+            ))
+        except Exception as e:
+            print(f"블로그 포스트 파싱 오류: {e}")
+    return resources
+
+
+class LxmlBlogParser:
+    """lxml 증분 파서로 li.bx 항목이 닫힐 때마다 바로 추출
+
+    항목별 필드는 미리 컴파일한 XPath로 찾고, 처리한 항목은 비워서
+    트리가 결과 목록 크기만큼만 커지게 한다.
+    """
+
+    _title = etree.XPath("(.//a[contains(concat(' ', normalize-space(@class), ' '), ' title_link ')])[1]") \
+        if etree is not None else None
+    _desc = etree.XPath("(.//div[contains(concat(' ', normalize-space(@class), ' '), ' dsc ')])[1]") \
+        if etree is not None else None
+    _blog = etree.XPath("(.//a[contains(concat(' ', normalize-space(@class), ' '), ' sub_time ')])[1]") \
+        if etree is not None else None
+    _date = etree.XPath("(.//span[contains(concat(' ', normalize-space(@class), ' '), ' sub_time ')])[1]") \
+        if etree is not None else None
+    _img = etree.XPath("(.//img)[1]") if etree is not None else None
+
+    def __init__(self, query, limit=BLOG_RESULT_LIMIT, encoding="utf-8"):
+        self.query = query
+        self.limit = limit
+        self.posts_seen = 0
+        self.resources = []
+        self._parser = etree.HTMLPullParser(events=("end",), tag="li", encoding=encoding)
+
+    @property
+    def done(self):
+        return self.posts_seen >= self.limit
+
+    @staticmethod
+    def _text(elem):
+        # BeautifulSoup get_text(strip=True)와 같은 결과 (조각별 strip 후 이어 붙임)
+        if elem is None:
+            return ""
+        return "".join(piece.strip() for piece in elem.itertext() if piece.strip())
+
+    def feed(self, data):
+        self._parser.feed(data)
+        self._collect()
+
+    def close(self):
+        if not self.done:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                pass
+            self._collect()
+        return self.resources
+
+    def _collect(self):
+        for _, elem in self._parser.read_events():
+            if self.done or not _has_class(elem.get("class"), "bx"):
+                continue
+            self.posts_seen += 1
+            try:
+                title_elem = self._title(elem)
+                if title_elem:
+                    title_elem = title_elem[0]
+                    desc_elem, blog_elem, date_elem, img_elem = (
+                        (found[0] if found else None)
+                        for found in (self._desc(elem), self._blog(elem), self._date(elem), self._img(elem))
+                    )
+                    self.resources.append(blog_resource(
+                        self.query,
+                        self._text(title_elem),
+                        title_elem.get("href", ""),
+                        self._text(desc_elem),
+                        self._text(blog_elem),
+                        self._text(date_elem),
+                        img_elem.get("src", "") if img_elem is not None else ""
+                    ))
+            except Exception as e:
+                print(f"블로그 포스트 파싱 오류: {e}")
+            elem.clear()
+
+
+class StdlibBlogParser(HTMLParser):
+    """lxml이 없을 때 쓰는 표준 라이브러리 증분 파서
+
+    트리를 만들지 않고 li.bx 안에서 필요한 태그의 텍스트/속성만 모은다.
+    """
+
+    # li.bx 안에서 처음 나오는 것만 사용하는 (필드, 태그, 클래스)
+    FIELDS = (("title", "a", "title_link"), ("description", "div", "dsc"),
+              ("blog_name", "a", "sub_time"), ("date", "span", "sub_time"))
+
+    def __init__(self, query, limit=BLOG_RESULT_LIMIT, encoding="utf-8"):
+        super().__init__(convert_charrefs=True)
+        self.query = query
+        self.limit = limit
+        self.posts_seen = 0
+        self.resources = []
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._post = None       # 현재 li.bx 항목의 필드 dict
+        self._li_depth = 0      # li.bx 안에서 중첩된 li 깊이
+        self._capture = None    # [필드, 태그, 같은 태그 중첩 깊이, 텍스트 조각 목록]
+        self._text_run = []     # 태그 사이 텍스트 (feed 경계에서 나뉘어 들어올 수 있어 모았다가 strip)
+
+    @property
+    def done(self):
+        return self.posts_seen >= self.limit
+
+    def feed(self, data):
+        if self.done:
+            return
+        super().feed(self._decoder.decode(data) if isinstance(data, bytes) else data)
+
+    def close(self):
+        if not self.done:
+            super().feed(self._decoder.decode(b"", final=True))
+            super().close()
+        return self.resources
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self._post is None:
+            if tag == "li" and _has_class(dict(attrs).get("class"), "bx"):
+                self._post = {"href": "", "thumbnail": None}
+                self._li_depth = 1
+            return
+
+        self._flush_text()
+        attrs = dict(attrs)
+        if tag == "li":
+            self._li_depth += 1
+        elif tag == "img" and self._post["thumbnail"] is None:
+            self._post["thumbnail"] = attrs.get("src") or ""
+        if self._capture is not None:
+            if tag == self._capture[1]:
+                self._capture[2] += 1
+            return
+
+        for field, field_tag, class_name in self.FIELDS:
+            if tag == field_tag and field not in self._post and _has_class(attrs.get("class"), class_name):
+                if field == "title":
+                    self._post["href"] = attrs.get("href") or ""
+                self._capture = [field, tag, 1, []]
+                return
+
+    def handle_startendtag(self, tag, attrs):
+        # <img/> 같은 빈 태그는 시작 태그로만 처리 (li 깊이는 바뀌지 않음)
+        if self._post is None:
+            return
+        self._flush_text()
+        if tag == "img" and self._post["thumbnail"] is None:
+            self._post["thumbnail"] = dict(attrs).get("src") or ""
+
+    def handle_endtag(self, tag):
+        if self._post is None:
+            return
+        self._flush_text()
+        capture = self._capture
+        if capture is not None and tag == capture[1]:
+            capture[2] -= 1
+            if capture[2] == 0:
+                self._post[capture[0]] = "".join(capture[3])
+                self._capture = None
+        if tag == "li":
+            self._li_depth -= 1
+            if self._li_depth == 0:
+                self._finish_post()
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text_run.append(data)
+
+    def _flush_text(self):
+        if self._text_run:
+            text = "".join(self._text_run).strip()
+            self._text_run = []
+            if text and self._capture is not None:
+                self._capture[3].append(text)
+
+    def _finish_post(self):
+        post, self._post, self._capture, self._text_run = self._post, None, None, []
+        self.posts_seen += 1
+        if "title" not in post:
+            return
+        self.resources.append(blog_resource(
+            self.query, post["title"], post["href"], post.get("description", ""),
+            post.get("blog_name", ""), post.get("date", ""), post["thumbnail"]
+        ))
+
+
+def create_blog_parser(query, limit=BLOG_RESULT_LIMIT, encoding="utf-8", backend=None):
+    """SEARCH_PARSER 설정("auto"(기본), "lxml", "stdlib")에 맞는 증분 파서 생성"""
+    backend = backend or os.getenv('SEARCH_PARSER', 'auto')
+    if backend == 'lxml' or (backend == 'auto' and etree is not None):
+        if etree is None:
+            raise ValueError("SEARCH_PARSER=lxml 이지만 lxml이 설치되어 있지 않습니다.")
+        return LxmlBlogParser(query, limit, encoding)
+    if backend in ('auto', 'stdlib'):
+        return StdlibBlogParser(query, limit, encoding)
+    raise ValueError(f"지원하지 않는 검색 결과 파서입니다: {backend}")
+
+
+def extract_blog_results(chunks, query, limit=BLOG_RESULT_LIMIT, encoding="utf-8", backend=None):
+    """응답 본문 조각(bytes)을 받는 대로 파싱해 li.bx 항목 limit개가 모이면 바로 중단
+
+    결과 목록 표시(RESULT_LIST_MARKERS)가 나오기 전의 마크업은 파서에 넣지 않는다.
+    표시를 찾지 못하면 본문 전체를 파싱한다.
+    """
+    parser = create_blog_parser(query, limit, encoding, backend)
+    prefix = bytearray()
+    started = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if not started:
+            search_from = max(0, len(prefix) - _MARKER_OVERLAP)
+            prefix += chunk
+            # 조각 경계에 걸친 표시도 찾도록 직전 조각 끝부분부터 검색
+            found = [i for i in (prefix.find(marker, search_from) for marker in RESULT_LIST_MARKERS) if i >= 0]
+            if not found:
+                continue
+            start = prefix.rfind(b"<", 0, min(found))
+            chunk = bytes(prefix[max(start, 0):])
+            prefix = None
+            started = True
+        parser.feed(chunk)
+        if parser.done:
+            return parser.resources
+    if not started and prefix:
+        parser.feed(bytes(prefix))
+    return parser.close()
@@ -0,0 +1,163 @@
+import signal
+import threading
+
+
+def component(build):
+    """처음 접근할 때 한 번만 만드는 구성 요소 (여러 요청 스레드가 동시에 접근해도 하나만 생성)"""
+    name = build.__name__
+
+    def getter(self):
+        value = self._components.get(name)
+        if value is None:
+            with self._lock:
+                value = self._components.get(name)
+                if value is None:
+                    value = self._components[name] = build(self)
+        return value
+
+    getter.__doc__ = build.__doc__
+    return property(getter)
+
+
+class Services:
+    """서버가 공유하는 구성 요소 묶음
+
+    모듈을 불러오거나 앱을 만들 때는 아무것도 생성하지 않고, 처음 사용하는 요청에서
+    필요한 구성 요소와 그 의존 모듈(openai 등)만 불러와 만든다.
+    OPENAI_API_KEY가 없어도 서버는 뜨고, /readyz가 준비되지 않음을 알린다.
+    """
+
+    def __init__(self, api_key=None, async_mode=False):
+        self.api_key = api_key
+        # ASGI 서빙 모드면 챗봇/감정 분석기에 비동기 업스트림 풀을 연결
+        self.async_mode = async_mode
+        # 종료 중이면 새 상담 요청을 받지 않고 /readyz도 503
+        self.draining = False
+        self._components = {}
+        self._lock = threading.RLock()
+
+    def built(self, name):
+        return name in self._components
+
+    @component
+    def store(self):
+        # CONVERSATION_STORE=bounded | memory | sqlite:///경로
+        from storage import create_store
+        return create_store()
+
+    @component
+    def usage_stats(self):
+        from upstream import UsageStats
+        return UsageStats()
+
+    @component
+    def upstream(self):
+        # 챗봇과 감정 분석기가 하나의 서킷 브레이커/재시도 정책을 공유 (OpenAI 클라이언트는 첫 호출 때 생성)
+        from upstream import ResilientUpstream
+        return ResilientUpstream.from_env(self.api_key)
+
+    @component
+    def async_upstream(self):
+        # 동기 경로와 같은 서킷 브레이커 사용
+        from upstream import AsyncUpstream
+        return AsyncUpstream.from_env(self.api_key, breaker=self.upstream.breaker)
+
+    @component
+    def emotion_analyzer(self):
+        from emotion_analyzer import EmotionAnalyzer
+        return EmotionAnalyzer(self.api_key, store=self.store, usage_stats=self.usage_stats, upstream=self.upstream,
+                               async_upstream=self.async_upstream if self.async_mode else None)
+
+    @component
+    def chatbot(self):
+        # RESPONSE_CACHE=on이면 첫 메시지 응답을 유사 메시지끼리 재사용
+        from cache import create_response_cache
+        from chatbot import CounselingChatbot
+        from context import ContextBuilder
+        return CounselingChatbot(self.api_key, store=self.store, emotion_analyzer=self.emotion_analyzer,
+                                 response_cache=create_response_cache(), usage_stats=self.usage_stats,
+                                 context_builder=ContextBuilder.from_env(), upstream=self.upstream,
+                                 async_upstream=self.async_upstream if self.async_mode else None)
+
+    @component
+    def rate_limiter(self):
+        # 사용자별/전체 요청 한도 (RATE_LIMIT_BACKEND=memory | sqlite:///경로)
+        from ratelimit import RateLimiter
+        return RateLimiter.from_env()
+
+    @component
+    def upstream_queue(self):
+        # 업스트림 호출 앞 공정 대기열
+        from ratelimit import FairQueue
+        return FairQueue.from_env()
+
+    def preload(self):
+        """fork 전에 불러도 안전한 정적 데이터 로드 (gunicorn preload_app)
+
+        프롬프트/감정 사전/스키마가 들어 있는 모듈과 openai, 토크나이저 인코딩을 마스터 프로세스에서
+        한 번 불러 워커들이 복사 없이 공유하게 한다. 연결·스레드를 가진 구성 요소는 만들지 않는다.
+        """
+        import chatbot            # 상담 지시문, 함수 호출 정의
+        import emotion_analyzer   # 감정 분석 지시문, 스키마
+        import search_parser      # lxml, 미리 컴파일한 XPath
+        import openai
+        from context import load_token_counter
+        load_token_counter()  # tiktoken 인코딩은 모듈 안에 캐시되어 fork 후에도 재사용
+        return self
+
+    def drain(self):
+        """종료 신호를 받았을 때 호출: 새 요청을 막고 끝나지 않는 대시보드 실시간 스트림을 닫는다
+
+        진행 중인 상담 응답(스트리밍 포함)은 서버의 graceful timeout 안에서 끝까지 처리된다.
+        """
+        self.draining = True
+        if self.built("chatbot"):
+            self.chatbot.events.close()
+
+    def drain_on_signals(self, signals=(signal.SIGTERM, signal.SIGINT)):
+        """종료 신호가 오면 drain()을 먼저 부르고 기존 처리기(gunicorn/uvicorn의 종료 처리)로 넘김
+
+        서버가 신호 처리기를 설치한 뒤 메인 스레드에서 호출해야 한다.
+        """
+        for signum in signals:
+            previous = signal.getsignal(signum)
+            if not callable(previous):
+                continue  # 서버가 처리기를 설치하지 않은 신호는 그대로 둔다
+
+            def handler(signum, frame, previous=previous):
+                self.drain()
+                previous(signum, frame)
+
+            signal.signal(signum, handler)
+
+    def warm_up(self):
+        """모든 구성 요소와 OpenAI 클라이언트를 미리 생성 (첫 요청이 생성 비용을 내지 않도록)"""
+        self.chatbot.context.count("")  # 토크나이저 로드
+        self.rate_limiter
+        self.upstream_queue
+        if self.api_key:
+            self.upstream.client
+        return self
+
+    def readiness(self):
+        """준비 상태 점검 결과 (ready, checks)"""
+        checks = {}
+        try:
+            self.warm_up()
+            checks["components"] = "ok"
+        except Exception as e:
+            print(f"구성 요소 생성 중 오류 발생: {e}")
+            checks["components"] = f"error: {e}"
+        checks["openai_api_key"] = "ok" if self.api_key else "missing"
+        checks["draining"] = self.draining
+        if self.built("store"):
+            try:
+                self.store.ping()
+                checks["store"] = "ok"
+            except Exception as e:
+                checks["store"] = f"error: {e}"
+        if self.built("upstream"):
+            # 브레이커가 열려 있어도 대체 응답은 가능하므로 준비 여부에는 반영하지 않음
+            checks["upstream_breaker"] = self.upstream.breaker.state
+        ready = not self.draining and all(checks.get(key) == "ok" for key in ("components", "openai_api_key", "store"))
+        return ready, checks
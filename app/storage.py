@@ -0,0 +1,440 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from records import EmotionColumns, EmotionRecord, MessageColumns
+
+
+class ConversationStore:
+    """대화 기록과 감정 분석 기록을 저장하는 저장소 인터페이스
+
+    메시지는 {"role", "content", "timestamp"(ISO 문자열)} 형태로,
+    감정 기록은 {"timestamp"(datetime), "emotion", "stress_score"} 형태로 반환한다.
+    """
+
+    # 여러 프로세스가 같은 기록을 보는 저장소인지 (그렇다면 프로세스별 집계를 주기적으로 다시 읽는다)
+    shared = False
+
+    def append_message(self, user_id, role, content, category=None, timestamp=None):
+        raise NotImplementedError
+
+    def get_messages(self, user_id, limit=None):
+        """사용자의 메시지를 오래된 순으로 반환 (limit이 있으면 최근 limit개)"""
+        raise NotImplementedError
+
+    def count_messages(self, user_id):
+        raise NotImplementedError
+
+    def message_counts(self):
+        """사용자별 메시지 수 {user_id: count}"""
+        raise NotImplementedError
+
+    def count_users(self):
+        return len(self.message_counts())
+
+    def user_activity(self):
+        """사용자별 활동 요약 {user_id: (메시지 수, 마지막 메시지 시각(epoch), 마지막 카테고리)}"""
+        activity = {}
+        for user_id, count in self.message_counts().items():
+            last = self.get_messages(user_id, limit=1)
+            timestamp = datetime.fromisoformat(last[0]["timestamp"]).timestamp() if last else None
+            activity[user_id] = (count, timestamp, None)
+        return activity
+
+    def category_counts(self):
+        """사용자 메시지의 카테고리별 수 {category: count} (카테고리를 저장하지 않는 저장소는 빈 dict)"""
+        return {}
+
+    def session_stats(self):
+        """사용자별 감정 기록(세션) 요약 {user_id: (세션 수, 스트레스 합, 마지막 스트레스, 마지막 시각(epoch))}"""
+        stats = {}
+        for user_id in self.message_counts():
+            emotions = self.get_emotions(user_id)
+            if not emotions:
+                continue
+            # 최근 기록만 남기는 저장소는 남은 기록의 평균으로 전체 합을 추정
+            count = self.count_emotions(user_id)
+            average = sum(e["stress_score"] for e in emotions) / len(emotions)
+            stats[user_id] = (count, average * count, emotions[-1]["stress_score"],
+                              emotions[-1]["timestamp"].timestamp())
+        return stats
+
+    def get_summary(self, user_id):
+        """최근 기록에서 밀려난 이전 대화의 요약 (없으면 빈 문자열)"""
+        return ""
+
+    def append_emotion(self, user_id, emotion, stress_score, timestamp=None):
+        raise NotImplementedError
+
+    def get_emotions(self, user_id, since=None, limit=None):
+        """사용자의 감정 기록을 오래된 순으로 반환 (since 이후, limit이 있으면 최근 limit개)"""
+        raise NotImplementedError
+
+    def count_emotions(self, user_id, since=None):
+        return len(self.get_emotions(user_id, since=since))
+
+    def emotion_version(self, user_id):
+        """사용자 감정 기록의 변경 확인용 값 (세션 수, 마지막 기록 시각(epoch))"""
+        last = self.get_emotions(user_id, limit=1)
+        return self.count_emotions(user_id), last[0]["timestamp"].timestamp() if last else None
+
+    def ping(self):
+        """준비 상태 점검용 확인 (기록 수와 무관하게 일정한 비용, 사용할 수 없으면 예외)"""
+
+    def close(self):
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    """프로세스 메모리에 저장하는 기본 저장소 (재시작 시 소멸)
+
+    사용자별 기록은 열 단위(records.MessageColumns/EmotionColumns)로 보관하고
+    조회할 때만 dict로 만든다.
+    """
+
+    def __init__(self):
+        self._messages = {}
+        self._emotions = {}
+        self._lock = threading.Lock()
+
+    def append_message(self, user_id, role, content, category=None, timestamp=None):
+        with self._lock:
+            columns = self._messages.get(user_id)
+            if columns is None:
+                columns = self._messages[user_id] = MessageColumns()
+            columns.append(role, content, timestamp or time.time())
+
+    def get_messages(self, user_id, limit=None):
+        with self._lock:
+            columns = self._messages.get(user_id)
+            return columns.to_dicts(limit) if columns is not None else []
+
+    def count_messages(self, user_id):
+        return len(self._messages.get(user_id, []))
+
+    def message_counts(self):
+        with self._lock:
+            return {user_id: len(messages) for user_id, messages in self._messages.items()}
+
+    def append_emotion(self, user_id, emotion, stress_score, timestamp=None):
+        record = EmotionRecord.from_emotion(timestamp or time.time(), emotion, stress_score)
+        with self._lock:
+            columns = self._emotions.get(user_id)
+            if columns is None:
+                columns = self._emotions[user_id] = EmotionColumns()
+            columns.append(record)
+
+    def get_emotions(self, user_id, since=None, limit=None):
+        with self._lock:
+            columns = self._emotions.get(user_id)
+            records = columns.records(since.timestamp() if since else None, limit) if columns is not None else []
+        return [record.to_dict() for record in records]
+
+    def count_emotions(self, user_id, since=None):
+        if since is None:
+            columns = self._emotions.get(user_id)
+            return len(columns) if columns is not None else 0
+        return len(self.get_emotions(user_id, since=since))
+
+
+def summarize_turns(summary, messages, max_lines=20, max_chars=80):
+    """기본 롤링 요약: 밀려난 메시지를 한 줄씩 잘라 붙이고 최근 max_lines줄만 유지"""
+    lines = summary.splitlines() if summary else []
+    for msg in messages:
+        speaker = "사용자" if msg["role"] == "user" else "상담사"
+        content = " ".join(msg["content"].split())
+        if len(content) > max_chars:
+            content = content[:max_chars] + "..."
+        lines.append(f"- {speaker}: {content}")
+    return "\n".join(lines[-max_lines:])
+
+
+class _BoundedUserHistory:
+    __slots__ = ("messages", "emotions", "summary", "message_count", "emotion_count",
+                 "last_access", "size")
+
+    def __init__(self, max_messages, max_emotions):
+        self.messages = MessageColumns(maxlen=max_messages)
+        self.emotions = EmotionColumns(maxlen=max_emotions)
+        self.summary = ""
+        self.message_count = 0
+        self.emotion_count = 0
+        self.last_access = time.monotonic()
+        self.size = 0
+
+
+class BoundedConversationStore(ConversationStore):
+    """사용자별 최근 기록만 유지하는 메모리 저장소
+
+    - 최근 max_messages개 메시지를 링 버퍼로 보관하고, 밀려난 메시지는 롤링 요약에 합친다
+    - idle_ttl초 동안 활동이 없는 사용자는 LRU 순서로 제거한다
+    - 전체 메모리 추정치가 memory_budget 바이트를 넘으면 가장 오래 쓰지 않은 사용자부터 제거한다
+    """
+
+    # 열 단위 보관 시 메시지/감정 기록 1건당 대략적인 고정 오버헤드(바이트, 내용 문자열 제외)
+    ENTRY_OVERHEAD = 24
+    EMOTION_OVERHEAD = 64
+
+    def __init__(self, max_messages=40, max_emotions=200, idle_ttl=6 * 3600,
+                 memory_budget=256 * 1024 * 1024, summarizer=summarize_turns):
+        self.max_messages = max_messages
+        self.max_emotions = max_emotions
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self.summarizer = summarizer
+
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self.evicted_users = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_messages=int(os.getenv('HISTORY_MAX_MESSAGES', 40)),
+            idle_ttl=float(os.getenv('HISTORY_IDLE_TTL', 6 * 3600)),
+            memory_budget=int(float(os.getenv('HISTORY_MEMORY_BUDGET_MB', 256)) * 1024 * 1024),
+        )
+
+    def _touch(self, user_id):
+        # 호출 전 self._lock을 잡고 있어야 한다
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _BoundedUserHistory(self.max_messages, self.max_emotions)
+        else:
+            self._users.move_to_end(user_id)
+        user.last_access = time.monotonic()
+        return user
+
+    def _resize(self, user, delta):
+        user.size += delta
+        self._size += delta
+
+    def _evict(self):
+        # 유휴 사용자 제거 후 메모리 예산 초과분을 LRU 순서로 제거
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._users:
+            user_id, user = next(iter(self._users.items()))
+            if user.last_access >= cutoff and self._size <= self.memory_budget:
+                break
+            if len(self._users) == 1 and user.last_access >= cutoff:
+                break  # 방금 기록한 사용자는 남긴다
+            del self._users[user_id]
+            self._size -= user.size
+            self.evicted_users += 1
+
+    def append_message(self, user_id, role, content, category=None, timestamp=None):
+        with self._lock:
+            user = self._touch(user_id)
+            dropped = user.messages.append(role, content, timestamp or time.time())
+            if dropped is not None:
+                old_summary_size = sys.getsizeof(user.summary)
+                user.summary = self.summarizer(user.summary, [dropped.to_dict()])
+                self._resize(user, sys.getsizeof(user.summary) - old_summary_size
+                             - sys.getsizeof(dropped.content) - self.ENTRY_OVERHEAD)
+            user.message_count += 1
+            self._resize(user, sys.getsizeof(content) + self.ENTRY_OVERHEAD)
+            self._evict()
+
+    def get_messages(self, user_id, limit=None):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return []
+            return user.messages.to_dicts(limit)
+
+    def get_summary(self, user_id):
+        user = self._users.get(user_id)
+        return user.summary if user else ""
+
+    def count_messages(self, user_id):
+        user = self._users.get(user_id)
+        return user.message_count if user else 0
+
+    def message_counts(self):
+        with self._lock:
+            return {user_id: user.message_count for user_id, user in self._users.items()}
+
+    def append_emotion(self, user_id, emotion, stress_score, timestamp=None):
+        record = EmotionRecord.from_emotion(timestamp or time.time(), emotion, stress_score)
+        with self._lock:
+            user = self._touch(user_id)
+            if len(user.emotions) < user.emotions.maxlen:
+                self._resize(user, self.EMOTION_OVERHEAD)
+            user.emotions.append(record)
+            user.emotion_count += 1
+            self._evict()
+
+    def get_emotions(self, user_id, since=None, limit=None):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return []
+            records = user.emotions.records(since.timestamp() if since else None, limit)
+        return [record.to_dict() for record in records]
+
+    def count_emotions(self, user_id, since=None):
+        if since is None:
+            user = self._users.get(user_id)
+            return user.emotion_count if user else 0
+        return len(self.get_emotions(user_id, since=since))
+
+    def memory_usage(self):
+        return {
+            "users": len(self._users),
+            "estimated_bytes": self._size,
+            "memory_budget": self.memory_budget,
+            "evicted_users": self.evicted_users
+        }
+
+
+class SQLiteConversationStore(ConversationStore):
+    """SQLite(WAL 모드) 저장소: 여러 워커 프로세스가 같은 파일을 공유할 수 있다"""
+
+    shared = True
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        category TEXT,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_user_time ON messages (user_id, created_at);
+    CREATE TABLE IF NOT EXISTS emotions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        emotion TEXT NOT NULL,
+        stress_score REAL NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_emotions_user_time ON emotions (user_id, created_at);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+
+    def _connection(self):
+        # sqlite3 연결은 스레드 간 공유하지 않고 스레드마다 하나씩 사용
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append_message(self, user_id, role, content, category=None, timestamp=None):
+        self._connection().execute(
+            "INSERT INTO messages (user_id, role, content, category, created_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, role, content, category, timestamp or time.time())
+        )
+
+    def get_messages(self, user_id, limit=None):
+        rows = self._connection().execute(
+            "SELECT role, content, created_at FROM messages WHERE user_id = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, limit or -1)
+        ).fetchall()
+        return [
+            {"role": role, "content": content, "timestamp": datetime.fromtimestamp(created_at).isoformat()}
+            for role, content, created_at in reversed(rows)
+        ]
+
+    def count_messages(self, user_id):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def message_counts(self):
+        rows = self._connection().execute(
+            "SELECT user_id, COUNT(*) FROM messages GROUP BY user_id"
+        ).fetchall()
+        return dict(rows)
+
+    def count_users(self):
+        return self._connection().execute(
+            "SELECT COUNT(DISTINCT user_id) FROM messages"
+        ).fetchone()[0]
+
+    def ping(self):
+        # 파일과 스키마에 접근 가능한지만 확인 (테이블 전체를 훑지 않음)
+        self._connection().execute("SELECT 1 FROM messages LIMIT 1").fetchall()
+
+    def user_activity(self):
+        conn = self._connection()
+        categories = dict(conn.execute(
+            "SELECT m.user_id, m.category FROM messages m JOIN "
+            "(SELECT MAX(id) AS id FROM messages WHERE category IS NOT NULL GROUP BY user_id) last ON m.id = last.id"
+        ).fetchall())
+        rows = conn.execute("SELECT user_id, COUNT(*), MAX(created_at) FROM messages GROUP BY user_id").fetchall()
+        return {user_id: (count, last, categories.get(user_id)) for user_id, count, last in rows}
+
+    def category_counts(self):
+        return dict(self._connection().execute(
+            "SELECT category, COUNT(*) FROM messages WHERE role = 'user' AND category IS NOT NULL GROUP BY category"
+        ).fetchall())
+
+    def session_stats(self):
+        # MAX()와 함께 고른 stress_score는 SQLite에서 created_at이 가장 큰 행의 값
+        rows = self._connection().execute(
+            "SELECT user_id, COUNT(*), SUM(stress_score), stress_score, MAX(created_at) FROM emotions GROUP BY user_id"
+        ).fetchall()
+        return {user_id: (count, total, last, last_at) for user_id, count, total, last, last_at in rows}
+
+    def append_emotion(self, user_id, emotion, stress_score, timestamp=None):
+        self._connection().execute(
+            "INSERT INTO emotions (user_id, emotion, stress_score, created_at) VALUES (?, ?, ?, ?)",
+            (user_id, json.dumps(emotion, ensure_ascii=False), stress_score, timestamp or time.time())
+        )
+
+    def get_emotions(self, user_id, since=None, limit=None):
+        rows = self._connection().execute(
+            "SELECT emotion, stress_score, created_at FROM emotions "
+            "WHERE user_id = ? AND created_at > ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, since.timestamp() if since else 0, limit or -1)
+        ).fetchall()
+        return [
+            {"timestamp": datetime.fromtimestamp(created_at), "emotion": json.loads(emotion), "stress_score": score}
+            for emotion, score, created_at in reversed(rows)
+        ]
+
+    def count_emotions(self, user_id, since=None):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM emotions WHERE user_id = ? AND created_at > ?",
+            (user_id, since.timestamp() if since else 0)
+        ).fetchone()[0]
+
+    def emotion_version(self, user_id):
+        count, last = self._connection().execute(
+            "SELECT COUNT(*), MAX(created_at) FROM emotions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return count, last
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_store(url=None):
+    """설정 문자열로 저장소 생성: "bounded"(기본), "memory" 또는 "sqlite:///경로" """
+    url = url or os.getenv('CONVERSATION_STORE', 'bounded')
+    if url == 'bounded':
+        return BoundedConversationStore.from_env()
+    if url == 'memory':
+        return InMemoryConversationStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteConversationStore(url[len('sqlite:///'):])
+    raise ValueError(f"지원하지 않는 저장소 설정입니다: {url}")
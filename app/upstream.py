@@ -0,0 +1,439 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+from metrics import LLM_CACHED_TOKENS, LLM_TOKENS, UPSTREAM_SECONDS
+
+
+class UpstreamOverloaded(Exception):
+    """대기열이 가득 차서 업스트림 호출을 받을 수 없을 때 발생"""
+
+
+class CircuitOpen(Exception):
+    """업스트림 장애로 서킷 브레이커가 열려 호출을 바로 거절할 때 발생"""
+
+
+def is_retryable(error):
+    """타임아웃, 연결 오류, 429, 5xx만 재시도 (요청 자체의 오류는 재시도하지 않음)"""
+    openai = sys.modules.get('openai')
+    if openai is None:  # openai를 아직 불러오지 않았다면 OpenAI 호출 오류일 수 없음
+        return False
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class CircuitBreaker:
+    """연속 실패가 쌓이면 열리고, recovery_timeout 뒤 시험 호출 하나로 회복 여부를 확인
+
+    closed: 정상 호출 / open: 즉시 CircuitOpen / half_open: 시험 호출 1건만 허용
+    동기 워커 스레드와 비동기 모드가 같은 인스턴스를 공유할 수 있다.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.failures_total = 0
+        self.rejected_total = 0
+        self.opened_total = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            failure_threshold=int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5)),
+            recovery_timeout=float(os.getenv('BREAKER_RECOVERY_TIMEOUT', 30.0)),
+        )
+
+    def before_call(self):
+        """호출 허용 여부 확인 (열려 있으면 CircuitOpen), 이 호출이 half_open 시험 호출이면 True"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected_total += 1
+                    raise CircuitOpen("업스트림 장애로 호출을 중단했습니다")
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected_total += 1
+                    raise CircuitOpen("업스트림 회복 확인 중입니다")
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        # 업스트림 상태와 무관하게 호출하지 못한 경우 (대기열 초과 등) 시험 호출 자리 반납
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.failures_total += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened_total += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures_total": self.failures_total,
+                "rejected_total": self.rejected_total,
+                "opened_total": self.opened_total
+            }
+
+
+class RetryPolicy:
+    """시도별 타임아웃, 호출 전체 마감, full jitter 지수 백오프 재시도 설정"""
+
+    def __init__(self, timeout=10.0, deadline=20.0, max_retries=2, backoff_base=0.25, backoff_max=2.0):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries_total = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            timeout=float(os.getenv('UPSTREAM_TIMEOUT', 10.0)),
+            deadline=float(os.getenv('UPSTREAM_DEADLINE', 20.0)),
+            max_retries=int(os.getenv('UPSTREAM_MAX_RETRIES', 2)),
+        )
+
+    def attempt_timeout(self, started):
+        # 남은 마감 시간을 넘지 않는 이번 시도의 타임아웃 (next_delay가 마감 전 재시도만 허용)
+        return min(self.timeout, self.deadline - (time.monotonic() - started))
+
+    def next_delay(self, attempt, started, error):
+        # 다시 시도할 대기 시간, 재시도하지 않을 오류거나 횟수/마감을 넘으면 None
+        if not is_retryable(error) or attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if time.monotonic() - started + delay >= self.deadline:
+            return None
+        self.retries_total += 1
+        return delay
+
+
+class ResilientUpstream:
+    """CounselingChatbot과 EmotionAnalyzer가 공유하는 동기 OpenAI 호출 래퍼
+
+    호출마다 마감 시간 안에서만 재시도하고, 서킷 브레이커가 열려 있으면
+    업스트림을 기다리지 않고 CircuitOpen을 던져 호출 측이 바로 대체 응답을 쓰게 한다.
+    """
+
+    def __init__(self, client=None, breaker=None, retry=None, api_key=None):
+        self.api_key = api_key
+        self.breaker = breaker or CircuitBreaker()
+        self.retry = retry or RetryPolicy()
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, api_key, breaker=None):
+        return cls(api_key=api_key, breaker=breaker or CircuitBreaker.from_env(), retry=RetryPolicy.from_env())
+
+    @property
+    def client(self):
+        # 처음 호출할 때 openai를 불러와 클라이언트 생성 (SDK 자체 재시도는 끄고 이 래퍼의 재시도 정책만 사용)
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import openai
+                    self._client = openai.OpenAI(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    def call(self, func, **kwargs):
+        probe = self.breaker.before_call()
+        settled = False
+        try:
+            started = time.monotonic()
+            attempt = 0
+            while True:
+                try:
+                    result = func(timeout=self.retry.attempt_timeout(started), **kwargs)
+                except Exception as e:
+                    delay = self.retry.next_delay(attempt, started, e)
+                    if delay is None:
+                        settled = True
+                        if is_retryable(e):
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()  # 업스트림은 응답함
+                        raise
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                settled = True
+                self.breaker.record_success()
+                return result
+        finally:
+            # 결과를 기록하지 못하고 끝난 시험 호출(KeyboardInterrupt 등)의 자리 반납
+            if probe and not settled:
+                self.breaker.release()
+
+    def chat(self, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = self.call(self.client.chat.completions.create, **kwargs)
+            outcome = "success"
+            return result
+        except CircuitOpen:
+            outcome = "rejected"
+            raise
+        finally:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, mode="sync", outcome=outcome)
+
+    def stats(self):
+        return {"breaker": self.breaker.stats(), "retries_total": self.retry.retries_total}
+
+
+class UsageStats:
+    """응답의 usage 필드로 호출 종류별 토큰 사용량(프롬프트 캐시 적중분 포함)을 누적"""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, usage):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        with self._lock:
+            totals = self._totals.setdefault(kind, {
+                "requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0
+            })
+            totals["requests"] += 1
+            totals["prompt_tokens"] += usage.prompt_tokens or 0
+            totals["cached_tokens"] += cached
+            totals["completion_tokens"] += usage.completion_tokens or 0
+        LLM_TOKENS.observe(usage.prompt_tokens or 0, kind=kind, direction="in")
+        LLM_TOKENS.observe(usage.completion_tokens or 0, kind=kind, direction="out")
+        if cached:
+            LLM_CACHED_TOKENS.inc(cached, kind=kind)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for kind, totals in self._totals.items():
+                prompt_tokens = totals["prompt_tokens"]
+                result[kind] = {
+                    **totals,
+                    "uncached_tokens": prompt_tokens - totals["cached_tokens"],
+                    "cache_hit_ratio": round(totals["cached_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0
+                }
+            return result
+
+
+class HeldStream:
+    """스트리밍 응답을 끝까지 읽거나 닫을 때까지 AsyncUpstream의 동시성 permit을 잡아 두는 래퍼"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """응답 연결을 닫고 permit 반환 (여러 번 호출해도 한 번만 반환)"""
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                await close()
+        finally:
+            release()
+
+
+class AsyncUpstream:
+    """CounselingChatbot과 EmotionAnalyzer가 공유하는 비동기 OpenAI 호출 풀
+
+    하나의 httpx.AsyncClient(커넥션 풀)를 AsyncOpenAI에 주입하고,
+    세마포어로 동시에 나가는 업스트림 호출 수를, 대기 카운터로 대기열 길이를 제한한다.
+    """
+
+    def __init__(self, api_key, max_concurrency=64, max_queue=512,
+                 max_connections=100, max_keepalive_connections=20, timeout=30.0,
+                 breaker=None, retry=None):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.timeout = timeout
+        # 동기 경로(ResilientUpstream)와 같은 브레이커를 공유하면 장애 판단도 공유된다
+        self.breaker = breaker or CircuitBreaker()
+        self.retry = retry or RetryPolicy(timeout=timeout)
+
+        self._http_client = None
+        self._client = None
+        self._semaphore = None
+        self._in_flight = 0
+        self._waiting = 0
+
+    @classmethod
+    def from_env(cls, api_key, breaker=None):
+        # 환경 변수로 동시성/대기열 한도, 타임아웃/재시도 설정
+        retry = RetryPolicy.from_env()
+        return cls(
+            api_key,
+            max_concurrency=int(os.getenv('UPSTREAM_MAX_CONCURRENCY', 64)),
+            max_queue=int(os.getenv('UPSTREAM_MAX_QUEUE', 512)),
+            max_connections=int(os.getenv('UPSTREAM_MAX_CONNECTIONS', 100)),
+            timeout=retry.timeout,
+            breaker=breaker or CircuitBreaker.from_env(),
+            retry=retry,
+        )
+
+    @property
+    def client(self):
+        # 이벤트 루프 안에서 처음 사용할 때 클라이언트 생성
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections
+                ),
+                timeout=self.timeout
+            )
+            self._client = AsyncOpenAI(api_key=self.api_key, http_client=self._http_client, max_retries=0)
+        return self._client
+
+    async def call(self, func, *args, **kwargs):
+        """동시성 한도 안에서 업스트림 함수 호출
+
+        stream=True 호출은 응답 스트림을 다 읽거나 닫을 때까지 permit을 유지하도록 HeldStream으로 감싼다.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self._waiting >= self.max_queue:
+            raise UpstreamOverloaded(f"업스트림 대기열 초과 ({self._waiting}/{self.max_queue})")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        held = False
+        try:
+            result = await func(*args, **kwargs)
+            if kwargs.get("stream"):
+                held = True
+                return HeldStream(result, self._release)
+            return result
+        finally:
+            if not held:
+                self._release()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    async def chat(self, **kwargs):
+        """마감 시간 안에서 재시도하는 chat.completions 호출 (브레이커가 열려 있으면 CircuitOpen)"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self._chat_with_retry(**kwargs)
+            outcome = "success"
+            return result
+        except (CircuitOpen, UpstreamOverloaded):
+            outcome = "rejected"
+            raise
+        finally:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, mode="async", outcome=outcome)
+
+    async def _chat_with_retry(self, **kwargs):
+        probe = self.breaker.before_call()
+        settled = False
+        try:
+            started = time.monotonic()
+            attempt = 0
+            while True:
+                try:
+                    result = await self.call(self.client.chat.completions.create,
+                                             timeout=self.retry.attempt_timeout(started), **kwargs)
+                except UpstreamOverloaded:
+                    raise
+                except Exception as e:
+                    delay = self.retry.next_delay(attempt, started, e)
+                    if delay is None:
+                        settled = True
+                        if is_retryable(e):
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()  # 업스트림은 응답함
+                        raise
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+                settled = True
+                self.breaker.record_success()
+                return result
+        finally:
+            # 업스트림 결과 없이 끝난 시험 호출(대기열 초과, 취소 등)의 자리 반납
+            if probe and not settled:
+                self.breaker.release()
+
+    def stats(self):
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "breaker": self.breaker.stats(),
+            "retries_total": self.retry.retries_total
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
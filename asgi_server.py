@@ -0,0 +1,287 @@
+"""비동기(ASGI) 서빙 모드
+
+LLM 왕복 동안 워커 스레드를 붙잡지 않도록 /chat, /chat/stream, /analyze_emotion을
+asyncio로 처리하고, 대시보드 실시간 스트림(SSE)도 스레드 없이 이벤트 루프에서 보낸다.
+나머지 페이지/대시보드 요청은 기존 Flask 앱으로 넘긴다.
+
+실행: uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+운영: SERVER_MODE=asgi gunicorn -c gunicorn.conf.py
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from run_server import TRUSTED_PROXY_HOPS, app as flask_app, services
+from metrics import REQUEST_SECONDS
+from ratelimit import RateLimitExceeded
+from upstream import UpstreamOverloaded
+
+# CounselingChatbot과 EmotionAnalyzer가 하나의 커넥션 풀과 동시성 한도를 공유
+# (서킷 브레이커는 동기 경로와 같은 인스턴스를 사용, 구성 요소는 첫 요청에서 생성)
+services.async_mode = True
+
+# Flask로 넘기는 요청(페이지, 대시보드, 리소스 추천)을 처리하는 스레드 수 (실시간 스트림은 이벤트 루프에서 처리)
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', max(32, (os.cpu_count() or 1) * 8)))
+# 스레드는 첫 요청 때 생기므로 gunicorn preload(fork 전)에 만들어도 안전
+wsgi_executor = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix='wsgi')
+
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    # 기본 WsgiToAsgi는 모든 WSGI 요청을 스레드 하나에서 차례로 실행해, SSE 연결이나 느린 리소스 추천 하나가
+    # 나머지 페이지/대시보드 요청을 막는다. 스레드 풀에서 병렬로 실행한다.
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False,
+                                 executor=wsgi_executor)
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+wsgi_app = ThreadPoolWsgiToAsgi(flask_app)
+
+
+async def read_json(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    try:
+        return json.loads(body or b'{}')
+    except ValueError:
+        return {}
+
+
+async def send_json(send, payload, status=200, headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json; charset=utf-8'),
+            (b'content-length', str(len(body)).encode()),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def client_address(scope, proxy_hops=None):
+    # Flask 쪽 ProxyFix와 같은 규칙: X-Forwarded-For의 오른쪽에서 proxy_hops번째 값 (값이 모자라면 연결 주소)
+    proxy_hops = TRUSTED_PROXY_HOPS if proxy_hops is None else proxy_hops
+    address = (scope.get('client') or ('unknown',))[0]
+    if proxy_hops:
+        forwarded = [value.strip() for name, header in scope.get('headers', ()) if name == b'x-forwarded-for'
+                     for value in header.decode('latin-1').split(',')]
+        if len(forwarded) >= proxy_hops:
+            address = forwarded[-proxy_hops]
+    return address
+
+
+def rate_limit_key(scope, user_id=None):
+    # 프론트엔드 기본값(default_user)은 여러 사용자가 공유하므로 클라이언트 IP로 구분
+    if not user_id or user_id == 'default_user':
+        return f"ip:{client_address(scope)}"
+    return user_id
+
+
+async def send_rate_limited(send, e):
+    retry_after = str(max(1, math.ceil(e.retry_after))).encode()
+    await send_json(send, {'error': str(e), 'retry_after': round(e.retry_after, 2)}, 429,
+                    headers=[(b'retry-after', retry_after)])
+
+
+def parse_chat_request(data):
+    return (
+        data.get('user_id', 'default_user'),
+        data.get('message', ''),
+        data.get('character', '멜랑콜리'),
+        data.get('category', 'personal')
+    )
+
+
+async def chat(scope, receive, send):
+    data = await read_json(receive)
+    user_id, message, character, category = parse_chat_request(data)
+    if not message:
+        return await send_json(send, {'error': '메시지가 비어있습니다.'}, 400)
+    try:
+        # 공유 저장소를 쓰는 제한기는 SQLite 트랜잭션을 열므로 이벤트 루프 밖에서 확인
+        await asyncio.to_thread(services.rate_limiter.check, rate_limit_key(scope, user_id))
+    except RateLimitExceeded as e:
+        return await send_rate_limited(send, e)
+
+    try:
+        if data.get('analyze_emotion'):
+            result = await services.chatbot.aprocess_message_with_emotion(user_id, message, character, category)
+        else:
+            result = await services.chatbot.aprocess_message(user_id, message, character, category)
+    except UpstreamOverloaded as e:
+        return await send_json(send, {'error': str(e)}, 503)
+    except Exception as e:
+        return await send_json(send, {'error': f'오류발생 : {str(e)}'}, 500)
+    await send_json(send, result)
+
+
+async def chat_stream(scope, receive, send):
+    user_id, message, character, category = parse_chat_request(await read_json(receive))
+    if not message:
+        return await send_json(send, {'error': '메시지가 비어있습니다.'}, 400)
+    try:
+        # 공유 저장소를 쓰는 제한기는 SQLite 트랜잭션을 열므로 이벤트 루프 밖에서 확인
+        await asyncio.to_thread(services.rate_limiter.check, rate_limit_key(scope, user_id))
+    except RateLimitExceeded as e:
+        return await send_rate_limited(send, e)
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+    tokens = services.chatbot.astream_message(user_id, message, character, category)
+    try:
+        async for token in tokens:
+            event = f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+            await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+        final = "event: done\ndata: {}\n\n"
+    except Exception as e:
+        error = json.dumps({'error': f'오류발생 : {str(e)}'}, ensure_ascii=False)
+        final = f"event: error\ndata: {error}\n\n"
+    finally:
+        # 클라이언트가 끊겨 send가 실패해도 바로 닫아 업스트림 permit을 돌려주고 대화를 기록
+        await tokens.aclose()
+    await send({'type': 'http.response.body', 'body': final.encode('utf-8')})
+
+
+async def analyze_emotion(scope, receive, send):
+    data = await read_json(receive)
+    text = data.get('text', '')
+    if not text:
+        return await send_json(send, {'error': '텍스트가 비어있습니다.'}, 400)
+    try:
+        await asyncio.to_thread(services.rate_limiter.check, rate_limit_key(scope, data.get('user_id')),
+                                scope="emotion")
+    except RateLimitExceeded as e:
+        return await send_rate_limited(send, e)
+
+    emotion = await services.emotion_analyzer.aanalyze_emotion(text)
+    await send_json(send, emotion)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def dashboard_events(scope, receive, send, channel):
+    # 대시보드 실시간 변경분 (SSE): 이벤트 루프에서 기다려 연결마다 스레드를 붙잡지 않음
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+
+    async def pump():
+        async for chunk in services.chatbot.events.astream(channel):
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+
+    streaming = asyncio.ensure_future(pump())
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    done = set()
+    try:
+        done, _ = await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        streaming.cancel()
+        disconnected.cancel()
+    if streaming in done and streaming.exception() is None:
+        # 서버 종료(broker.close)로 스트림이 끝남
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def event_channel(path):
+    """SSE 경로의 채널 이름 (/api/admin/dashboard/events, /api/dashboard/<user_id>/events)"""
+    if path == '/api/admin/dashboard/events':
+        return "admin"
+    parts = path.split('/')
+    if len(parts) == 5 and parts[1:3] == ['api', 'dashboard'] and parts[3] and parts[4] == 'events':
+        return f"user:{parts[3]}"
+    return None
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # 워커별 예열: 첫 요청 전에 구성 요소와 OpenAI 클라이언트 생성
+            try:
+                services.warm_up()
+            except Exception as e:
+                print(f"워커 예열 중 오류 발생: {e}")
+            # 종료 신호가 오면 새 요청을 막고 대시보드 실시간 스트림을 닫아 진행 중인 연결이 끝나게 함
+            services.drain_on_signals()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            services.drain()
+            if services.built('async_upstream'):
+                await services.async_upstream.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+ASYNC_ROUTES = {
+    ('POST', '/chat'): chat,
+    ('POST', '/chat/stream'): chat_stream,
+    ('POST', '/analyze_emotion'): analyze_emotion,
+}
+
+
+async def timed(handler, scope, receive, send):
+    # 비동기 라우트 처리 시간 기록 (Flask 라우트는 run_server의 after_request에서 기록)
+    started = time.perf_counter()
+    status = [500]
+
+    async def send_with_status(message):
+        if message['type'] == 'http.response.start':
+            status[0] = message['status']
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_with_status)
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                method=scope['method'], route=scope['path'], status=status[0])
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] == 'http':
+        handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+        if handler is not None:
+            if services.draining:
+                return await send_json(send, {'error': '서버를 종료하는 중입니다. 잠시 후 다시 시도해주세요.'}, 503,
+                                       headers=[(b'retry-after', b'1'), (b'connection', b'close')])
+            return await timed(handler, scope, receive, send)
+        channel = event_channel(scope['path']) if scope['method'] == 'GET' else None
+        if channel is not None and not services.draining:
+            return await dashboard_events(scope, receive, send, channel)
+
+    # 비동기 처리 대상이 아닌 요청은 Flask 앱으로 위임
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,83 @@
+"""오프라인 벤치마크용 네이버 블로그 검색 결과 가짜 페이지
+
+CounselingChatbot._search_naver_blog가 읽는 구조(li.bx, a.title_link, div.dsc,
+a.sub_time, span.sub_time, img)를 흉내 낸 HTML을 돌려준다.
+
+단독 실행: python benchmarks/fake_naver.py --port 8082 --latency-ms 80
+"""
+import argparse
+import html
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+POST_TEMPLATE = """
+<li class="bx">
+  <div class="user_box"><a class="sub_time" href="https://blog.naver.com/bench{index}">힐링 블로그 {index}</a>
+  <span class="sub_time">2025.01.{day:02d}.</span></div>
+  <a class="title_link" href="https://blog.naver.com/bench{index}/22{index:07d}">{query} 이야기 {index}</a>
+  <div class="dsc">{query}에 대해 직접 겪은 경험과 도움이 되었던 방법들을 정리했습니다. {filler}</div>
+  <img src="https://blogthumb.pstatic.net/bench{index}.jpg">
+</li>"""
+
+
+def render_page(query, posts=10):
+    filler = "마음을 돌보는 작은 습관부터 시작해 보세요. " * 6
+    items = "".join(
+        POST_TEMPLATE.format(index=i, day=i % 28 + 1, query=html.escape(query), filler=filler)
+        for i in range(posts)
+    )
+    # 실제 검색 페이지처럼 결과 목록 앞뒤에 관련 없는 마크업을 둔다
+    padding = "<div class='api_subject_bx'><span>관련 검색어</span></div>" * 50
+    return f"<html><head><title>{html.escape(query)} : 네이버 블로그검색</title></head><body>{padding}" \
+           f"<ul class='lst_view'>{items}</ul>{padding}</body></html>"
+
+
+class FakeNaverConfig:
+    def __init__(self, latency_ms=80.0, jitter_ms=20.0, posts=10):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.posts = posts
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            query = params.get("query", [""])[0]
+            time.sleep(max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000)
+            body = render_page(query, config.posts).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def start(port=0, config=None):
+    """백그라운드 스레드에서 서버 시작, (server, config) 반환"""
+    config = config or FakeNaverConfig()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--posts", type=int, default=10)
+    args = parser.parse_args()
+    server, _ = start(args.port, FakeNaverConfig(args.latency_ms, posts=args.posts))
+    print(f"가짜 네이버 검색: http://127.0.0.1:{server.server_port}/search.naver")
+    threading.Event().wait()
@@ -0,0 +1,172 @@
+"""오프라인 벤치마크용 OpenAI 호환 가짜 서버
+
+/v1/chat/completions 하나만 구현한다. 요청 형태에 맞춰 일반 응답, 스트리밍(SSE),
+counsel_reply 함수 호출, 감정 분석 JSON(단건/배치)을 돌려주며
+지연 시간과 오류 비율을 설정할 수 있다.
+
+단독 실행: python benchmarks/fake_openai.py --port 8081 --latency-ms 300 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "많이 힘드셨겠어요. 그런 상황이라면 누구라도 지칠 수밖에 없어요. 요즘 가장 마음을 무겁게 하는 일은 무엇인가요?"
+EMOTION = {
+    "primary_emotion": "불안",
+    "emotion_intensity": 6,
+    "specific_emotions": ["걱정", "긴장"],
+    "stress_level": 6,
+    "confidence": 0.82
+}
+
+
+class FakeOpenAIConfig:
+    def __init__(self, latency_ms=200.0, jitter_ms=50.0, token_delay_ms=5.0, error_rate=0.0, error_status=500):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def count(self, error):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+
+
+def _completion_body(request, content=None, tool_arguments=None):
+    message = {"role": "assistant", "content": content}
+    finish_reason = "stop"
+    if tool_arguments is not None:
+        message["tool_calls"] = [{
+            "id": "call_bench",
+            "type": "function",
+            "function": {"name": "counsel_reply", "arguments": json.dumps(tool_arguments, ensure_ascii=False)}
+        }]
+        finish_reason = "tool_calls"
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-3.5-turbo"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": _usage(request, content or json.dumps(tool_arguments, ensure_ascii=False))
+    }
+
+
+def _usage(request, output):
+    prompt_chars = sum(len(str(m.get("content") or "")) for m in request.get("messages", []))
+    prompt_tokens = max(1, prompt_chars)
+    cached = 1024 if prompt_tokens >= 1024 else 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": max(1, len(output)),
+        "total_tokens": prompt_tokens + max(1, len(output)),
+        "prompt_tokens_details": {"cached_tokens": cached}
+    }
+
+
+def _reply_content(request):
+    messages = request.get("messages", [])
+    system = str(messages[0].get("content", "")) if messages else ""
+    last = str(messages[-1].get("content", "")) if messages else ""
+    if "감정 분석 AI" in system:
+        if last.startswith("["):  # 배치 요청
+            items = json.loads(last)
+            return json.dumps({"results": [{"index": item["index"], **EMOTION} for item in items]},
+                              ensure_ascii=False)
+        return json.dumps(EMOTION, ensure_ascii=False)
+    if "키워드" in last:
+        # 검색 캐시 적중/미적중이 섞이도록 키워드 일부를 바꿔 가며 반환
+        return f"스트레스, 주제{random.randint(0, 19)}, 휴식"
+    return REPLY
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+            time.sleep(delay)
+
+            if random.random() < config.error_rate:
+                config.count(error=True)
+                return self._send_json(config.error_status, {"error": {"message": "injected failure",
+                                                                         "type": "server_error"}})
+            config.count(error=False)
+
+            if request.get("tools"):
+                return self._send_json(200, _completion_body(request, tool_arguments={
+                    "reply": REPLY, "emotion": EMOTION
+                }))
+            content = _reply_content(request)
+            if request.get("stream"):
+                return self._stream(request, content)
+            self._send_json(200, _completion_body(request, content=content))
+
+        def _stream(self, request, content):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": request.get("model", "gpt-3.5-turbo")}
+            for word in content.split(" "):
+                chunk = {**base, "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(config.token_delay_ms / 1000)
+            if (request.get("stream_options") or {}).get("include_usage"):
+                chunk = {**base, "choices": [], "usage": _usage(request, content)}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return Handler
+
+
+def start(port=0, config=None):
+    """백그라운드 스레드에서 서버 시작, (server, config) 반환"""
+    config = config or FakeOpenAIConfig()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--token-delay-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    args = parser.parse_args()
+    server, _ = start(args.port, FakeOpenAIConfig(args.latency_ms, args.jitter_ms, args.token_delay_ms,
+                                                  args.error_rate, args.error_status))
+    print(f"가짜 OpenAI 서버: http://127.0.0.1:{server.server_port}/v1")
+    threading.Event().wait()
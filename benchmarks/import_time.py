@@ -0,0 +1,79 @@
+"""서버 모듈 import 시간 예산 점검
+
+새 파이썬 프로세스에서 `python -X importtime -c "import run_server"`를 여러 번 실행해
+run_server의 누적 import 시간(중앙값)과 가장 느린 모듈을 보고한다.
+예산을 넘거나, 첫 요청 전까지 불러오지 않아야 할 무거운 모듈(openai 등)이 import 시점에
+불러와지면 종료 코드 1로 끝난다.
+
+실행 예:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 400 --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# 첫 요청(또는 /readyz) 전까지 불러오지 않아야 하는 모듈
+DEFERRED_MODULES = ("openai", "httpx", "requests", "bs4", "lxml", "tiktoken")
+
+
+def parse_importtime(stderr):
+    """-X importtime 출력 → {모듈: (self_us, cumulative_us)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if len(parts) != 3:
+            continue
+        modules[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def measure(module):
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.pop("OPENAI_API_KEY", None)  # 키 없이도 import가 되어야 한다
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} import 실패:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="서버 모듈 import 시간 예산 점검")
+    parser.add_argument("--module", default="run_server")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="누적 import 시간 예산(중앙값)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="출력할 느린 모듈 수 (자체 시간 기준)")
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals = [modules[args.module][1] / 1000 for modules in runs]
+    median_ms = statistics.median(totals)
+    last = runs[-1]
+
+    print(f"{args.module} import: 중앙값 {median_ms:.1f}ms (최소 {min(totals):.1f}ms, 최대 {max(totals):.1f}ms, "
+          f"{args.runs}회), 예산 {args.budget_ms:.0f}ms")
+    print(f"{'self ms':>9}{'cumulative ms':>15}  module")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda item: item[1][0],
+                                                  reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>15.1f}  {name}")
+
+    failed = False
+    loaded = [name for name in DEFERRED_MODULES if name in last]
+    if loaded:
+        failed = True
+        print(f"import 시점에 불러오면 안 되는 모듈: {', '.join(loaded)}")
+    if median_ms > args.budget_ms:
+        failed = True
+        print(f"import 시간 예산 초과: {median_ms:.1f}ms > {args.budget_ms:.0f}ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""오프라인 부하 테스트
+
+가짜 OpenAI 서버와 가짜 네이버 검색 페이지를 띄우고, 같은 프로세스에서 Flask 앱을
+실제 HTTP 서버로 실행한 뒤 시나리오별로 목표 동시성만큼 요청을 보내
+p50/p95/p99 지연 시간, 처리량, 오류율, 메모리(RSS)를 보고한다.
+
+실행 예:
+    python benchmarks/load.py                          # 전체 시나리오
+    python benchmarks/load.py --scenario chat --concurrency 32 --requests 500
+    python benchmarks/load.py --quick --max-p95-ms 3000 --max-error-rate 0.01   # CI
+
+--server를 주면 앱을 별도 프로세스(개발 서버, gunicorn, uvicorn)로 띄워 같은 시나리오로 비교한다.
+이때 메모리는 서버 프로세스 그룹 전체의 PSS(공유 페이지를 프로세스 수로 나눈 값) 합계다.
+    python benchmarks/load.py --server dev --concurrency 64
+    python benchmarks/load.py --server gunicorn --concurrency 64
+    WEB_CONCURRENCY=4 ALLOW_MULTI_WORKER=1 CONVERSATION_STORE=sqlite:///data/bench.db \
+        RATE_LIMIT_BACKEND=sqlite:///data/bench-rl.db python benchmarks/load.py --server gunicorn-asgi --concurrency 64
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import fake_naver
+import fake_openai
+
+SCENARIO_ORDER = ("chat", "chat_emotion", "chat_stream", "recommend_resources", "user_dashboard",
+                  "admin_dashboard")
+MESSAGES = ["요즘 너무 힘들어요", "상사 때문에 스트레스 받아요", "고객이 소리를 질러서 속상했어요",
+            "잠을 잘 못 자고 있어요", "일이 너무 많아서 지쳤어요", "오늘은 조금 괜찮아요"]
+CHARACTERS = [("플로라무", "customer"), ("심쿵비비", "work"), ("멜랑콜리", "personal")]
+# --server 별 실행 명령 ({port}는 빈 포트로 채움), 추가 환경 변수
+SERVERS = {
+    "dev": ([sys.executable, "run_server.py"], {"FLASK_DEBUG": "0"}),
+    "gunicorn": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], {"SERVER_MODE": "wsgi"}),
+    "gunicorn-asgi": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"], {"SERVER_MODE": "asgi"}),
+    "uvicorn": ([sys.executable, "-m", "uvicorn", "asgi_server:app", "--host", "127.0.0.1", "--port", "{port}",
+                 "--no-access-log"], {}),
+}
+
+
+def percentile(sorted_values, p):
+    # 최근접 순위 방식 백분위수
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def current_rss_mb():
+    # Linux는 /proc에서 현재 RSS, 그 외에는 최대 RSS
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage / 1024 if sys.platform != "darwin" else usage / 1024 / 1024
+
+
+def process_group_memory_mb(pgid):
+    """프로세스 그룹(서버 마스터 + 워커)의 PSS 합계, PSS를 읽을 수 없으면 RSS 합계"""
+    total_kb = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # comm에 공백이 있을 수 있어 마지막 ')' 뒤에서 필드를 읽음 (state ppid pgrp ...)
+                if int(f.read().rsplit(")", 1)[1].split()[2]) != pgid:
+                    continue
+            with open(f"/proc/{entry}/smaps_rollup") as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith(("Pss:", "Rss:")))
+        except (OSError, ValueError, IndexError, StopIteration):
+            continue
+    return total_kb / 1024
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def chat_body(i, users):
+    character, category = CHARACTERS[i % len(CHARACTERS)]
+    return {"user_id": f"bench_user_{i % users}", "message": random.choice(MESSAGES),
+            "character": character, "category": category}
+
+
+def scenario_request(name, session, base_url, i, users):
+    """시나리오 요청 1건 실행, HTTP 상태 코드 반환"""
+    if name == "chat":
+        return session.post(f"{base_url}/chat", json=chat_body(i, users), timeout=60).status_code
+    if name == "chat_emotion":
+        body = {**chat_body(i, users), "analyze_emotion": True}
+        return session.post(f"{base_url}/chat", json=body, timeout=60).status_code
+    if name == "chat_stream":
+        with session.post(f"{base_url}/chat/stream", json=chat_body(i, users), stream=True, timeout=60) as response:
+            for _ in response.iter_content(chunk_size=None):
+                pass
+            return response.status_code
+    if name == "recommend_resources":
+        body = {"user_id": f"bench_user_{i % users}", "category": CHARACTERS[i % 3][1],
+                "conversation_history": [{"user": random.choice(MESSAGES), "bot": fake_openai.REPLY}] * 3}
+        return session.post(f"{base_url}/recommend_resources", json=body, timeout=60).status_code
+    if name == "user_dashboard":
+        return session.get(f"{base_url}/api/dashboard/bench_user_{i % users}", timeout=60).status_code
+    if name == "admin_dashboard":
+        return session.get(f"{base_url}/api/admin/dashboard", timeout=60).status_code
+    raise ValueError(f"알 수 없는 시나리오: {name}")
+
+
+def run_scenario(name, base_url, concurrency, total, users, memory_mb=current_rss_mb):
+    local = threading.local()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            ok = 200 <= scenario_request(name, session, base_url, i, users) < 300
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            errors[0] += not ok
+
+    rss_before = memory_mb()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors[0],
+        "error_rate": round(errors[0] / total, 4) if total else 0.0,
+        "throughput_rps": round(total / duration, 1) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "rss_mb": round(memory_mb(), 1),
+        "rss_delta_mb": round(memory_mb() - rss_before, 1)
+    }
+
+
+def start_app():
+    """환경 변수를 가짜 서버로 맞춘 뒤 run_server를 불러와 실제 HTTP 서버로 실행"""
+    from werkzeug.serving import make_server
+    import run_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # 요청별 접근 로그 끔
+    server = make_server("127.0.0.1", 0, run_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, run_server
+
+
+def start_server_process(kind, timeout=60.0):
+    """현재 환경 변수(가짜 서버 주소)로 서버 프로세스를 띄우고 /healthz가 응답할 때까지 대기"""
+    command, extra_env = SERVERS[kind]
+    port = free_port()
+    env = {**os.environ, **extra_env, "PORT": str(port), "BIND": f"127.0.0.1:{port}"}
+    # 새 세션으로 띄워 워커까지 한 번에 종료하고 메모리를 그룹 단위로 잼
+    # 서버 로그(접근 로그 포함)는 파일로 남기고 시작 실패 시에만 출력
+    log = open(ROOT / "benchmarks" / f".{kind}-server.log", "w")
+    process = subprocess.Popen([part.format(port=port) for part in command], cwd=ROOT, env=env,
+                               stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    log.close()
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{kind} 서버가 종료되었습니다 (종료 코드 {process.returncode}), "
+                               f"로그: benchmarks/.{kind}-server.log")
+        try:
+            requests.get(f"{base_url}/healthz", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop_server_process(process)
+    raise RuntimeError(f"{kind} 서버가 {timeout:.0f}초 안에 뜨지 않았습니다")
+
+
+def stop_server_process(process, timeout=40.0):
+    # SIGTERM으로 graceful 종료, 시간 안에 끝나지 않으면 강제 종료
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KB HUG AI 오프라인 부하 테스트")
+    parser.add_argument("--scenario", action="append", choices=SCENARIO_ORDER,
+                        help="실행할 시나리오 (여러 번 지정 가능, 기본은 전체)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="시나리오당 요청 수")
+    parser.add_argument("--users", type=int, default=50, help="요청에 돌려 쓸 user_id 수")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency-ms", type=float, default=80.0)
+    parser.add_argument("--server", choices=("inprocess", *SERVERS), default="inprocess",
+                        help="앱 실행 방식 (기본: 이 프로세스 안의 werkzeug 스레드 서버)")
+    parser.add_argument("--quick", action="store_true", help="CI용 짧은 실행 (요청 60건, LLM 지연 50ms)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    parser.add_argument("--max-p95-ms", type=float, help="어느 시나리오든 p95가 이 값을 넘으면 종료 코드 1")
+    parser.add_argument("--max-error-rate", type=float, help="어느 시나리오든 오류율이 이 값을 넘으면 종료 코드 1")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.requests = min(args.requests, 60)
+        args.llm_latency_ms = min(args.llm_latency_ms, 50.0)
+        args.search_latency_ms = min(args.search_latency_ms, 20.0)
+
+    llm_server, llm = fake_openai.start(config=fake_openai.FakeOpenAIConfig(
+        latency_ms=args.llm_latency_ms, jitter_ms=args.llm_latency_ms / 4, error_rate=args.llm_error_rate))
+    search_server, _ = fake_naver.start(config=fake_naver.FakeNaverConfig(
+        latency_ms=args.search_latency_ms, jitter_ms=args.search_latency_ms / 4))
+
+    # 외부 네트워크 없이 가짜 서버만 사용하고, 부하 테스트가 요청 한도에 막히지 않도록 설정
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_server.server_port}/v1",
+        "NAVER_SEARCH_URL": f"http://127.0.0.1:{search_server.server_port}/search.naver",
+        "RATE_LIMIT_USER_RATE": "1000000",
+        "RATE_LIMIT_USER_BURST": "1000000",
+        "RATE_LIMIT_GLOBAL_RATE": "1000000",
+        "RATE_LIMIT_GLOBAL_BURST": "1000000",
+    })
+    process = None
+    if args.server == "inprocess":
+        app_server, _ = start_app()
+        base_url = f"http://127.0.0.1:{app_server.server_port}"
+        memory_mb = current_rss_mb
+    else:
+        process, base_url = start_server_process(args.server)
+        memory_mb = lambda: process_group_memory_mb(process.pid)
+    # 실제 배포처럼 준비 확인(구성 요소/클라이언트 생성)을 마친 뒤 측정
+    requests.get(f"{base_url}/readyz", timeout=60)
+
+    results = []
+    try:
+        print(f"server: {args.server}")
+        print(f"{'scenario':<20}{'req':>6}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'rss MB':>9}")
+        for name in args.scenario or SCENARIO_ORDER:
+            result = run_scenario(name, base_url, args.concurrency, args.requests, args.users, memory_mb)
+            results.append(result)
+            print(f"{name:<20}{result['requests']:>6}{result['error_rate'] * 100:>6.1f}%"
+                  f"{result['throughput_rps']:>8}{result['p50_ms']:>8}ms{result['p95_ms']:>7}ms"
+                  f"{result['p99_ms']:>7}ms{result['rss_mb']:>9}")
+        print(f"가짜 OpenAI 요청 {llm.requests}건 (주입 오류 {llm.errors}건)")
+    finally:
+        if process is not None:
+            stop_server_process(process)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    failed = [
+        r["scenario"] for r in results
+        if (args.max_p95_ms is not None and r["p95_ms"] > args.max_p95_ms)
+        or (args.max_error_rate is not None and r["error_rate"] > args.max_error_rate)
+    ]
+    if failed:
+        print(f"기준 초과 시나리오: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
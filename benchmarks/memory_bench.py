@@ -0,0 +1,100 @@
+"""대화/감정 기록 메모리 사용량 벤치마크
+
+사용자 N명에게 메시지와 감정 기록을 채운 뒤 tracemalloc으로 사용자 1명당 할당 바이트를 잰다.
+기존 방식(메시지마다 dict + ISO 문자열, 감정마다 dict + datetime + 감정 dict)과
+열 단위 저장소(records.MessageColumns/EmotionColumns)를 비교한다.
+
+실행 예:
+    python benchmarks/memory_bench.py --users 2000 --messages 40 --emotions 20
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from storage import BoundedConversationStore, InMemoryConversationStore
+
+MESSAGES = ["요즘 너무 힘들어요", "상사 때문에 스트레스 받아요", "고객이 소리를 질러서 속상했어요",
+            "잠을 잘 못 자고 있어요", "일이 너무 많아서 지쳤어요", "오늘은 조금 괜찮아요"]
+EMOTIONS = [
+    {"primary_emotion": "불안", "emotion_intensity": 6, "specific_emotions": ["걱정", "긴장"],
+     "stress_level": 6, "confidence": 0.82},
+    {"primary_emotion": "부정", "emotion_intensity": 7, "specific_emotions": ["우울"],
+     "stress_level": 7, "confidence": 0.64},
+    {"primary_emotion": "중립", "emotion_intensity": 2, "specific_emotions": [],
+     "stress_level": 3, "confidence": 0.75},
+]
+
+
+class DictStore:
+    """기존 메모리 저장소의 기록 형태 (비교 기준)"""
+
+    def __init__(self):
+        self._messages = {}
+        self._emotions = {}
+
+    def append_message(self, user_id, role, content, category=None, timestamp=None):
+        self._messages.setdefault(user_id, []).append({
+            "role": role, "content": content, "timestamp": datetime.fromtimestamp(timestamp).isoformat()
+        })
+
+    def append_emotion(self, user_id, emotion, stress_score, timestamp=None):
+        self._emotions.setdefault(user_id, []).append({
+            "timestamp": datetime.fromtimestamp(timestamp), "emotion": emotion, "stress_score": stress_score
+        })
+
+
+def fill(store, users, messages, emotions):
+    now = time.time()
+    for u in range(users):
+        user_id = f"user_{u}"
+        for i in range(messages):
+            # 내용 문자열은 요청마다 새로 만들어지므로 공유되지 않게 복사
+            content = "".join(list(random.choice(MESSAGES)))
+            store.append_message(user_id, "user" if i % 2 == 0 else "assistant", content, timestamp=now + i)
+        for i in range(emotions):
+            # 감정 분석 결과도 호출마다 새 dict (json.loads 결과)
+            emotion = {k: (list(v) if isinstance(v, list) else v) for k, v in random.choice(EMOTIONS).items()}
+            store.append_emotion(user_id, emotion, round(random.uniform(1, 10), 2), timestamp=now + i)
+
+
+def measure(factory, users, messages, emotions):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = factory()
+    fill(store, users, messages, emotions)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / users, store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="대화/감정 기록 메모리 사용량 벤치마크")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=40, help="사용자당 메시지 수")
+    parser.add_argument("--emotions", type=int, default=20, help="사용자당 감정 기록 수")
+    args = parser.parse_args(argv)
+
+    stores = [
+        ("dict (기존)", DictStore),
+        ("memory", InMemoryConversationStore),
+        ("bounded", lambda: BoundedConversationStore(max_messages=args.messages, memory_budget=1 << 40)),
+    ]
+    baseline = None
+    print(f"{'store':<14}{'bytes/user':>12}{'ratio':>8}")
+    for name, factory in stores:
+        per_user, _ = measure(factory, args.users, args.messages, args.emotions)
+        baseline = baseline or per_user
+        print(f"{name:<14}{per_user:>12.0f}{baseline / per_user:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""정적 페이지 전송량/CPU 벤치마크
+
+1. 페이지 조회당 서버 시간: 매번 render_template(기존)과 캐시한 렌더링 결과(app/assets.PageCache) 응답 비교
+2. 첫 방문 전송량: 페이지 HTML과 페이지가 참조하는 이미지를
+   기존(압축 없는 HTML + PNG)과 현재(brotli HTML + srcset/sizes에 맞는 WebP 변형)로 비교
+3. 재방문: ETag 재검증(304)과 해시 URL(immutable, 요청 없음)
+
+실행 예:
+    python benchmarks/page_bench.py --iterations 2000 --dpr 2
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import run_server
+from run_server import STATIC_PAGES
+
+SOURCE_SIZES = re.compile(r'<source type="image/webp" srcset="([^"]+)" sizes="([^"]+)">')
+IMG_SRC = re.compile(r'<img src="(/static/[^"]+)"')
+
+
+def time_per_call(fn, iterations):
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def pick_variant(srcset, sizes, dpr):
+    """브라우저처럼 sizes의 마지막(기본) 값 × dpr 이상인 가장 작은 변형 선택"""
+    slot = float(re.search(r"(\d+)px\s*$", sizes).group(1)) * dpr
+    candidates = sorted((int(width[:-1]), url) for url, width in (item.split() for item in srcset.split(", ")))
+    return next((url for width, url in candidates if width >= slot), candidates[-1][1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="정적 페이지 전송량/CPU 벤치마크")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--dpr", type=float, default=2.0, help="이미지 변형 선택에 쓸 화면 배율")
+    args = parser.parse_args(argv)
+
+    app = run_server.app
+    client = app.test_client()
+    headers = {"Accept-Encoding": "br, gzip"}
+
+    print(f"{'page':<22}{'render us':>11}{'cached us':>11}{'html B':>9}{'br B':>7}{'first visit (old → new)':>30}")
+    for name in STATIC_PAGES:
+        path = "/" if name == "index.html" else f"/{name[:-5]}"
+        # 라우트 함수가 응답 객체를 만들 때까지의 시간 (WSGI 처리는 양쪽이 같으므로 제외)
+        with app.test_request_context(path, headers=headers):
+            render_us = time_per_call(lambda: app.make_response(run_server.render_template(name)),
+                                      args.iterations)
+            cached_us = time_per_call(lambda: run_server.static_page(name), args.iterations)
+
+        html = client.get(path).data
+        compressed = client.get(path, headers=headers).data
+        old_total, new_total = len(html), len(compressed)
+        text = html.decode("utf-8")
+        for srcset, sizes in SOURCE_SIZES.findall(text):
+            new_total += len(client.get(pick_variant(srcset, sizes, args.dpr)).data)
+        for src in IMG_SRC.findall(text):
+            old_total += len(client.get(src).data)
+        if not SOURCE_SIZES.search(text):
+            new_total += sum(len(client.get(src).data) for src in IMG_SRC.findall(text))
+        print(f"{path:<22}{render_us:>11.1f}{cached_us:>11.1f}{len(html):>9}{len(compressed):>7}"
+              f"{old_total / 1024:>17.1f}KB → {new_total / 1024:.1f}KB")
+
+    response = client.get("/chat_topics", headers=headers)
+    revalidate = client.get("/chat_topics", headers={**headers, "If-None-Match": response.headers["ETag"]})
+    print(f"재방문: /chat_topics {revalidate.status_code} ({len(revalidate.data)}B), "
+          f"이미지는 Cache-Control '{client.get(IMG_SRC.findall(client.get('/chat_topics').data.decode())[0]).headers['Cache-Control']}'")
+
+
+if __name__ == "__main__":
+    main()
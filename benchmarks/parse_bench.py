@@ -0,0 +1,72 @@
+"""네이버 블로그 검색 결과 파서 벤치마크
+
+benchmarks/fixtures의 저장된 검색 결과 페이지로 기존 BeautifulSoup(html.parser) 전체 파싱과
+증분 추출(lxml, 표준 라이브러리)을 비교한다. 먼저 모든 파서의 결과가 기존 방식과
+같은지 확인한 뒤 페이지당 처리 시간(CPU)을 보고한다.
+
+실행 예:
+    python benchmarks/parse_bench.py
+    python benchmarks/parse_bench.py --iterations 200 --chunk-size 8192
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+import search_parser
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+QUERIES = {"naver_blog_full.html": "직장 스트레스", "naver_blog_sparse.html": "불면증"}
+
+
+def chunked(data, size):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def run_parser(name, data, query, chunk_size):
+    if name == "bs4":
+        return search_parser.parse_blog_results_bs4(data.decode("utf-8"), query)
+    return search_parser.extract_blog_results(chunked(data, chunk_size), query, backend=name)
+
+
+def measure(name, data, query, chunk_size, iterations):
+    # 프로세스 CPU 시간 기준 (GIL을 잡고 있는 시간에 가까움)
+    started = time.process_time()
+    for _ in range(iterations):
+        run_parser(name, data, query, chunk_size)
+    return (time.process_time() - started) / iterations * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="네이버 블로그 검색 결과 파서 벤치마크")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=16384, help="증분 파서에 넣는 본문 조각 크기")
+    args = parser.parse_args(argv)
+
+    backends = ["bs4", "stdlib"] + (["lxml"] if search_parser.etree is not None else [])
+    if "lxml" not in backends:
+        print("lxml이 설치되어 있지 않아 lxml 파서는 건너뜁니다.")
+
+    mismatched = False
+    print(f"{'fixture':<26}{'KB':>6}{'parser':>9}{'ms/page':>10}{'speedup':>9}{'posts':>7}")
+    for fixture in sorted(FIXTURES.glob("*.html")):
+        data = fixture.read_bytes()
+        query = QUERIES.get(fixture.name, fixture.stem)
+        expected = run_parser("bs4", data, query, args.chunk_size)
+        baseline = None
+        for name in backends:
+            result = run_parser(name, data, query, args.chunk_size)
+            if result != expected:
+                mismatched = True
+                print(f"{fixture.name}: {name} 결과가 기존 파서와 다릅니다")
+            elapsed = measure(name, data, query, args.chunk_size, args.iterations)
+            baseline = baseline or elapsed
+            print(f"{fixture.name:<26}{len(data) // 1024:>6}{name:>9}{elapsed:>10.2f}"
+                  f"{baseline / elapsed:>8.1f}x{len(result):>7}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""정적 이미지의 크기별 WebP 변형 생성
+
+static/images의 PNG마다 `이름.<너비>w.webp` 파일을 만든다 (원본보다 작은 기본 너비들 + 원본 너비).
+서버(app/assets.py)는 이 파일들을 찾아 <picture>의 srcset으로 내보내고, 지원하지 않는
+브라우저에는 원본 PNG를 준다. 생성한 파일은 저장소에 함께 커밋하므로 서버에는 Pillow가 필요 없다.
+
+실행 (Pillow 필요: pip install pillow):
+    python build_assets.py
+    python build_assets.py --quality 85 --widths 64 128 256
+"""
+import argparse
+import sys
+from pathlib import Path
+
+STATIC_IMAGES = Path(__file__).parent / "static" / "images"
+# 아바타(30px)부터 캐릭터 카드(최대 약 560px)까지 1x~2x 화면을 덮는 너비
+DEFAULT_WIDTHS = (64, 128, 256, 512)
+
+
+def build_variants(source, widths, quality):
+    """PNG 하나의 WebP 변형 생성, (경로, 바이트 수) 목록 반환"""
+    from PIL import Image
+
+    built = []
+    with Image.open(source) as image:
+        width, height = image.size
+        for target in sorted({w for w in widths if w < width} | {width}):
+            resized = image if target == width else image.resize(
+                (target, max(1, round(height * target / width))), Image.LANCZOS)
+            path = source.with_name(f"{source.stem}.{target}w.webp")
+            # 알파 채널은 유지, method=6은 가장 느리지만 가장 작게 압축
+            resized.save(path, "WEBP", quality=quality, method=6)
+            built.append((path, path.stat().st_size))
+    return built
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="정적 이미지 WebP 변형 생성")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--widths", type=int, nargs="+", default=DEFAULT_WIDTHS)
+    args = parser.parse_args(argv)
+
+    for source in sorted(STATIC_IMAGES.glob("*.png")):
+        variants = build_variants(source, args.widths, args.quality)
+        sizes = ", ".join(f"{path.name.rsplit('.', 2)[1]} {size / 1024:.1f}KB" for path, size in variants)
+        print(f"{source.name} ({source.stat().st_size / 1024:.1f}KB) → {sizes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""운영 서빙 설정 (gunicorn)
+
+실행:
+    gunicorn -c gunicorn.conf.py                      # WSGI: gthread 워커 (run_server:app)
+    SERVER_MODE=asgi gunicorn -c gunicorn.conf.py     # ASGI: uvicorn 워커 (asgi_server:app)
+
+환경 변수:
+    BIND / PORT         바인드 주소 (기본 0.0.0.0:5000)
+    WEB_CONCURRENCY     워커 프로세스 수 (기본 1, 동시 처리는 워커 안의 스레드/이벤트 루프가 담당)
+    ALLOW_MULTI_WORKER  1이면 WEB_CONCURRENCY > 1 허용 (저장소와 요청 한도가 모두 sqlite일 때만)
+    GUNICORN_THREADS    WSGI 워커당 스레드 수 (기본: max(32, CPU*8), LLM 왕복 동안 스레드가 대부분 대기)
+    GRACEFUL_TIMEOUT    종료 신호 뒤 진행 중인 상담(스트리밍 포함)을 마저 처리하는 시간(초, 기본 30)
+
+마스터 프로세스에서 앱과 정적 데이터(프롬프트, 스키마, 토크나이저 인코딩, 템플릿)를 한 번 불러오고
+(preload_app), 워커는 fork 뒤 각자 구성 요소와 OpenAI 클라이언트를 만들고 나서 요청을 받는다.
+
+대시보드 실시간 스트림(EventBroker), 응답 캐시, 대시보드 집계, 토큰 사용량은 프로세스 안에만 있어
+워커가 여럿이면 워커마다 다른 값을 보게 된다. 그래서 여러 워커는 공유 백엔드(sqlite)와 명시적 허용이
+모두 있을 때만 띄우고, 아니면 시작할 때 이유를 출력하고 워커 1개로 실행한다.
+"""
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+CPU_COUNT = multiprocessing.cpu_count()
+
+
+def shared_backends():
+    # 대화 저장소와 요청 한도가 프로세스 사이에 공유되는지 (메모리 백엔드는 워커마다 따로 생김)
+    return (os.getenv('CONVERSATION_STORE', 'bounded').startswith('sqlite:///')
+            and os.getenv('RATE_LIMIT_BACKEND', 'memory').startswith('sqlite:///'))
+
+
+def worker_count():
+    requested = int(os.getenv('WEB_CONCURRENCY', 1))
+    if requested <= 1:
+        return 1
+    if not shared_backends():
+        print(f"경고: WEB_CONCURRENCY={requested}를 무시하고 워커 1개로 실행합니다. 메모리 저장소/요청 한도는 "
+              "워커마다 따로 생기므로 CONVERSATION_STORE, RATE_LIMIT_BACKEND를 sqlite:///로 설정하세요.")
+        return 1
+    if os.getenv('ALLOW_MULTI_WORKER') != '1':
+        print(f"경고: WEB_CONCURRENCY={requested}를 무시하고 워커 1개로 실행합니다. 대시보드 실시간 스트림과 "
+              "응답 캐시는 워커마다 따로 있으므로, 이를 감수하려면 ALLOW_MULTI_WORKER=1로 설정하세요.")
+        return 1
+    return requested
+
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', 5000)}")
+workers = worker_count()
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'asgi_server:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'run_server:app'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', max(32, CPU_COUNT * 8)))
+
+preload_app = True
+timeout = 60
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# 메모리 누수/단편화 대비 워커 주기적 교체 (동시에 재시작하지 않도록 jitter)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    # preload_app으로 이미 불러온 앱에서 fork 전에 정적 데이터 로드
+    import run_server
+    try:
+        run_server.preload(run_server.app)
+    except Exception as e:
+        print(f"정적 데이터 사전 로드 중 오류 발생: {e}")
+
+
+def post_worker_init(worker):
+    # ASGI 워커는 asgi_server의 lifespan 시작 단계에서 같은 예열/종료 처리를 한다
+    if SERVER_MODE == 'asgi':
+        return
+    from run_server import services
+    try:
+        services.warm_up()
+    except Exception as e:
+        print(f"워커 예열 중 오류 발생: {e}")
+    # SIGTERM을 받으면 새 요청을 막고 대시보드 실시간 스트림을 닫은 뒤 gunicorn의 graceful 종료로 넘김
+    services.drain_on_signals()
@@ -10,48 +10,192 @@ sys.path.insert(0, str(app_path))
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+# 앞단 리버스 프록시/로드 밸런서 수: X-Forwarded-For의 오른쪽에서 이 수만큼만 믿고 클라이언트 IP로 사용 (0이면 무시)
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
 
-from flask import Flask, render_template, request, jsonify
-from chatbot import CounselingChatbot
+import json
+import math
+import time
+from flask import Blueprint, Flask, abort, current_app, render_template, request, jsonify, Response, g
+from werkzeug.middleware.proxy_fix import ProxyFix
+from assets import PageCache, StaticAssets
+from events import TooManySubscribers
+from metrics import REGISTRY, REQUEST_SECONDS
+from ratelimit import RateLimitExceeded
+from services import Services
 
-app = Flask(__name__, 
-           template_folder=str(app_path / "templates"),
-           static_folder=str(project_root / "static"))
+routes = Blueprint('kbhug', __name__)
 
-# 챗봇 초기화
-chatbot = CounselingChatbot(os.environ['OPENAI_API_KEY'])
+# 요청마다 달라지는 내용이 없는 페이지 (한 번 렌더링해 압축본과 함께 캐시)
+STATIC_PAGES = ('index.html', 'home.html', 'records.html', 'chat_topics.html', 'chat_interface.html',
+                'resources.html', 'footer.html')
 
-@app.route('/')
+def get_services():
+    # 앱에 연결된 구성 요소 묶음 (services.Services, 처음 사용할 때 생성)
+    return current_app.extensions['kbhug']
+
+def create_app(services=None, proxy_hops=None):
+    """Flask 앱 생성 (챗봇/OpenAI 클라이언트 등은 첫 요청에서 생성)"""
+    services = services or Services(api_key=OPENAI_API_KEY)
+    proxy_hops = TRUSTED_PROXY_HOPS if proxy_hops is None else proxy_hops
+    # 정적 파일은 Flask 기본 경로 대신 해시 URL/사전 압축을 지원하는 /static 라우트로 제공
+    app = Flask(__name__,
+                template_folder=str(app_path / "templates"),
+                static_folder=None)
+    app.extensions['kbhug'] = services
+    assets = app.extensions['kbhug_assets'] = StaticAssets(project_root / "static")
+    app.extensions['kbhug_pages'] = PageCache(app, assets)
+    app.jinja_env.globals.update(static_url=assets.url, picture=assets.picture)
+    app.register_blueprint(routes)
+    register_metrics(services)
+    if proxy_hops:
+        # 프록시 뒤에서는 request.remote_addr가 프록시 주소라 모든 사용자가 요청 한도를 공유하게 됨
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops)
+    return app
+
+def preload(app):
+    """fork 전 마스터 프로세스에서 정적 데이터 로드 (gunicorn preload_app, 워커들이 메모리를 공유)"""
+    app.extensions['kbhug'].preload()
+    # 템플릿을 미리 컴파일해 Jinja 캐시에 올려 둠
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    # 정적 파일을 읽고 정적 페이지를 렌더링·압축해 둠
+    app.extensions['kbhug_pages'].warm(STATIC_PAGES)
+    return app
+
+def rate_limit_key(user_id):
+    # 프론트엔드 기본값(default_user)은 여러 사용자가 공유하므로 클라이언트 IP로 구분
+    if not user_id or user_id == 'default_user':
+        return f"ip:{request.remote_addr}"
+    return user_id
+
+def rate_limited_response(e):
+    # 429 응답과 Retry-After 헤더 (초 단위 올림)
+    response = jsonify({'error': str(e), 'retry_after': round(e.retry_after, 2)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+    return response
+
+def register_metrics(services):
+    # 수집 시점에 읽는 메트릭 (활성 사용자, 캐시 적중, 서킷 브레이커, 대기열)
+    # 아직 만들지 않은 구성 요소는 수집 때문에 생성하지 않고 건너뜀
+    def when_built(name, collect):
+        return lambda: collect(getattr(services, name)) if services.built(name) else []
+
+    REGISTRY.register_callback("kbhug_active_users", "최근 24시간 활성 사용자 수", "gauge", when_built(
+        "chatbot", lambda chatbot: [({}, chatbot.aggregator.active_user_count())]))
+    REGISTRY.register_callback("kbhug_cache_requests_total", "캐시 조회 수", "counter", when_built(
+        "chatbot", lambda chatbot: [
+            ({"cache": name, "result": result}, getattr(cache, result))
+            for name, cache in (("search", chatbot.search_cache), ("response", chatbot.response_cache))
+            if cache is not None
+            for result in ("hits", "misses")
+        ]))
+    REGISTRY.register_callback("kbhug_upstream_breaker_open", "서킷 브레이커 상태 (0 닫힘, 0.5 시험 중, 1 열림)",
+                               "gauge", when_built("upstream", lambda upstream: [
+                                   ({}, {"closed": 0, "half_open": 0.5, "open": 1}[upstream.breaker.state])]))
+    REGISTRY.register_callback("kbhug_upstream_breaker_rejected_total", "브레이커가 거절한 호출 수", "counter",
+                               when_built("upstream", lambda upstream: [({}, upstream.breaker.rejected_total)]))
+    REGISTRY.register_callback("kbhug_upstream_retries_total", "업스트림 재시도 횟수", "counter",
+                               when_built("upstream", lambda upstream: [({}, upstream.retry.retries_total)]))
+    REGISTRY.register_callback("kbhug_upstream_queue", "공정 대기열 상태", "gauge", when_built(
+        "upstream_queue", lambda queue: [
+            ({"state": "active"}, queue.stats()["active"]),
+            ({"state": "waiting"}, queue.stats()["waiting"])
+        ]))
+    REGISTRY.register_callback("kbhug_rate_limited_total", "요청 한도 초과로 거절한 요청 수", "counter",
+                               when_built("rate_limiter", lambda limiter: [({}, limiter.rejected_total)]))
+
+@routes.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+# 종료 중에도 응답하는 엔드포인트 (로드 밸런서/모니터링용)
+DRAIN_EXEMPT_ENDPOINTS = {'kbhug.healthz', 'kbhug.readyz', 'kbhug.metrics'}
+
+@routes.before_app_request
+def reject_while_draining():
+    # 종료 신호를 받은 워커는 새 요청을 받지 않고 다른 워커/인스턴스로 재시도하게 함
+    if get_services().draining and request.endpoint not in DRAIN_EXEMPT_ENDPOINTS:
+        response = jsonify({'error': '서버를 종료하는 중입니다. 잠시 후 다시 시도해주세요.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        response.headers['Connection'] = 'close'
+        return response
+
+@routes.after_app_request
+def observe_request(response):
+    # 스트리밍 응답은 응답 객체를 만들 때까지(첫 바이트 전)의 시간만 기록
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                method=request.method, route=route, status=response.status_code)
+    return response
+
+@routes.route('/healthz')
+def healthz():
+    # 프로세스 생존 확인 (구성 요소를 만들지 않음)
+    return jsonify({'status': 'ok'})
+
+@routes.route('/readyz')
+def readyz():
+    # 요청을 받을 준비 확인: 구성 요소와 OpenAI 클라이언트를 미리 만들고 설정/저장소를 점검
+    ready, checks = get_services().readiness()
+    return jsonify({'status': 'ready' if ready else 'not_ready', 'checks': checks}), 200 if ready else 503
+
+@routes.route('/metrics')
+def metrics():
+    # Prometheus 텍스트 형식 메트릭
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def static_page(template_name):
+    # 캐시한 렌더링 결과 (ETag/Last-Modified가 맞으면 304)
+    return current_app.extensions['kbhug_pages'].response(template_name, request)
+
+@routes.route('/static/<path:filename>')
+def static_file(filename):
+    # 해시 URL은 1년 캐시(immutable), 해시 없는 URL은 ETag 재검증
+    assets = current_app.extensions['kbhug_assets']
+    if current_app.debug:
+        assets.reload_if_changed()
+    response = assets.response(filename, request)
+    if response is None:
+        abort(404)
+    return response
+
+@routes.route('/')
 def index():
-    return render_template('index.html')
+    return static_page('index.html')
 
-@app.route('/home')
+@routes.route('/home')
 def home():
-    return render_template('home.html')
+    return static_page('home.html')
 
-@app.route('/records')
+@routes.route('/records')
 def records():
-    return render_template('records.html')
+    return static_page('records.html')
 
-@app.route('/chat_topics')
+@routes.route('/chat_topics')
 def chat_topics():
-    return render_template('chat_topics.html')
+    return static_page('chat_topics.html')
 
-@app.route('/chat_interface')
+@routes.route('/chat_interface')
 def chat_interface():
-    return render_template('chat_interface.html')
+    return static_page('chat_interface.html')
 
-@app.route('/resources')
+@routes.route('/resources')
 def resources():
-    return render_template('resources.html')
+    return static_page('resources.html')
 
-@app.route('/footer')
+@routes.route('/footer')
 def footer():
-    return render_template('footer.html')
+    return static_page('footer.html')
 
-@app.route('/chat', methods=['POST'])
+@routes.route('/chat', methods=['POST'])
 def chat():
     # 챗봇 대화 처리
+    services = get_services()
     try:
         data = request.get_json()
         user_id = data.get('user_id', 'default_user')
@@ -62,62 +206,158 @@ def chat():
         if not message:
             return jsonify({'error': '메시지가 비어있습니다.'}), 400
         
-        # 챗봇 처리
-        result = chatbot.process_message(user_id, message, character, category)
+        services.rate_limiter.check(rate_limit_key(user_id))
+        
+        # 챗봇 처리 (analyze_emotion=true면 감정 분석까지 한 번의 호출로 처리)
+        with services.upstream_queue.slot(rate_limit_key(user_id)):
+            if data.get('analyze_emotion'):
+                result = services.chatbot.process_message_with_emotion(user_id, message, character, category)
+            else:
+                result = services.chatbot.process_message(user_id, message, character, category)
         
         return jsonify(result)
         
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
         return jsonify({'error': f'오류발생 : {str(e)}'}), 500
 
-@app.route('/recommend_resources', methods=['POST'])
+@routes.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    # 챗봇 응답을 Server-Sent Events로 토큰 단위 전송
+    services = get_services()
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id', 'default_user')
+    message = data.get('message', '')
+    character = data.get('character', '멜랑콜리')
+    category = data.get('category', 'personal')
+
+    if not message:
+        return jsonify({'error': '메시지가 비어있습니다.'}), 400
+
+    try:
+        services.rate_limiter.check(rate_limit_key(user_id))
+        services.upstream_queue.acquire(rate_limit_key(user_id))
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+
+    def generate():
+        try:
+            for token in services.chatbot.stream_message(user_id, message, character, category):
+                yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            error = json.dumps({'error': f'오류발생 : {str(e)}'}, ensure_ascii=False)
+            yield f"event: error\ndata: {error}\n\n"
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # 스트림이 끝나거나 클라이언트가 끊으면 (본문을 읽기 전이라도) 대기열 슬롯 반납
+    response.call_on_close(services.upstream_queue.release)
+    return response
+
+@routes.route('/recommend_resources', methods=['POST'])
 def recommend_resources():
     # 대화 내용을 바탕으로 리소스 추천
+    services = get_services()
     try:
         data = request.get_json()
         conversation_history = data.get('conversation_history', [])
         category = data.get('category', 'personal')
+        client_key = rate_limit_key(data.get('user_id'))
+        
+        services.rate_limiter.check(client_key, scope="resources")
         
         # 리소스 추천
-        result = chatbot.recommend_resources(conversation_history, category)
+        with services.upstream_queue.slot(client_key):
+            result = services.chatbot.recommend_resources(conversation_history, category)
         
         return jsonify(result)
         
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
         return jsonify({'error': f'리소스 추천 중 오류 발생: {str(e)}'}), 500
 
-@app.route('/dashboard/<user_id>')
+@routes.route('/dashboard/<user_id>')
 def user_dashboard(user_id):
     #  대시보드
-    dashboard_data = chatbot.get_user_dashboard_data(user_id)
+    services = get_services()
+    dashboard_data = services.chatbot.get_user_dashboard_data(user_id)
     return render_template('dashboard.html', data=dashboard_data, user_id=user_id)
 
-@app.route('/api/dashboard/<user_id>')
+@routes.route('/api/dashboard/<user_id>')
 def api_user_dashboard(user_id):
     # 개인 대시보드 API
-    dashboard_data = chatbot.get_user_dashboard_data(user_id)
+    services = get_services()
+    dashboard_data = services.chatbot.get_user_dashboard_data(user_id)
     return jsonify(dashboard_data)
 
-@app.route('/admin/dashboard')
+def event_stream_response(channel):
+    # 대시보드 실시간 변경분 (SSE), 연결마다 스레드를 하나 붙잡으므로 워커당 한도를 넘으면 503
+    services = get_services()
+    try:
+        stream = services.chatbot.events.stream(channel)
+    except TooManySubscribers as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@routes.route('/api/dashboard/<user_id>/events')
+def api_user_dashboard_events(user_id):
+    # 개인 대시보드 실시간 변경분 (SSE)
+    return event_stream_response(f"user:{user_id}")
+
+@routes.route('/admin/dashboard')
 def admin_dashboard():
     # 관리자 대시보드
-    admin_data = chatbot.get_admin_dashboard_data()
+    services = get_services()
+    admin_data = services.chatbot.get_admin_dashboard_data()
     return render_template('admin_dashboard.html', data=admin_data)
 
-@app.route('/api/admin/dashboard')
+@routes.route('/api/admin/dashboard')
 def api_admin_dashboard():
-    admin_data = chatbot.get_admin_dashboard_data()
+    services = get_services()
+    admin_data = services.chatbot.get_admin_dashboard_data()
     return jsonify(admin_data)
 
+@routes.route('/api/admin/usage')
+def api_admin_usage():
+    # 호출 종류별 토큰 사용량 (프롬프트 캐시 적중/미적중 토큰 수)
+    services = get_services()
+    return jsonify(services.usage_stats.snapshot())
+
+@routes.route('/api/admin/upstream')
+def api_admin_upstream():
+    # 서킷 브레이커 상태와 재시도 횟수
+    services = get_services()
+    return jsonify({**services.upstream.stats(), "queue": services.upstream_queue.stats(),
+                    "rate_limited_total": services.rate_limiter.rejected_total})
+
+@routes.route('/api/admin/dashboard/events')
+def api_admin_dashboard_events():
+    # 관리자 대시보드 실시간 변경분 (SSE)
+    return event_stream_response("admin")
+
+app = create_app()
+services = app.extensions['kbhug']
+
 if __name__ == '__main__':
+    # 개발 서버 (운영 서빙은 gunicorn -c gunicorn.conf.py)
+    port = int(os.getenv('PORT', 5000))
+    base_url = f"http://localhost:{port}"
     print("AI 상담 챗봇 서버를 시작...")
-    print("http://localhost:5000")
-    print("개인 대시보드: http://localhost:5000/dashboard/default_user")
-    print("관리자 대시보드: http://localhost:5000/admin/dashboard")
-    print("KB HUG 홈: http://localhost:5000/home")
-    print("기록 보기: http://localhost:5000/records")
-    print("대화하기: http://localhost:5000/chat_topics")
-    print("채팅 인터페이스: http://localhost:5000/chat_interface")
-    print("리소스: http://localhost:5000/resources")
-    print("푸터: http://localhost:5000/footer")
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    print(base_url)
+    print(f"개인 대시보드: {base_url}/dashboard/default_user")
+    print(f"관리자 대시보드: {base_url}/admin/dashboard")
+    print(f"KB HUG 홈: {base_url}/home")
+    print(f"기록 보기: {base_url}/records")
+    print(f"대화하기: {base_url}/chat_topics")
+    print(f"채팅 인터페이스: {base_url}/chat_interface")
+    print(f"리소스: {base_url}/resources")
+    print(f"푸터: {base_url}/footer")
+    app.run(debug=os.getenv('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=port)
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# app/ 모듈은 서로 형제 모듈로 import하므로 run_server.py와 같이 app/을 경로에 추가
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+# 서버 모듈(run_server, asgi_server) 테스트용
+sys.path.append(str(ROOT))
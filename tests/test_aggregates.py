@@ -0,0 +1,90 @@
+import time
+
+from aggregates import DashboardAggregator
+from storage import SQLiteConversationStore
+
+
+def fill(store, user_id, category, stress_scores):
+    for score in stress_scores:
+        store.append_message(user_id, "user", "요즘 힘들어요", category)
+        store.append_message(user_id, "assistant", "많이 힘드셨겠어요", category)
+        store.append_emotion(user_id, {"primary_emotion": "부정", "stress_level": 7}, score)
+
+
+def test_load_rebuilds_every_aggregate_from_sqlite(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / "history.db"))
+    fill(store, "alice", "customer", [5.0, 9.0])
+    fill(store, "bob", "work", [3.0])
+
+    # 다른 워커나 재시작 뒤의 새 프로세스
+    aggregator = DashboardAggregator()
+    aggregator.load(store)
+    snapshot = aggregator.snapshot()
+
+    assert snapshot["total_users"] == 2
+    assert snapshot["total_conversations"] == 3
+    assert snapshot["active_users"] == 2
+    assert {row["category"]: row["count"] for row in snapshot["category_distribution"]} == {
+        "고객": 2, "조직·업무": 1, "개인·번아웃": 0}
+    assert [row["user_id"] for row in snapshot["recent_activity"]] == ["bob", "alice"]
+    assert snapshot["recent_activity"][1]["session_count"] == 2
+    assert snapshot["system_stats"] == {"total_sessions": 3, "avg_stress_score": 17.0 / 3}
+    assert [user["user_id"] for user in snapshot["high_risk_users"]] == ["alice"]
+    assert aggregator.user_stats("alice")["total_sessions"] == 2
+
+
+def test_shared_store_refreshes_other_workers_records(tmp_path):
+    path = str(tmp_path / "history.db")
+    aggregator = DashboardAggregator(refresh_interval=0.01)
+    aggregator.load(SQLiteConversationStore(path))
+    assert aggregator.snapshot()["total_users"] == 0
+
+    fill(SQLiteConversationStore(path), "carol", "personal", [4.0])
+    time.sleep(0.02)
+    aggregator.snapshot()  # 다시 집계를 백그라운드에서 시작
+    aggregator._refresh_thread.join(5)
+    assert aggregator.snapshot()["total_users"] == 1
+
+
+def test_refresh_does_not_block_snapshot(tmp_path):
+    store = SQLiteConversationStore(str(tmp_path / "history.db"))
+    fill(store, "alice", "customer", [5.0])
+    aggregator = DashboardAggregator(refresh_interval=0.01)
+    aggregator.load(store)
+
+    scan = store.user_activity
+    store.user_activity = lambda: time.sleep(0.5) or scan()  # 큰 저장소의 느린 전체 집계
+    time.sleep(0.02)
+    started = time.perf_counter()
+    assert aggregator.snapshot()["total_users"] == 1
+    assert aggregator.snapshot()["total_users"] == 1
+    assert time.perf_counter() - started < 0.25
+    aggregator._refresh_thread.join(5)
+
+
+def test_user_entries_are_bounded():
+    aggregator = DashboardAggregator(max_users=3)
+    for i in range(10):
+        aggregator.record_message(f"user{i}", "user", "work")
+        aggregator.record_session(f"user{i}", 9.0)
+    snapshot = aggregator.snapshot()
+    assert len(aggregator._users) == 3
+    assert snapshot["total_users"] == 10
+    assert {user["user_id"] for user in snapshot["high_risk_users"]} == {"user7", "user8", "user9"}
+
+
+def test_user_dashboard_falls_back_to_store(tmp_path):
+    from chatbot import CounselingChatbot
+    from emotion_analyzer import EmotionAnalyzer
+
+    store = SQLiteConversationStore(str(tmp_path / "history.db"))
+    for score in (3.0, 4.0, 5.0, 7.0, 8.0, 9.0, 9.0, 9.5):
+        store.append_emotion("alice", {"primary_emotion": "불안"}, score)
+
+    # 세션을 하나도 처리하지 않은 새 프로세스
+    chatbot = CounselingChatbot(api_key="test", store=store,
+                                emotion_analyzer=EmotionAnalyzer(api_key="test", store=store))
+    data = chatbot.get_user_dashboard_data("alice")
+    assert data["total_sessions"] == 8
+    assert data["current_stress_score"] == 9.5
+    assert data["stress_trend"] == "상승"
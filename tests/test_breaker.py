@@ -0,0 +1,58 @@
+import asyncio
+import types
+
+import pytest
+
+from upstream import AsyncUpstream, CircuitBreaker, ResilientUpstream
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.0)
+    breaker.record_failure()  # 바로 회복 확인(half_open)으로 넘어가는 열린 상태
+    return breaker
+
+
+def test_cancelled_async_probe_releases_slot():
+    async def scenario():
+        breaker = half_open_breaker()
+        upstream = AsyncUpstream("test-key", breaker=breaker)
+        started = asyncio.Event()
+
+        async def hang(**kwargs):
+            started.set()
+            await asyncio.sleep(3600)
+
+        async def reply(**kwargs):
+            return "ok"
+
+        completions = types.SimpleNamespace(create=hang)
+        upstream._client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+
+        probe = asyncio.ensure_future(upstream.chat(model="m", messages=[]))
+        await started.wait()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        probe.cancel()  # 클라이언트 연결 끊김
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        # 다음 호출이 시험 호출로 허용되고 성공하면 닫힘
+        completions.create = reply
+        assert await upstream.chat(model="m", messages=[]) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_sync_probe_releases_slot():
+    breaker = half_open_breaker()
+    upstream = ResilientUpstream(client=object(), breaker=breaker)
+
+    def interrupted(**kwargs):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        upstream.call(interrupted)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    assert upstream.call(lambda **kwargs: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,45 @@
+import types
+
+from chatbot import CounselingChatbot
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.closed = False
+
+    def __iter__(self):
+        for token in self.tokens:
+            delta = types.SimpleNamespace(content=token)
+            yield types.SimpleNamespace(usage=None, choices=[types.SimpleNamespace(delta=delta)])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeUpstream:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def chat(self, **kwargs):
+        return self.stream
+
+
+def test_disconnected_stream_is_closed_and_recorded():
+    stream = FakeStream(["안녕", "하세요", "!"])
+    bot = CounselingChatbot(None, upstream=FakeUpstream(stream))
+
+    tokens = bot.stream_message("u1", "힘들어요")
+    assert next(tokens) == "안녕"
+    tokens.close()  # SSE 클라이언트가 응답 중간에 연결을 끊음
+
+    assert stream.closed
+    assert [m["content"] for m in bot.store.get_messages("u1")] == ["힘들어요", "안녕"]
+
+
+def test_finished_stream_is_closed():
+    stream = FakeStream(["괜찮", "아요"])
+    bot = CounselingChatbot(None, upstream=FakeUpstream(stream))
+
+    assert list(bot.stream_message("u1", "hi")) == ["괜찮", "아요"]
+    assert stream.closed
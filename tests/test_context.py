@@ -0,0 +1,78 @@
+import sys
+
+import pytest
+
+from context import REPLY_PRIMING_TOKENS, TRUNCATION_MARKER, ContextBuilder, approximate_tokens, load_token_counter
+
+
+def history(n):
+    # 내용 10자짜리 메시지 n개 (user/assistant 번갈아)
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message-{i:02d}"} for i in range(n)]
+
+
+def builder(**kwargs):
+    # 글자 수를 토큰 수로 세는 주입 카운터: 메시지 하나 = 10 + 4 토큰
+    return ContextBuilder(token_budget=100, count_tokens=len, **kwargs)
+
+
+def test_keeps_most_recent_messages_within_budget():
+    # 예산 100 - 응답 10 - 시작 3 - 시스템 프롬프트 7 = 80 → 14토큰 메시지 5개
+    messages = builder().build("sys", history(8), max_tokens=10)
+
+    assert messages[0] == {"role": "system", "content": "sys"}
+    assert [m["content"] for m in messages[1:]] == [f"message-{i:02d}" for i in range(3, 8)]
+
+
+def test_summary_is_placed_after_fixed_prefix_and_uses_budget():
+    instruction = {"role": "system", "content": "tool"}
+    # 요약 메시지 "이전 대화 요약:\n" + 19자 = 28 + 4 토큰, 지시문 8 토큰 → 남은 40 → 메시지 2개
+    messages = builder().build("sys", history(8), summary="s" * 19, instruction=instruction, max_tokens=10)
+
+    assert messages[0]["content"] == "sys"
+    assert messages[1] is instruction
+    assert messages[2] == {"role": "system", "content": "이전 대화 요약:\n" + "s" * 19}
+    assert [m["content"] for m in messages[3:]] == ["message-06", "message-07"]
+
+
+def test_latest_message_over_budget_is_truncated_to_its_tail():
+    long_message = {"role": "user", "content": "a" * 100 + "z" * 400}
+    messages = builder().build("sys", history(4) + [long_message], max_tokens=10)
+
+    # 남은 예산 80 - 메시지 구분 4 = 내용 76토큰 (생략 표시 포함)
+    assert len(messages) == 2
+    content = messages[-1]["content"]
+    assert messages[-1]["role"] == "user"
+    assert len(content) == 76
+    assert content == TRUNCATION_MARKER + "z" * (76 - len(TRUNCATION_MARKER))
+
+
+def test_truncation_fits_budget_with_approximate_count():
+    context = ContextBuilder(token_budget=120, count_tokens=approximate_tokens)
+    messages = context.build("sys", [{"role": "user", "content": "회사 얘기 " * 200 + "마지막 문장"}], max_tokens=10)
+
+    prompt_tokens = sum(context.message_tokens(m) for m in messages) + REPLY_PRIMING_TOKENS
+    assert prompt_tokens <= 120 - 10
+    assert messages[-1]["content"].startswith(TRUNCATION_MARKER)
+    assert messages[-1]["content"].endswith("마지막 문장")
+
+
+def test_falls_back_to_approximate_count_without_tiktoken(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tiktoken", None)  # import tiktoken이 ImportError
+    assert load_token_counter() is approximate_tokens
+
+    context = ContextBuilder(token_budget=100)
+    assert context.count("abcdefgh") == 2
+    assert context.count("안녕하세요") == 5
+    # 근사 카운터로도 예산 안에서 최신 메시지부터 채움 ("message-00" = 3 + 4 토큰)
+    messages = context.build("sys", history(20), max_tokens=10)
+    assert [m["content"] for m in messages[1:]] == [f"message-{i:02d}" for i in range(9, 20)]
+
+
+def test_counts_with_tiktoken_when_installed():
+    pytest.importorskip("tiktoken")
+    count = load_token_counter()
+    assert count is not approximate_tokens
+    assert count("hello world") == 2
+    messages = ContextBuilder(token_budget=60).build("sys", history(20), max_tokens=10)
+    assert 1 < len(messages) < 21
+    assert messages[-1]["content"] == "message-19"
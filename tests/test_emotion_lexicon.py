@@ -0,0 +1,122 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+from emotion_analyzer import EmotionAnalyzer, LexiconEmotionClassifier
+
+THRESHOLD = 0.7
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return LexiconEmotionClassifier()
+
+
+@pytest.mark.parametrize("text", ["죽고 싶어요", "자살하고 싶다", "상사가 날 때렸어", "살기 싫어요"])
+def test_crisis_always_escalates(lexicon, text):
+    result = lexicon.classify(text)
+    assert result["crisis"]
+    assert result["stress_level"] >= 9
+    # 신뢰도 기준을 0으로 낮춰도 로컬 결과로 끝내지 않는다
+    analyzer = EmotionAnalyzer(api_key="test", local_confidence_threshold=0.0)
+    assert not analyzer._local_is_enough(result)
+
+
+@pytest.mark.parametrize("text", ["밤에 잠이 안 와요", "네", "회사 얘기 좀 할게요"])
+def test_no_evidence_is_low_confidence(lexicon, text):
+    assert lexicon.classify(text)["confidence"] < THRESHOLD
+
+
+@pytest.mark.parametrize("text, primary", [
+    ("괜찮지 않아요", "부정"),
+    ("좋지 않아요", "부정"),
+    ("안 좋아요", "부정"),
+    ("의욕이 없어요", "부정"),
+])
+def test_negated_positive_flips_but_escalates(lexicon, text, primary):
+    result = lexicon.classify(text)
+    assert result["primary_emotion"] == primary
+    assert result["confidence"] < THRESHOLD
+
+
+@pytest.mark.parametrize("text", ["불안하지 않아요", "걱정 없어요"])
+def test_negated_negative_is_dropped(lexicon, text):
+    result = lexicon.classify(text)
+    assert result["primary_emotion"] not in ("불안", "부정")
+    assert result["confidence"] < THRESHOLD
+
+
+@pytest.mark.parametrize("text, primary, specific", [
+    ("의욕이 넘쳐요", "긍정", "의욕"),
+    ("오늘 너무 힘들어요", "부정", "힘듦"),
+    ("고객 폭언 때문에 너무 화나요", "분노", "화남"),
+])
+def test_plain_match_takes_fast_path(lexicon, text, primary, specific):
+    result = lexicon.classify(text)
+    assert result["primary_emotion"] == primary
+    assert result["confidence"] >= THRESHOLD
+    assert specific in result["specific_emotions"]
+
+
+class FailingUpstream:
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, **kwargs):
+        self.calls += 1
+        raise TimeoutError("upstream timed out")
+
+
+class FailingAsyncUpstream:
+    async def chat(self, **kwargs):
+        raise TimeoutError("upstream timed out")
+
+
+def test_crisis_survives_upstream_failure():
+    upstream = FailingUpstream()
+    analyzer = EmotionAnalyzer(api_key="test", upstream=upstream, async_upstream=FailingAsyncUpstream())
+
+    result = analyzer.analyze_emotion("죽고 싶어요")
+    assert upstream.calls == 1
+    assert result["crisis"] and result["stress_level"] == 9
+    assert asyncio.run(analyzer.aanalyze_emotion("죽고 싶어요"))["stress_level"] == 9
+
+    batch = analyzer.analyze_batch(["죽고 싶어요", "밤에 잠이 안 와요"], requests_per_minute=0)
+    assert batch[0]["crisis"] and batch[0]["stress_level"] == 9
+    # 위기가 아닌 텍스트는 기존처럼 실패 결과
+    assert batch[1]["specific_emotions"] == ["분석 실패"]
+    assert analyzer.analyze_emotion("밤에 잠이 안 와요")["specific_emotions"] == ["분석 실패"]
+
+
+def batch_reply(items):
+    content = json.dumps({"results": items}, ensure_ascii=False)
+    message = types.SimpleNamespace(content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def test_batch_ignores_indexes_outside_the_chunk(tmp_path):
+    analyzer = EmotionAnalyzer(api_key="test", local_confidence_threshold=1.1)
+    texts = [f"텍스트 {i}" for i in range(4)]
+
+    class ChunkUpstream:
+        def chat(self, **kwargs):
+            chunk = json.loads(kwargs["messages"][1]["content"])
+            # 각 청크가 자기 항목 외에 다른 청크의 index도 덮어쓰려 함
+            items = [{"index": item["index"], "primary_emotion": "긍정", "stress_level": 2} for item in chunk]
+            foreign = (chunk[0]["index"] + 2) % len(texts)
+            return batch_reply(items + [{"index": foreign, "primary_emotion": "부정", "stress_level": 10}])
+
+    analyzer.upstream = ChunkUpstream()
+    results = analyzer.analyze_batch(texts, chunk_size=2, max_concurrency=1, requests_per_minute=0)
+    assert [r["stress_level"] for r in results] == [2, 2, 2, 2]
+
+    # Batch API 결과 파일도 custom_id의 청크 범위만 받아들임
+    path = tmp_path / "results.jsonl"
+    lines = [{"custom_id": "emotion-2", "response": {"body": {"choices": [{"message": {"content": json.dumps(
+        {"results": [{"index": 2, "stress_level": 3}, {"index": 1, "stress_level": 10}]})}}]}}}]
+    path.write_text("\n".join(json.dumps(line) for line in lines), encoding="utf-8")
+    results = analyzer.read_batch_results(str(path), total=4, chunk_size=2)
+    assert results[2]["stress_level"] == 3
+    assert results[1]["specific_emotions"] == ["분석 실패"]
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+import pytest
+
+from events import EventBroker, TooManySubscribers
+
+
+def test_thread_streams_are_capped_and_released():
+    broker = EventBroker(max_thread_subscribers=2)
+    first = broker.stream("admin")
+    broker.stream("user:alice")
+    with pytest.raises(TooManySubscribers):
+        broker.stream("admin")
+
+    # WSGI 서버가 연결을 닫으면 close()로 자리가 돌아온다
+    first.close()
+    broker.stream("admin")
+
+
+def test_thread_stream_receives_published_events():
+    broker = EventBroker()
+    events = iter(broker.stream("admin", heartbeat=1.0))
+    assert next(events).startswith("retry:")
+    broker.publish("admin", "activity", {"total_users": 1})
+    assert next(events) == 'event: activity\ndata: {"total_users": 1}\n\n'
+
+
+def test_async_stream_does_not_count_against_thread_cap():
+    broker = EventBroker(max_thread_subscribers=0)
+
+    async def read_two():
+        stream = broker.astream("admin", heartbeat=1.0)
+        assert (await stream.__anext__()).startswith("retry:")
+        # 다른 스레드(요청 처리 스레드)에서 발행
+        threading.Thread(target=broker.publish, args=("admin", "session", {"high_risk_count": 2})).start()
+        event = await stream.__anext__()
+        broker.close()
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+        return event
+
+    assert asyncio.run(read_two()) == 'event: session\ndata: {"high_risk_count": 2}\n\n'
+    assert not broker.has_subscribers("admin")
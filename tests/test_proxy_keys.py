@@ -0,0 +1,44 @@
+import pytest
+
+from services import Services
+
+
+@pytest.fixture
+def strict_limits(monkeypatch):
+    # 클라이언트마다 요청 1건만 허용하는 한도
+    monkeypatch.setenv('RATE_LIMIT_BACKEND', 'memory')
+    monkeypatch.setenv('RATE_LIMIT_USER_BURST', '1')
+    monkeypatch.setenv('RATE_LIMIT_USER_RATE', '0.001')
+
+
+def chat(client, forwarded_for):
+    return client.post('/chat', json={'user_id': 'default_user', 'message': '안녕하세요'},
+                       headers={'X-Forwarded-For': forwarded_for}, environ_base={'REMOTE_ADDR': '10.0.0.1'})
+
+
+def test_clients_behind_one_proxy_get_separate_buckets(strict_limits):
+    from run_server import create_app
+
+    client = create_app(Services(), proxy_hops=1).test_client()
+    assert chat(client, '203.0.113.5').status_code == 200
+    assert chat(client, '203.0.113.5').status_code == 429
+    # 같은 프록시(10.0.0.1)를 거친 다른 클라이언트는 따로 한도를 받음
+    assert chat(client, '198.51.100.7').status_code == 200
+
+
+def test_forwarded_header_is_ignored_without_trusted_proxies(strict_limits):
+    from run_server import create_app
+
+    client = create_app(Services(), proxy_hops=0).test_client()
+    assert chat(client, '203.0.113.5').status_code == 200
+    assert chat(client, '198.51.100.7').status_code == 429
+
+
+def test_asgi_client_address_uses_trusted_hops():
+    from asgi_server import client_address
+
+    scope = {'client': ('10.0.0.1', 5000), 'headers': [(b'x-forwarded-for', b'1.2.3.4, 203.0.113.5')]}
+    assert client_address(scope, proxy_hops=1) == '203.0.113.5'
+    assert client_address(scope, proxy_hops=2) == '1.2.3.4'
+    assert client_address(scope, proxy_hops=3) == '10.0.0.1'  # 헤더 값이 모자라면 연결 주소
+    assert client_address(scope, proxy_hops=0) == '10.0.0.1'
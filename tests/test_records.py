@@ -0,0 +1,30 @@
+from records import EmotionColumns, EmotionRecord, MessageColumns
+
+
+def emotion(i):
+    return EmotionRecord.from_emotion(float(i), {"primary_emotion": "부정", "stress_level": i % 10}, float(i))
+
+
+def test_message_columns_keep_latest_after_many_evictions():
+    columns = MessageColumns(maxlen=3)
+    dropped = [columns.append("user", f"m{i}", float(i)) for i in range(10)]
+
+    assert len(columns) == 3
+    assert [d.content for d in dropped if d is not None] == [f"m{i}" for i in range(7)]
+    assert [m["content"] for m in columns.to_dicts()] == ["m7", "m8", "m9"]
+    assert [m["content"] for m in columns.to_dicts(limit=2)] == ["m8", "m9"]
+    # 밀어낸 자리는 모아서 잘라 내므로 열이 maxlen의 두 배를 넘지 않음
+    assert len(columns.contents) <= 6
+
+
+def test_emotion_columns_keep_latest_after_many_evictions():
+    columns = EmotionColumns(maxlen=4)
+    for i in range(11):
+        columns.append(emotion(i))
+
+    assert len(columns) == 4
+    assert [r.stress_score for r in columns.records()] == [7.0, 8.0, 9.0, 10.0]
+    assert [r.stress_score for r in columns.records(since=8.0)] == [9.0, 10.0]
+    assert [r.stress_score for r in columns.records(limit=1)] == [10.0]
+    assert columns.record(0).stress_level == 7
+    assert len(columns.timestamps) <= 8
@@ -0,0 +1,43 @@
+import pytest
+
+from cache import SemanticResponseCache, polarity_signature, normalize_message
+
+CHARACTER = "lama"
+
+
+def warmed_cache(message, reply="답변"):
+    cache = SemanticResponseCache(variants=1)
+    cache.set(CHARACTER, message, reply)
+    return cache
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("오늘 기분이 좋아요", "오늘 기분이 안 좋아요"),
+    ("오늘 기분이 좋아요", "오늘 기분이 안좋아요"),
+    ("상사 때문에 스트레스", "상사 때문에 스트레스 없어요"),
+    ("불안해요", "불안하지 않아요"),
+    ("회사 가기 싫어요", "회사 가기 싫지 않아요"),
+    ("일이 잘 돼요", "일이 잘 안 돼요"),
+    ("I feel good today", "I don't feel good today"),
+])
+def test_opposite_meaning_is_not_a_hit(cached, asked):
+    assert warmed_cache(cached).get(CHARACTER, asked) is None
+    assert warmed_cache(asked).get(CHARACTER, cached) is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("요즘 너무 힘들어요", "요즘 너무 힘들어요!!"),
+    ("상사 때문에 스트레스", "상사때문에 스트레스"),
+    ("요즘 너무 힘들어요", "요즘 너무 너무 힘들어요"),
+])
+def test_near_duplicate_is_a_hit(cached, asked):
+    assert warmed_cache(cached).get(CHARACTER, asked) == "답변"
+
+
+def test_other_character_is_not_a_hit():
+    assert warmed_cache("요즘 너무 힘들어요").get("other", "요즘 너무 힘들어요") is None
+
+
+def test_polarity_signature_counts_negations():
+    assert polarity_signature(normalize_message("좋아요")) != polarity_signature(normalize_message("안 좋아요"))
+    assert polarity_signature(normalize_message("힘들어요!!")) == polarity_signature(normalize_message("힘들어요"))
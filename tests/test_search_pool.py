@@ -0,0 +1,38 @@
+import threading
+import time
+
+from chatbot import CounselingChatbot
+
+
+def test_concurrent_recommendations_meet_deadline(monkeypatch):
+    monkeypatch.setenv('SEARCH_MAX_CONCURRENCY', '4')
+    bot = CounselingChatbot(None)
+    assert bot.search_executor._max_workers == bot.search_pool_size == 20
+    bot.search_deadline = 0.5
+
+    def slow_search(query, deadline=None):
+        time.sleep(0.3)
+        return [{"title": query, "url": f"https://blog.example/{query}", "description": "", "type": "blog",
+                 "source": "네이버 블로그", "date": "", "thumbnail": ""}]
+
+    monkeypatch.setattr(bot, '_search_naver_blog', slow_search)
+    history = [{"user": "회사 상사 때문에 스트레스가 심해요", "bot": ""}]
+    results = []
+
+    def recommend():
+        results.append(bot.recommend_resources(history, 'work'))
+
+    # 동시에 들어온 추천 요청 4건의 쿼리가 서로 기다리지 않고 각자 마감 안에 끝남
+    threads = [threading.Thread(target=recommend) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    defaults = len(bot._get_default_resources('work'))
+    assert all(len(result["resources"]) > defaults for result in results)
+
+
+def test_search_skips_queries_past_deadline():
+    bot = CounselingChatbot(None)
+    bot.search_url = "http://127.0.0.1:9/search.naver"  # 호출되면 연결 오류
+    assert bot._search_naver_blog("스트레스 관리", time.monotonic() - 1) == []
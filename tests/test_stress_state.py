@@ -0,0 +1,63 @@
+import threading
+
+from emotion_analyzer import EmotionAnalyzer
+from storage import InMemoryConversationStore, SQLiteConversationStore
+
+EMOTION = {"primary_emotion": "불안", "emotion_intensity": 6, "stress_level": 7}
+
+
+def test_workers_sharing_sqlite_see_each_others_sessions(tmp_path):
+    path = str(tmp_path / "history.db")
+    worker_a = EmotionAnalyzer(api_key="test", store=SQLiteConversationStore(path))
+    worker_b = EmotionAnalyzer(api_key="test", store=SQLiteConversationStore(path))
+
+    assert worker_a.calculate_stress_score("alice", EMOTION)["session_count"] == 1
+    for expected in range(2, 7):
+        assert worker_b.calculate_stress_score("alice", EMOTION)["session_count"] == expected
+    # A의 캐시된 상태는 B가 더한 기록을 반영해 다시 불러온다
+    assert worker_a.calculate_stress_score("alice", EMOTION)["session_count"] == 7
+
+
+def test_concurrent_requests_for_one_user_do_not_race():
+    analyzer = EmotionAnalyzer(api_key="test", store=InMemoryConversationStore())
+    barrier = threading.Barrier(8)
+
+    def run():
+        barrier.wait()
+        for _ in range(25):
+            analyzer.calculate_stress_score("alice", EMOTION)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    state = analyzer._stress_state("alice")
+    assert state.session_count == 200
+    assert analyzer.store.count_emotions("alice") == 200
+    assert len(state.emotions) == 9
+    assert state.negative_count == 9
+
+
+def session_total(analyzer, user_id):
+    return sum(row["session_count"] for row in analyzer.weekly_mood_trend(user_id))
+
+
+def test_workers_sharing_sqlite_see_each_others_mood_rollups(tmp_path):
+    path = str(tmp_path / "history.db")
+    worker_a = EmotionAnalyzer(api_key="test", store=SQLiteConversationStore(path))
+    worker_b = EmotionAnalyzer(api_key="test", store=SQLiteConversationStore(path))
+
+    worker_a.calculate_stress_score("alice", EMOTION)
+    assert session_total(worker_a, "alice") == 1
+    assert session_total(worker_b, "alice") == 1
+
+    for _ in range(3):
+        worker_b.calculate_stress_score("alice", EMOTION)
+    # A의 집계는 B가 더한 기록을 반영해 다시 채우고, 자기 기록도 두 번 세지 않는다
+    assert session_total(worker_a, "alice") == 4
+    worker_a.calculate_stress_score("alice", {**EMOTION, "primary_emotion": "분노"})
+    assert session_total(worker_a, "alice") == 5
+    assert session_total(worker_b, "alice") == 5
+    assert worker_b.mood_trend("alice")[-1]["dominant_emotion"] == "불안"
@@ -0,0 +1,61 @@
+import asyncio
+
+from upstream import AsyncUpstream
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+def test_stream_holds_permit_until_exhausted():
+    async def scenario():
+        upstream = AsyncUpstream("test-key", max_concurrency=1)
+
+        async def create(**kwargs):
+            return FakeStream(["a", "b"])
+
+        stream = await upstream.call(create, stream=True)
+        assert upstream._in_flight == 1
+        # 첫 스트림을 다 읽기 전에는 두 번째 호출이 permit을 얻지 못함
+        second = asyncio.ensure_future(upstream.call(create, stream=True))
+        await asyncio.sleep(0.01)
+        assert not second.done()
+
+        assert [chunk async for chunk in stream] == ["a", "b"]
+        assert stream.closed
+        other = await asyncio.wait_for(second, 1)
+        await other.aclose()
+        assert upstream._in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_closing_stream_early_releases_permit_once():
+    async def scenario():
+        upstream = AsyncUpstream("test-key", max_concurrency=1)
+
+        async def create(**kwargs):
+            return FakeStream(["a", "b", "c"])
+
+        stream = await upstream.call(create, stream=True)
+        async for _ in stream:
+            break  # 클라이언트 연결이 끊긴 경우처럼 중간에 멈춤
+        await stream.aclose()
+        await stream.aclose()
+        assert upstream._in_flight == 0
+        assert upstream._semaphore._value == 1
+
+    asyncio.run(scenario())